@@ -1,40 +1,38 @@
 import os
+import asyncio
 import uuid
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, PlainTextResponse
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 from dotenv import load_dotenv
 import uvicorn
-import asyncio
 import logging
 
 from services.exchange_service import ExchangeService
 from services.discord_service import DiscordService
-from routes.prices import router as prices_router
+from services.candles import BINARY_MEDIA_TYPE, encode_binary_message
+from services.indicators import IndicatorEngine
+from services.streaming_indicators import IndicatorStreams
+from services.alert_index import AlertIndex
+from services.alert_evaluator import AlertEvaluator
+from services.alert_store import AlertStore
+from services.stream_ingestor import StreamIngestor
+from services.metrics import REGISTRY, CONTENT_TYPE
+from services.logging_setup import configure_logging, stop_logging, logging_info
+from routes.prices import router as prices_router, price_hub
 from routes.alerts import router as alerts_router
-from routes.discord import router as discord_router
+from routes.discord import router as discord_router, discord_queue
+from routes.backfill import router as backfill_router, backfill_manager
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Configure logging with more aggressive suppression for known log spammers
-logging_level = os.getenv("LOG_LEVEL", "INFO")
-level_mapping = {
-    "DEBUG": logging.DEBUG,
-    "INFO": logging.INFO,
-    "WARNING": logging.WARNING,
-    "ERROR": logging.ERROR,
-    "CRITICAL": logging.CRITICAL
-}
-
-# Set up root logger
-logging.basicConfig(
-    level=level_mapping.get(logging_level, logging.INFO),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-)
+# Format and write log records on a background thread, collapsing repeats
+# of the same message (see services/logging_setup.py)
+configure_logging()
 
 # Set module-specific logging levels to reduce noise
 exchange_logger = logging.getLogger("exchange_service")
@@ -48,35 +46,6 @@ access_logger.setLevel(logging.WARNING)  # Reduce access log noise
 
 logger = logging.getLogger("app")
 
-# Create a custom filter to suppress repetitive logs
-class DuplicateFilter(logging.Filter):
-    def __init__(self, name=""):
-        super().__init__(name)
-        self.last_log = {}
-        self.interval = 30  # seconds between allowing duplicate logs
-        
-    def filter(self, record):
-        # Create a key from the log record properties
-        key = f"{record.levelname}:{record.msg}"
-        
-        # Check if this is a simulation-related message
-        if "simulation" in record.msg.lower() or "switching to" in record.msg.lower():
-            current_time = time.time()
-            last_time = self.last_log.get(key, 0)
-            
-            # Allow the log if we haven't seen it recently
-            if current_time - last_time > self.interval:
-                self.last_log[key] = current_time
-                return True
-            return False
-        
-        # Allow non-simulation logs
-        return True
-
-# Add the filter to the exchange logger
-duplicate_filter = DuplicateFilter()
-exchange_logger.addFilter(duplicate_filter)
-
 app = FastAPI(title="Trading View Clone API")
 
 # Configure CORS
@@ -95,9 +64,13 @@ app.add_middleware(
 # Initialize services
 exchange_service = ExchangeService()
 discord_service = DiscordService()
+indicator_engine = IndicatorEngine(exchange_service)
+indicator_streams = IndicatorStreams(exchange_service)
 
-# In-memory alert storage (replace with database in production)
-alerts = []
+# Active alerts by symbol and sorted threshold, for the alert evaluator
+alert_index = AlertIndex()
+# Persistent alert storage, kept in sync with the index
+alert_store = AlertStore(index=alert_index)
 
 # Alert model
 class AlertBase(BaseModel):
@@ -111,92 +84,244 @@ class Alert(AlertBase):
     id: str
     created_at: str
     status: str = "active"
-
-# Background task to check alerts
-async def check_alerts(background_tasks: BackgroundTasks):
-    # Store last prices to detect crosses
-    last_prices = {}
+    triggered_at: Optional[str] = None
+    triggered_price: Optional[float] = None
+    detection_latency_ms: Optional[float] = None  # price time -> trigger time
+
+def notify_triggered(alert: dict, current_price: float):
+    """Queue the Discord notification for a triggered alert"""
+    if not alert["notifyDiscord"]:
+        return
+    # Format condition message
+    condition_display = "reached"
+    if alert["condition"] == "above":
+        condition_display = "risen above"
+    elif alert["condition"] == "below":
+        condition_display = "fallen below"
+    elif alert["condition"] == "crosses":
+        condition_display = "crossed"
     
-    while True:
-        for alert in alerts:
-            if alert["status"] != "active":
-                continue
-                
-            try:
-                symbol = alert["symbol"]
-                current_price = await exchange_service.get_current_price(symbol)
-                alert_value = float(alert["value"])
-                last_price = last_prices.get(f"{symbol}_{alert['id']}", current_price)
-                
-                print(f"CROSS DEBUG: Checking alert: {alert['id']}, {symbol}, {alert['condition']} {alert_value}, current={current_price}, last={last_price}")
-                
-                is_triggered = False
-                
-                # Handle different conditions
-                if alert["condition"] == "above" and current_price > alert_value:
-                    print(f"CROSS DEBUG: Above condition met")
-                    is_triggered = True
-                elif alert["condition"] == "below" and current_price < alert_value:
-                    print(f"CROSS DEBUG: Below condition met")
-                    is_triggered = True
-                elif alert["condition"] == "crosses":
-                    # Check if price crossed the threshold
-                    crossed_up = last_price < alert_value and current_price >= alert_value
-                    crossed_down = last_price > alert_value and current_price <= alert_value
-                    
-                    if crossed_up or crossed_down:
-                        print(f"CROSS DEBUG: Crosses condition met - price crossed from {last_price} to {current_price}, threshold={alert_value}")
-                        is_triggered = True
-                    else:
-                        # Also check if price is very close to the threshold
-                        diff = abs(current_price - alert_value)
-                        threshold = max(0.001 * alert_value, 0.5)  # 0.1% or 0.5 units
-                        
-                        if diff < threshold:
-                            print(f"CROSS DEBUG: Crosses condition met - price {current_price} is very close to threshold {alert_value}")
-                            is_triggered = True
-                
-                # Update last price for next check
-                last_prices[f"{symbol}_{alert['id']}"] = current_price
-                
-                if is_triggered:
-                    print(f"CROSS DEBUG: Alert triggered! {symbol} {alert['condition']} {alert_value}")
-                    alert["status"] = "triggered"
-                    if alert["notifyDiscord"]:
-                        # Format condition message
-                        condition_display = "reached"
-                        if alert["condition"] == "above":
-                            condition_display = "risen above"
-                        elif alert["condition"] == "below":
-                            condition_display = "fallen below"
-                        elif alert["condition"] == "crosses":
-                            condition_display = "crossed"
-                        
-                        message = f"🚨 Alert triggered: {symbol} has {condition_display} {alert_value} (Current price: {current_price})"
-                        await discord_service.send_message(message)
-            except Exception as e:
-                print(f"Error checking alert {alert['id']}: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                
-        await asyncio.sleep(10)  # Check every 10 seconds
+    message = f"🚨 Alert triggered: {alert['symbol']} has {condition_display} {float(alert['value'])} (Current price: {current_price})"
+    # Sent in batches by the queue's worker, so evaluation never waits on Discord
+    discord_queue.enqueue(
+        discord_service.alert_embed(alert["symbol"], alert["type"], condition_display, alert["value"], current_price),
+        content=message,
+        # Same signature routes/alerts.py uses, so a frontend-reported trigger
+        # of the same alert isn't sent twice
+        dedup_key=f"{alert['symbol']}:{alert['condition']}:{float(alert['value'])}",
+    )
+
+def on_alert_triggered(alert_id: str, current_price: float, last_price: Optional[float],
+                       price_time: float, triggered_at: float):
+    """Called by the alert evaluator for every alert a price update triggers"""
+    claim = alert_store.mark_triggered(
+        alert_id,
+        triggered_at=datetime.fromtimestamp(triggered_at).isoformat(),
+        triggered_price=current_price,
+        detection_latency_ms=round(max(triggered_at - price_time, 0.0) * 1000, 3),
+    )
+    # The database claim runs off the event loop; notify once it has succeeded
+    claim.add_done_callback(lambda done: on_alert_claimed(alert_id, done, current_price, last_price))
+
+def on_alert_claimed(alert_id: str, claim: asyncio.Future, current_price: float, last_price: Optional[float]):
+    alert = None if claim.cancelled() else claim.result()
+    if alert is None:
+        return  # deleted, already claimed by another worker, or not saved
+    logger.info(f"Alert triggered: {alert_id} {alert['symbol']} {alert['condition']} {alert['value']} "
+                f"(price {last_price} -> {current_price}, detected in {alert['detection_latency_ms']}ms)")
+    notify_triggered(alert, current_price)
+
+alert_evaluator = AlertEvaluator(exchange_service, alert_index, on_alert_triggered)
+
+# "stream" pushes prices and klines over the exchange websocket for every
+# symbol with price viewers or active alerts; "rest" only polls
+price_ingestion = os.getenv("PRICE_INGESTION", "rest").lower()
+stream_ingestor = StreamIngestor(exchange_service, symbol_sources=[lambda: price_hub.subscribers, alert_index.symbols])
+
+def _by_result(stats, results):
+    return [((result,), stats[result]) for result in results]
+
+def _candle_hit_ratio(stats) -> float:
+    served = stats["hits"] + stats["tail_refreshes"]
+    total = served + stats["store_loads"] + stats["full_loads"]
+    return served / total if total else 0.0
+
+# Counters and gauges read from the services' own stats when /metrics is
+# scraped; the latency histograms are observed in place (services/metrics.py)
+REGISTRY.collected(
+    "exchange_price_cache_lookups_total", "get_current_price lookups by outcome", "counter",
+    lambda: _by_result(exchange_service.price_cache_stats(), ("hits", "stale_hits", "coalesced", "misses")),
+    ("result",))
+REGISTRY.collected(
+    "exchange_price_cache_hit_ratio", "Share of price lookups answered without their own upstream request", "gauge",
+    lambda: [((), exchange_service.price_cache_stats()["hit_ratio"])])
+REGISTRY.collected(
+    "candle_cache_lookups_total", "get_candles lookups by how the history was obtained", "counter",
+    lambda: _by_result(exchange_service.candle_cache.info(), ("hits", "tail_refreshes", "store_loads", "full_loads")),
+    ("result",))
+REGISTRY.collected(
+    "candle_cache_hit_ratio", "Share of get_candles lookups served from cached history", "gauge",
+    lambda: [((), _candle_hit_ratio(exchange_service.candle_cache.info()))])
+REGISTRY.collected(
+    "candle_cache_bytes", "Memory held by cached candle history", "gauge",
+    lambda: [((), exchange_service.candle_cache.info()["bytes"])])
+REGISTRY.collected(
+    "exchange_upstream_weight_used", "Request weight used in the current minute", "gauge",
+    lambda: [((), exchange_service.scheduler.info()["weight_used"])])
+REGISTRY.collected(
+    "exchange_upstream_circuit_open", "Whether a host's circuit breaker for an endpoint is open", "gauge",
+    lambda: [((host["host"], endpoint), int(breaker["state"] != "closed"))
+             for host in exchange_service.upstream.info()["hosts"] for endpoint, breaker in host["endpoints"].items()],
+    ("host", "endpoint"))
+REGISTRY.collected(
+    "price_ws_subscribers", "Live price websocket subscribers by symbol", "gauge",
+    lambda: [((symbol,), len(sockets)) for symbol, sockets in list(price_hub.subscribers.items())],
+    ("symbol",))
+REGISTRY.collected(
+    "alert_evaluations_total", "Price updates evaluated against the alert index", "counter",
+    lambda: [((), alert_evaluator.stats["evaluations"])])
+REGISTRY.collected(
+    "alerts_triggered_total", "Alerts triggered", "counter",
+    lambda: [((), alert_evaluator.stats["triggered"])])
+REGISTRY.collected(
+    "alerts_active", "Active alerts being evaluated", "gauge",
+    lambda: [((), len(alert_index))])
+REGISTRY.collected(
+    "discord_queue_depth", "Discord notifications waiting to be sent", "gauge",
+    lambda: [((), discord_queue.info()["depth"])])
+REGISTRY.collected(
+    "discord_notifications_total", "Discord notifications by outcome", "counter",
+    lambda: [((outcome,), discord_queue.stats[outcome])
+             for outcome in ("enqueued", "deduplicated", "dropped", "sent_embeds", "failed_embeds")],
+    ("outcome",))
+REGISTRY.collected(
+    "discord_rate_limited_total", "Discord webhook 429 responses", "counter",
+    lambda: [((), discord_queue.stats["rate_limited"])])
 
 @app.on_event("startup")
 async def startup_event():
-    background_tasks = BackgroundTasks()
-    background_tasks.add_task(check_alerts, background_tasks)
+    # Open the shared upstream and webhook connection pools before serving requests
+    await exchange_service.start()
+    await discord_service.start()
+    
+    # Follow alert changes made by other workers, and evaluate alerts as
+    # prices arrive, for the lifetime of the app
+    alert_store.start()
+    discord_queue.start()
+    alert_evaluator.start()
+    if price_ingestion == "stream":
+        stream_ingestor.start()
+    # Resume backfill jobs a restart interrupted
+    if exchange_service.candle_store is not None:
+        backfill_manager.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stream_ingestor.close()
+    await backfill_manager.close()
+    await alert_evaluator.close()
+    await alert_store.close()
+    await discord_queue.close()
+    await discord_service.close()
+    await price_hub.close()
+    await exchange_service.close()
+    # Write out whatever is still queued
+    stop_logging()
 
 # API routes
 @app.get("/api/candles")
-async def get_candles(symbol: str, timeframe: str):
+async def get_candles(
+    request: Request,
+    symbol: str,
+    timeframe: str,
+    limit: int = Query(5000, ge=1, le=ExchangeService.MAX_CANDLES),
+    format: str = Query("rows", pattern="^(rows|columns)$"),
+    start: Optional[int] = Query(None, description="Only stored candles opening at or after this time (seconds)"),
+    end: Optional[int] = Query(None, description="Only stored candles opening at or before this time (seconds)"),
+):
+    """
+    Candles for a symbol, as a list of {time, open, high, low, close, volume}
+    rows (default) or, with format=columns, as {"time": [...], "open": [...], ...}.
+    Clients sending `Accept: application/vnd.candles` (or application/octet-stream)
+    get the packed binary columns described in services/candles.py instead.
+    
+    With start and/or end, the latest `limit` candles in that range are read
+    from the local candle store (see CANDLE_STORE_DIR) rather than the exchange.
+    """
     try:
-        return await exchange_service.get_candles(symbol, timeframe)
+        accept = request.headers.get("accept", "")
+        binary = BINARY_MEDIA_TYPE in accept or "application/octet-stream" in accept
+        if start is not None or end is not None:
+            candles = exchange_service.get_stored_candles(symbol, timeframe, start, end, limit)
+            if binary:
+                return Response(content=encode_binary_message([candles.to_binary_block()]),
+                                media_type=BINARY_MEDIA_TYPE, headers={"Vary": "Accept"})
+        elif binary:
+            body = await exchange_service.get_candles_binary(symbol, timeframe, limit)
+            return Response(content=body, media_type=BINARY_MEDIA_TYPE, headers={"Vary": "Accept"})
+        else:
+            candles = await exchange_service.get_candle_columns(symbol, timeframe, limit)
+        # Serialize directly; the payload is plain lists/dicts so FastAPI's encoder pass is wasted work
+        if format == "columns":
+            return JSONResponse(candles.to_columns(), headers={"Vary": "Accept"})
+        return JSONResponse(candles.to_rows(), headers={"Vary": "Accept"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/indicators")
+async def get_indicators(
+    symbol: str,
+    timeframe: str,
+    specs: str = Query(..., description="Comma-separated indicators, e.g. ema:9,ema:21,rsi:14,macd:12:26:9,bb:20:2,atr:14,vwap"),
+    limit: int = Query(5000, ge=1, le=ExchangeService.MAX_CANDLES),
+):
+    """
+    Technical indicators computed server-side over the cached candles.
+    Values line up with the returned `time` column; null where there isn't
+    enough history yet.
+    """
+    try:
+        return JSONResponse(await indicator_engine.get_indicators(symbol, timeframe, specs, limit))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/indicators/live")
+async def get_live_indicators(
+    symbol: str,
+    timeframe: str,
+    specs: str = Query(..., description="Comma-separated indicators, e.g. ema:9,rsi:14,macd:12:26:9,bb:20:2"),
+):
+    """
+    Latest indicator values including the forming candle, kept up to date
+    incrementally from live prices instead of recomputing over the history.
+    Supports ema, sma, rsi, macd and bb.
+    """
+    try:
+        return JSONResponse(await indicator_streams.get_values(symbol, timeframe, specs))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/alerts", response_model=List[Alert])
-async def get_alerts():
-    return alerts
+async def get_alerts(
+    response: Response,
+    symbol: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+):
+    """Alerts in creation order; the total matching count is in X-Total-Count"""
+    page, total = await alert_store.query(symbol=symbol, status=status, limit=limit, offset=offset)
+    response.headers["X-Total-Count"] = str(total)
+    return page
+
+@app.get("/api/alerts/latency")
+async def get_alert_latency():
+    """Detection latency of recently triggered alerts, from price time to trigger time"""
+    return alert_evaluator.latency_stats()
 
 @app.post("/api/alerts", response_model=Alert)
 async def create_alert(alert_data: AlertBase):
@@ -206,34 +331,33 @@ async def create_alert(alert_data: AlertBase):
         "created_at": datetime.now().isoformat(),
         "status": "active"
     }
-    alerts.append(new_alert)
-    return new_alert
+    return await alert_store.create(new_alert)
 
 @app.delete("/api/alerts/{alert_id}")
 async def delete_alert(alert_id: str):
-    for i, alert in enumerate(alerts):
-        if alert["id"] == alert_id:
-            alerts.pop(i)
-            return {"message": "Alert deleted successfully"}
+    if await alert_store.delete(alert_id):
+        return {"message": "Alert deleted successfully"}
     raise HTTPException(status_code=404, detail="Alert not found")
 
 @app.put("/api/alerts/{alert_id}", response_model=Alert)
 async def update_alert(alert_id: str, alert_data: AlertBase):
-    for i, alert in enumerate(alerts):
-        if alert["id"] == alert_id:
-            # Keep the original id, created_at, and status
-            updated_alert = {
-                **alert_data.dict(),
-                "id": alert_id,
-                "created_at": alert["created_at"],
-                "status": alert["status"]  # Preserve the alert's current status
-            }
-            # Replace the alert with the updated version
-            alerts[i] = updated_alert
-            return updated_alert
+    alert = alert_store.get(alert_id)
+    if alert is None:
+        raise HTTPException(status_code=404, detail="Alert not found")
     
-    # If we reach here, the alert wasn't found
-    raise HTTPException(status_code=404, detail="Alert not found")
+    # Keep the original id, created_at, status and trigger details
+    updated_alert = {
+        **alert_data.dict(),
+        "id": alert_id,
+        "created_at": alert["created_at"],
+        "status": alert["status"],  # Preserve the alert's current status
+        "triggered_at": alert.get("triggered_at"),
+        "triggered_price": alert.get("triggered_price"),
+        "detection_latency_ms": alert.get("detection_latency_ms")
+    }
+    if not await alert_store.update(updated_alert):
+        raise HTTPException(status_code=404, detail="Alert not found")
+    return updated_alert
 
 @app.get("/api/exchange/info")
 async def get_exchange_info():
@@ -249,11 +373,11 @@ async def verify_discord_webhook(request: Request):
     """Test the Discord webhook connectivity directly"""
     try:
         request_data = await request.json()
-        print(f"⚠️ DISCORD VERIFICATION REQUEST: {request_data}")
+        logger.debug("Discord verification request: %s", request_data)
         
         # Check if Discord webhook URL is configured
         if not discord_service.webhook_url:
-            print("⚠️ Discord webhook URL not configured")
+            logger.error("Discord webhook URL not configured")
             return JSONResponse(
                 status_code=400,
                 content={
@@ -263,7 +387,7 @@ async def verify_discord_webhook(request: Request):
             )
         
         webhook_url = discord_service.webhook_url
-        print(f"⚠️ Using Discord webhook URL: {webhook_url[:20]}...")
+        logger.debug("Using Discord webhook URL: %s...", webhook_url[:20])
         
         # Send a test message
         test_message = request_data.get("testMessage", "Discord webhook verification")
@@ -291,14 +415,14 @@ async def verify_discord_webhook(request: Request):
                 }]
             )
             
-            print(f"⚠️ Discord verification message sent successfully: {result}")
+            logger.info(f"Discord verification message sent: {result}")
             return {
                 "success": True, 
                 "message": "Discord webhook verified successfully",
                 "webhook": webhook_url[:20] + "..." if len(webhook_url) > 20 else webhook_url
             }
         except Exception as discord_error:
-            print(f"⚠️ Error sending verification to Discord: {discord_error}")
+            logger.error(f"Error sending verification to Discord: {discord_error}")
             import traceback
             traceback.print_exc()
             return JSONResponse(
@@ -310,7 +434,7 @@ async def verify_discord_webhook(request: Request):
                 }
             )
     except Exception as e:
-        print(f"⚠️ Server error in Discord verification: {str(e)}")
+        logger.error(f"Server error in Discord verification: {str(e)}")
         import traceback
         traceback.print_exc()
         return JSONResponse(
@@ -323,7 +447,7 @@ async def send_discord_direct(request: Request):
     """Send a message directly to Discord webhook"""
     try:
         message_data = await request.json()
-        print(f"⚠️ DIRECT DISCORD MESSAGE REQUEST: {message_data}")
+        logger.debug("Direct Discord message request: %s", message_data)
         
         content = message_data.get("content", "")
         embeds = message_data.get("embeds", [])
@@ -331,10 +455,10 @@ async def send_discord_direct(request: Request):
         # Send directly to Discord
         try:
             result = await discord_service.send_message(content=content, embeds=embeds)
-            print(f"⚠️ Direct Discord message sent successfully: {result}")
+            logger.info(f"Direct Discord message sent: {result}")
             return {"success": True, "message": "Message sent to Discord successfully"}
         except Exception as discord_error:
-            print(f"⚠️ Error sending direct message to Discord: {discord_error}")
+            logger.error(f"Error sending direct message to Discord: {discord_error}")
             import traceback
             traceback.print_exc()
             return JSONResponse(
@@ -346,7 +470,7 @@ async def send_discord_direct(request: Request):
                 }
             )
     except Exception as e:
-        print(f"⚠️ Server error in direct Discord message: {str(e)}")
+        logger.error(f"Server error in direct Discord message: {str(e)}")
         import traceback
         traceback.print_exc()
         return JSONResponse(
@@ -360,11 +484,11 @@ async def send_test_alert(request: Request):
     try:
         # Get raw request body for debugging
         raw_body = await request.body()
-        print(f"⚠️ Raw request body: {raw_body}")
+        logger.debug("Raw test-alert request body: %s", raw_body)
         
         # Parse the request body
         alert_data = await request.json()
-        print(f"⚠️ ALERT DEBUG - Received alert request: {alert_data}")
+        logger.debug("Received test-alert request: %s", alert_data)
         
         # Force this to send even if not real alert (for testing)
         force_send = alert_data.get("forceSend", False)
@@ -380,7 +504,7 @@ async def send_test_alert(request: Request):
         
         # Check if Discord webhook URL is configured
         if not discord_service.webhook_url:
-            print("⚠️ Discord webhook URL not configured")
+            logger.error("Discord webhook URL not configured")
             return JSONResponse(
                 status_code=400,
                 content={
@@ -389,7 +513,7 @@ async def send_test_alert(request: Request):
                 }
             )
         
-        print(f"⚠️ Using Discord webhook URL: {discord_service.webhook_url[:20]}...")
+        logger.debug("Using Discord webhook URL: %s...", discord_service.webhook_url[:20])
         
         # Create different messages for real alerts vs tests
         if is_real_alert:
@@ -413,7 +537,7 @@ async def send_test_alert(request: Request):
             content = f"🧪 Test Alert: {symbol} at price ${price}"
             color = 3447003  # Blue for test alerts
         
-        print(f"⚠️ Sending message to Discord: {content}")
+        logger.debug("Sending message to Discord: %s", content)
         
         # Try to send the message to Discord
         try:
@@ -454,10 +578,10 @@ async def send_test_alert(request: Request):
                     ]
                 }]
             )
-            print(f"⚠️ Discord message sent successfully: {result}")
+            logger.info(f"Discord test-alert message sent: {result}")
             return {"success": True, "message": f"Alert sent to Discord successfully"}
         except Exception as discord_error:
-            print(f"⚠️ Error sending to Discord: {discord_error}")
+            logger.error(f"Error sending to Discord: {discord_error}")
             import traceback
             traceback.print_exc()
             return JSONResponse(
@@ -469,7 +593,7 @@ async def send_test_alert(request: Request):
                 }
             )
     except Exception as e:
-        print(f"⚠️ Server error in test-alert: {str(e)}")
+        logger.error(f"Server error in test-alert: {str(e)}")
         import traceback
         traceback.print_exc()
         return JSONResponse(
@@ -501,6 +625,7 @@ async def debug_env():
 app.include_router(prices_router, prefix="/api/prices", tags=["prices"])
 app.include_router(alerts_router, prefix="/api/alerts", tags=["alerts"])
 app.include_router(discord_router, prefix="/api/discord", tags=["discord"])
+app.include_router(backfill_router, prefix="/api/backfill", tags=["backfill"])
 
 @app.get("/")
 async def root():
@@ -510,6 +635,16 @@ async def root():
 async def get_status():
     return {"status": "ok", "version": "1.0.0"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Latency histograms and counters in the Prometheus text format"""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/api/upstream")
+async def get_upstream_budget():
+    """Upstream request-weight budget by priority, host latencies and circuit breaker states"""
+    return exchange_service.upstream_info()
+
 # Add a diagnostic endpoint
 @app.get("/api/diagnostic")
 async def diagnostic():
@@ -524,7 +659,16 @@ async def diagnostic():
             "price_check": {
                 "symbol": "BTCUSDT",
                 "price": btc_price
-            }
+            },
+            "price_cache": exchange.price_cache_stats(),
+            "upstream": exchange.upstream_info(),
+            "candle_cache": exchange.candle_cache.info(),
+            "candle_rollup": exchange.rollup.info(),
+            "candle_store": exchange.candle_store.info() if exchange.candle_store is not None else None,
+            "indicator_streams": indicator_streams.info(),
+            "indicator_cache": indicator_engine.info(),
+            "price_ingestion": {"mode": price_ingestion, **stream_ingestor.info()},
+            "logging": logging_info(),
         }
     except Exception as e:
         logger.error(f"Diagnostic failed: {str(e)}")
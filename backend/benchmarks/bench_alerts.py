@@ -0,0 +1,113 @@
+"""
+Micro-benchmark: evaluating one price update against 10, 1k and 100k active
+alerts, with the original check_alerts loop (every alert, every cycle) as
+the baseline for the AlertIndex/AlertEvaluator path that replaced it.
+
+Run from the backend directory:
+
+    python benchmarks/bench_alerts.py -o alerts.json
+"""
+import os
+import random
+import sys
+import time
+
+import pyperf
+
+# pyperf re-executes this file in worker processes, so make the backend importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.alert_evaluator import AlertEvaluator
+from services.alert_index import AlertIndex
+
+SYMBOL = "BTCUSDT"
+PRICE = 65000.0
+SIZES = (10, 1000, 100_000)
+
+def make_alerts(count, seed=42, triggering=0.0):
+    """
+    Alerts on one symbol, none near PRICE except a `triggering` share of the
+    above/crosses ones placed just below it, which a move from PRICE - 200
+    to PRICE fires
+    """
+    rng = random.Random(seed)
+    alerts = []
+    for i in range(count):
+        condition = ("above", "below", "crosses")[i % 3]
+        if condition != "below" and rng.random() < triggering:
+            value = PRICE - rng.uniform(1, 50)
+        elif condition == "below":
+            value = rng.uniform(50_000, 60_000)
+        else:
+            value = rng.uniform(70_000, 80_000)
+        alerts.append({"id": f"alert-{i}", "symbol": SYMBOL, "condition": condition, "value": str(value),
+                       "status": "active", "notifyDiscord": False})
+    return alerts
+
+def legacy_check_alerts(alerts, prices, last_prices):
+    """One cycle of the original check_alerts loop, minus its awaits and prints"""
+    triggered = []
+    for alert in alerts:
+        if alert["status"] != "active":
+            continue
+        symbol = alert["symbol"]
+        current_price = prices[symbol]
+        alert_value = float(alert["value"])
+        last_price = last_prices.get(f"{symbol}_{alert['id']}", current_price)
+        is_triggered = False
+        if alert["condition"] == "above" and current_price > alert_value:
+            is_triggered = True
+        elif alert["condition"] == "below" and current_price < alert_value:
+            is_triggered = True
+        elif alert["condition"] == "crosses":
+            crossed_up = last_price < alert_value and current_price >= alert_value
+            crossed_down = last_price > alert_value and current_price <= alert_value
+            if crossed_up or crossed_down or abs(current_price - alert_value) < max(0.001 * alert_value, 0.5):
+                is_triggered = True
+        last_prices[f"{symbol}_{alert['id']}"] = current_price
+        if is_triggered:
+            triggered.append(alert["id"])
+    return triggered
+
+def evaluator_for(alerts, on_trigger=lambda *args: None):
+    index = AlertIndex()
+    index.rebuild(alerts)
+    return AlertEvaluator(None, index, on_trigger, poll_interval=0)
+
+def bench_quiet_tick(loops, count):
+    """A price update that triggers nothing: the steady state"""
+    evaluator = evaluator_for(make_alerts(count))
+    price_time = time.time()
+    started = time.perf_counter()
+    for i in range(loops):
+        evaluator.evaluate(SYMBOL, PRICE + (i % 20) - 10, price_time)
+    return time.perf_counter() - started
+
+def bench_triggering_tick(loops, count):
+    """A price update that fires about 1% of the alerts (re-armed, untimed, after every loop)"""
+    alerts = make_alerts(count, triggering=0.015)
+    by_id = {alert["id"]: alert for alert in alerts}
+    fired = []
+    evaluator = evaluator_for(alerts, lambda alert_id, *args: fired.append(alert_id))
+    elapsed = 0.0
+    for _ in range(loops):
+        evaluator.evaluate(SYMBOL, PRICE - 200, time.time())  # away from every threshold
+        started = time.perf_counter()
+        evaluator.evaluate(SYMBOL, PRICE, time.time())
+        elapsed += time.perf_counter() - started
+        for alert_id in fired:
+            evaluator.index.add(by_id[alert_id])
+        fired.clear()
+    return elapsed
+
+def main():
+    runner = pyperf.Runner()
+    runner.metadata["description"] = "Alert evaluation per price update: legacy check_alerts loop vs AlertIndex"
+    for size in SIZES:
+        alerts = make_alerts(size)
+        runner.bench_func(f"alerts_legacy_cycle_{size}", legacy_check_alerts, alerts, {SYMBOL: PRICE}, {})
+        runner.bench_time_func(f"alerts_index_quiet_tick_{size}", bench_quiet_tick, size)
+        runner.bench_time_func(f"alerts_index_triggering_tick_{size}", bench_triggering_tick, size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Micro-benchmarks: Discord notification dedup, for direct sends through
+DiscordService.send_message and for DiscordQueue.enqueue, plus one real
+webhook round trip to a local stand-in (benchmarks/standin.py) for scale.
+
+Run from the backend directory:
+
+    python benchmarks/bench_discord.py -o discord.json
+"""
+import asyncio
+import atexit
+import logging
+import os
+import sys
+import time
+
+import pyperf
+
+# pyperf re-executes this file in worker processes, so make the backend importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.standin import start_in
+from services.dedup_cache import DedupCache
+from services.discord_queue import DiscordQueue
+from services.discord_service import DiscordService
+
+EMBED = {
+    "title": "🚨 Price Alert Triggered: BTCUSDT",
+    "description": "BTCUSDT price is above 65000.00",
+    "color": 0x00FF00,
+    "fields": [
+        {"name": "Current Price", "value": "65012.50", "inline": True},
+        {"name": "Alert Value", "value": "65000.00", "inline": True},
+        {"name": "Condition", "value": "above", "inline": True},
+    ],
+    "timestamp": "2024-01-01T00:00:00",
+}
+
+def setup():
+    # Time the dedup itself, not a synchronous stderr write per skipped duplicate
+    logging.getLogger("discord_service").setLevel(logging.ERROR)
+    logging.getLogger("discord_queue").setLevel(logging.ERROR)
+    service = DiscordService()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    standin = start_in(loop)
+    service.webhook_url = f"{standin.url}/webhook"
+    service.recent_alerts = DedupCache(3600)  # duplicates stay duplicates for the whole run
+    atexit.register(lambda: loop.run_until_complete(teardown(service, standin)))
+    return service, loop
+
+async def teardown(service, standin):
+    await service.close()
+    await standin.close()
+
+def bench_send_new(loops, service, loop):
+    """A message not seen before: dedup miss plus the webhook POST"""
+    started = time.perf_counter()
+    for i in range(loops):
+        loop.run_until_complete(service.send_message(f"alert {time.monotonic_ns()}-{i}", [EMBED]))
+    return time.perf_counter() - started
+
+def bench_send_duplicate(loops, service, loop):
+    """A repeat within the dedup window: skipped before any I/O"""
+    loop.run_until_complete(service.send_message("alert duplicate", [EMBED]))
+
+    async def sends():
+        started = time.perf_counter()
+        for _ in range(loops):
+            await service.send_message("alert duplicate", [EMBED])
+        return time.perf_counter() - started
+
+    return loop.run_until_complete(sends())
+
+def bench_enqueue_duplicate(loops, service, loop):
+    """A repeat of a queued notification, keyed on its content and embed"""
+    async def enqueues():
+        queue = DiscordQueue(service, max_size=10)
+        queue._recent = DedupCache(3600)
+        queue.enqueue(EMBED, "alert duplicate")
+        started = time.perf_counter()
+        for _ in range(loops):
+            queue.enqueue(EMBED, "alert duplicate")
+        return time.perf_counter() - started
+
+    return loop.run_until_complete(enqueues())
+
+def main():
+    runner = pyperf.Runner()
+    runner.metadata["description"] = "Discord notification dedup and webhook delivery against a local stand-in"
+    service, loop = setup()
+    runner.bench_time_func("discord_send_new", bench_send_new, service, loop)
+    runner.bench_time_func("discord_send_duplicate", bench_send_duplicate, service, loop)
+    runner.bench_time_func("discord_enqueue_duplicate", bench_enqueue_duplicate, service, loop)
+
+if __name__ == "__main__":
+    main()
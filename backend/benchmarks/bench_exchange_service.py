@@ -0,0 +1,80 @@
+"""
+Micro-benchmarks: ExchangeService hot paths against a local stand-in
+exchange (benchmarks/standin.py), plus serializing a 5000-candle response
+the way /api/candles does.
+
+Run from the backend directory:
+
+    python benchmarks/bench_exchange_service.py -o exchange_service.json
+"""
+import asyncio
+import atexit
+import os
+import sys
+import time
+
+import pyperf
+
+# pyperf re-executes this file in worker processes, so make the backend importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Never read or write a candle store from a benchmark
+os.environ["CANDLE_STORE_DIR"] = ""
+
+from fastapi.responses import JSONResponse
+
+from benchmarks.standin import start_in
+from services.candles import encode_binary_message
+from services.exchange_service import ExchangeService
+
+SYMBOL = "BTCUSDT"
+INTERVAL = "1h"
+LIMIT = 5000
+
+def setup():
+    service = ExchangeService()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    standin = start_in(loop)
+    service.base_url = standin.url  # a single host: the stand-in
+    service.candle_tail_ttl = float("inf")  # warm reads never go back upstream
+    service.candle_rollup = False  # time the native path
+    atexit.register(lambda: loop.run_until_complete(teardown(service, standin)))
+    return service, loop
+
+async def teardown(service, standin):
+    await service.close()
+    await standin.close()
+
+def bench_cold_load(loops, service, loop):
+    """Full 5000-candle history load: five kline pages from the stand-in, parsed and cached"""
+    elapsed = 0.0
+    for _ in range(loops):
+        service.candle_cache._entries.pop((SYMBOL, INTERVAL), None)
+        started = time.perf_counter()
+        loop.run_until_complete(service.get_candle_columns(SYMBOL, INTERVAL, LIMIT))
+        elapsed += time.perf_counter() - started
+    return elapsed
+
+def main():
+    runner = pyperf.Runner()
+    runner.metadata["description"] = "ExchangeService hot paths against a local stand-in exchange"
+    service, loop = setup()
+    candles = loop.run_until_complete(service.get_candle_columns(SYMBOL, INTERVAL, LIMIT))
+    rows = candles.to_rows()
+    assert len(candles) == LIMIT
+
+    runner.bench_func("simulated_price", service._generate_simulated_price, SYMBOL)
+    runner.bench_func(f"simulated_candles_{LIMIT}_cached", service._generate_simulated_candles, SYMBOL, INTERVAL, LIMIT)
+    runner.bench_func(f"simulated_candles_{LIMIT}_seeded", service._generate_simulated_candles, SYMBOL, INTERVAL, LIMIT, 42)
+
+    runner.bench_time_func(f"get_candles_{LIMIT}_cold", bench_cold_load, service, loop)
+    runner.bench_func(f"get_candles_{LIMIT}_warm",
+                      lambda: loop.run_until_complete(service.get_candles(SYMBOL, INTERVAL, LIMIT)))
+    runner.bench_func(f"candle_rows_{LIMIT}", candles.to_rows)
+
+    runner.bench_func(f"json_rows_{LIMIT}", JSONResponse, rows)
+    runner.bench_func(f"json_columns_{LIMIT}", lambda: JSONResponse(candles.to_columns()))
+    runner.bench_func(f"binary_{LIMIT}", lambda: encode_binary_message([candles.to_binary_block()]))
+
+if __name__ == "__main__":
+    main()
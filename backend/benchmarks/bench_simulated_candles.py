@@ -0,0 +1,94 @@
+"""
+Micro-benchmark: simulated candle generation, original per-candle loop vs the
+vectorized generator in services/candle_simulator.py.
+
+Run from the backend directory:
+
+    python benchmarks/bench_simulated_candles.py -o simulated_candles.json
+"""
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pyperf
+
+# pyperf re-executes this file in worker processes, so make the backend importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.candle_simulator import simulate_candles, symbol_volatility
+
+SYMBOL = "BTCUSDT"
+BASE_PRICE = 65000.0
+INTERVAL_SECONDS = 3600
+SIZES = (500, 5000, 50000)
+
+def legacy_simulated_candles(symbol, base_price, interval_seconds, limit):
+    """The generator as it was before vectorization, kept here as the baseline"""
+    candles = []
+    now = int(time.time())
+    current_time = now - (interval_seconds * limit)
+    price = base_price * random.uniform(0.8, 1.2)
+    volatility = symbol_volatility(symbol)
+    market_trend = random.choice([1, -1])
+    trend_strength = random.uniform(0.1, 0.3)
+
+    for i in range(limit):
+        trend_factor = market_trend * trend_strength * random.uniform(0.5, 1.5)
+        random_factor = random.uniform(-1, 1) * volatility
+        cycle_position = (i % 20) / 20
+        cycle_factor = 0.005 * math.sin(cycle_position * 2 * math.pi)
+        price_change = price * (trend_factor + random_factor + cycle_factor)
+
+        candle_open = price
+        candle_close = price + price_change
+        price_range = abs(candle_close - candle_open) * random.uniform(1.2, 2.0)
+        if candle_open > candle_close:
+            candle_high = candle_open + (price_range * random.uniform(0.1, 0.4))
+            candle_low = candle_close - (price_range * random.uniform(0.6, 0.9))
+        else:
+            candle_high = candle_close + (price_range * random.uniform(0.6, 0.9))
+            candle_low = candle_open - (price_range * random.uniform(0.1, 0.4))
+
+        base_volume = base_price * random.uniform(10, 100)
+        volume_factor = 1 + (abs(price_change) / price) * random.uniform(5, 15)
+
+        candles.append({
+            "time": current_time,
+            "open": candle_open,
+            "high": candle_high,
+            "low": candle_low,
+            "close": candle_close,
+            "volume": base_volume * volume_factor,
+        })
+        current_time += interval_seconds
+        price = candle_close
+        if random.random() < 0.05:
+            market_trend *= -1
+        if random.random() < 0.1:
+            trend_strength = random.uniform(0.1, 0.3)
+
+    return candles
+
+def vectorized_simulated_candles(symbol, base_price, interval_seconds, limit, seed=42):
+    rng = np.random.default_rng(seed)
+    start_time = int(time.time()) // interval_seconds * interval_seconds - (limit - 1) * interval_seconds
+    candles, _ = simulate_candles(
+        rng, limit, start_time, interval_seconds,
+        base_price * rng.uniform(0.8, 1.2), base_price, symbol_volatility(symbol),
+    )
+    return candles
+
+def main():
+    runner = pyperf.Runner()
+    runner.metadata["description"] = "Simulated candle generation: legacy loop vs vectorized"
+    for size in SIZES:
+        runner.bench_func(f"simulated_candles_legacy_{size}", legacy_simulated_candles,
+                          SYMBOL, BASE_PRICE, INTERVAL_SECONDS, size)
+        runner.bench_func(f"simulated_candles_vectorized_{size}", vectorized_simulated_candles,
+                          SYMBOL, BASE_PRICE, INTERVAL_SECONDS, size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Local stand-in for the Binance REST API (and a Discord webhook) for the
+benchmarks, so they measure our code rather than the network and give the
+same answers on every run.
+
+Klines are generated from their open time alone, so any page of any series
+is reproducible; prices are fixed per symbol.
+"""
+import asyncio
+import json
+import time
+
+import numpy as np
+from aiohttp import web
+
+INTERVAL_SECONDS = {"1m": 60, "5m": 300, "15m": 900, "1h": 3600, "4h": 14400, "1d": 86400}
+PRICES = {"BTCUSDT": 65000.0, "ETHUSDT": 3500.0, "SOLUSDT": 140.0}
+
+def kline_rows(interval: str, start_ms: int, end_ms: int, limit: int) -> list:
+    seconds = INTERVAL_SECONDS[interval]
+    now = int(time.time()) // seconds * seconds
+    last = min(end_ms // 1000 // seconds * seconds, now)
+    first = max(-(-start_ms // 1000 // seconds) * seconds, last - (limit - 1) * seconds)
+    times = np.arange(first, last + 1, seconds, dtype=np.int64)
+    close = 65000.0 + 500.0 * np.sin(times / 86400.0) + (times % 997) * 0.25
+    open_ = close - 12.5
+    # Prices and volumes as strings, like Binance sends them
+    return [[int(t) * 1000, f"{o:.2f}", f"{h:.2f}", f"{l:.2f}", f"{c:.2f}", f"{v:.5f}", int(t) * 1000 + seconds * 1000 - 1]
+            for t, o, h, l, c, v in zip(times.tolist(), open_.tolist(), (close + 40).tolist(),
+                                        (open_ - 40).tolist(), close.tolist(), (close / 1000).tolist())]
+
+class StandIn:
+    """
+    Serves /api/v3/klines, /api/v3/ticker/price, /api/v3/ping and /webhook on 127.0.0.1.
+
+    The webhook records every payload with its monotonic arrival time and
+    answers 204, or the next (status, headers, JSON body or None) queued in
+    webhook_replies.
+    """
+
+    def __init__(self):
+        self.runner = None
+        self.url = None
+        self.requests = 0
+        self.webhook_posts = []
+        self.webhook_replies = []
+
+    async def klines(self, request):
+        self.requests += 1
+        query = request.query
+        end = int(query.get("endTime", int(time.time() * 1000)))
+        limit = int(query.get("limit", 500))
+        start = int(query.get("startTime", 0))
+        return web.json_response(kline_rows(query["interval"], start, end, limit))
+
+    async def ticker(self, request):
+        self.requests += 1
+        symbol = request.query.get("symbol")
+        if symbol is None:
+            return web.json_response([{"symbol": s, "price": str(p)} for s, p in PRICES.items()])
+        return web.json_response({"symbol": symbol, "price": str(PRICES.get(symbol, 100.0))})
+
+    async def ping(self, request):
+        return web.json_response({})
+
+    async def webhook(self, request):
+        self.webhook_posts.append((time.monotonic(), await request.json()))
+        if self.webhook_replies:
+            status, headers, body = self.webhook_replies.pop(0)
+            return web.Response(status=status, headers=headers, text=None if body is None else json.dumps(body),
+                                content_type=None if body is None else "application/json")
+        return web.Response(status=204)
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/api/v3/klines", self.klines)
+        app.router.add_get("/api/v3/ticker/price", self.ticker)
+        app.router.add_get("/api/v3/ping", self.ping)
+        app.router.add_post("/webhook", self.webhook)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        return self.url
+
+    async def close(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+def start_in(loop: asyncio.AbstractEventLoop) -> StandIn:
+    """Start a stand-in on `loop`; it serves whenever the loop runs"""
+    standin = StandIn()
+    loop.run_until_complete(standin.start())
+    return standin
@@ -1,18 +1,17 @@
 from fastapi import APIRouter, HTTPException, Depends, Path, BackgroundTasks
 from typing import Dict, Any, List, Optional
-from services.discord_service import DiscordService
+from services.dedup_cache import DedupCache
+from routes.discord import discord_queue, discord_service
 from pydantic import BaseModel
 import uuid
 import logging
-import time
 from datetime import datetime
 
 router = APIRouter()
 logger = logging.getLogger("alerts")
 
-# Create a simple in-memory deduplication cache
-recent_alerts = {}
-DEDUP_WINDOW = 5  # seconds
+# Alert signatures triggered within the Discord dedup window
+recent_alerts = DedupCache(discord_service.dedup_window)
 
 # Define models
 class AlertBase(BaseModel):
@@ -47,7 +46,6 @@ async def test_alert(background_tasks: BackgroundTasks):
     """Send a test alert to Discord"""
     logger.info("⚠️ Sending test alert to Discord")
     try:
-        discord_service = DiscordService()
         # Use background task to avoid blocking
         background_tasks.add_task(
             discord_service.send_alert,
@@ -69,28 +67,24 @@ async def trigger_alert(alert: AlertTrigger, background_tasks: BackgroundTasks):
     
     # Create alert signature for deduplication
     alert_sig = f"{alert.symbol}:{alert.condition}:{alert.targetPrice}"
-    current_time = time.time()
     
-    # Check for duplicate alert
-    if alert_sig in recent_alerts:
-        last_triggered = recent_alerts[alert_sig]
-        if current_time - last_triggered < DEDUP_WINDOW:
-            logger.info(f"⚠️ Duplicate alert prevented: {alert_sig}")
-            return {"success": True, "message": "Duplicate alert prevented"}
-    
-    # Store alert timestamp for deduplication
-    recent_alerts[alert_sig] = current_time
+    # Check for (and otherwise record) a duplicate alert
+    if not recent_alerts.check_and_add(alert_sig):
+        logger.info(f"⚠️ Duplicate alert prevented: {alert_sig}")
+        return {"success": True, "message": "Duplicate alert prevented"}
     
     try:
-        discord_service = DiscordService()
-        # Use background task to avoid blocking
-        background_tasks.add_task(
-            discord_service.send_alert,
-            symbol=alert.symbol,
-            alert_type="Price Alert",
-            condition=alert.condition,
-            value=str(alert.targetPrice),
-            current_price=alert.currentPrice
+        # Batched with other notifications by the outbound queue
+        discord_queue.enqueue(
+            discord_service.alert_embed(
+                symbol=alert.symbol,
+                alert_type="Price Alert",
+                condition=alert.condition,
+                value=str(alert.targetPrice),
+                current_price=alert.currentPrice
+            ),
+            content=f"@everyone Trading alert triggered for {alert.symbol}!",
+            dedup_key=alert_sig
         )
         logger.info(f"⚠️ Alert notification queued: {alert.symbol} {alert.condition} {alert.targetPrice}")
         return {
@@ -108,15 +102,17 @@ async def force_trigger_alert(request: ForceTriggerRequest, background_tasks: Ba
     logger.info(f"⚠️ Force triggering alert: {request.symbol} {request.condition} {request.value}")
     
     try:
-        discord_service = DiscordService()
-        # Use background task to avoid blocking
-        background_tasks.add_task(
-            discord_service.send_alert,
-            symbol=request.symbol,
-            alert_type="Force Triggered",
-            condition=request.condition,
-            value=str(request.value),
-            current_price=request.currentPrice
+        # Batched with other notifications by the outbound queue
+        discord_queue.enqueue(
+            discord_service.alert_embed(
+                symbol=request.symbol,
+                alert_type="Force Triggered",
+                condition=request.condition,
+                value=str(request.value),
+                current_price=request.currentPrice
+            ),
+            content=f"@everyone Trading alert triggered for {request.symbol}!",
+            dedup_key=f"force:{request.symbol}:{request.condition}:{request.value}:{request.currentPrice}"
         )
         logger.info(f"⚠️ Force triggered alert notification queued: {request.symbol}")
         return {
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException
+from typing import Dict, List, Any, Optional, Union
+from pydantic import BaseModel
+from services.exchange_service import ExchangeService
+from services.backfill import BackfillManager
+
+router = APIRouter()
+
+# Shared backfill manager (started by the app, which resumes checkpointed jobs)
+backfill_manager = BackfillManager(ExchangeService())
+
+class BackfillRequest(BaseModel):
+    symbols: List[str]
+    intervals: List[str]
+    start: Union[int, str]  # unix seconds or an ISO 8601 date
+    end: Optional[Union[int, str]] = None  # defaults to the present
+
+@router.post("", response_model=Dict[str, Any])
+async def create_backfill(request: BackfillRequest):
+    """Queue a download of kline history into the candle store"""
+    try:
+        job = await backfill_manager.submit(request.symbols, request.intervals, request.start, request.end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return backfill_manager.status(job["id"])
+
+@router.get("", response_model=Dict[str, Any])
+async def get_backfills():
+    """Every backfill job with its per-(symbol, interval) progress"""
+    return backfill_manager.status()
+
+@router.get("/{job_id}", response_model=Dict[str, Any])
+async def get_backfill(job_id: str):
+    job = backfill_manager.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Backfill job not found")
+    return job
+
+@router.delete("/{job_id}", response_model=Dict[str, Any])
+async def cancel_backfill(job_id: str):
+    """Stop a job after its current batch of pages; what it downloaded stays stored"""
+    job = await backfill_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Backfill job not found")
+    return backfill_manager.status(job_id)
@@ -1,13 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException
 from typing import Dict, Any, Optional
 from pydantic import BaseModel
 from services.discord_service import DiscordService
+from services.discord_queue import DiscordQueue
 import logging
 
 # Set up logging
 logger = logging.getLogger("discord_routes")
 router = APIRouter()
 
+# Shared Discord service (a singleton) and outbound queue for triggered-alert
+# notifications (both started by the app)
+discord_service = DiscordService()
+discord_queue = DiscordQueue(discord_service)
+
 # Model for Discord alert requests
 class DiscordAlertRequest(BaseModel):
     alertId: str
@@ -18,10 +24,7 @@ class DiscordAlertRequest(BaseModel):
     message: Optional[str] = None
 
 @router.post("/alert", response_model=Dict[str, Any])
-async def send_discord_alert(
-    alert_data: DiscordAlertRequest,
-    discord_service: DiscordService = Depends()
-):
+async def send_discord_alert(alert_data: DiscordAlertRequest):
     """
     Send an alert notification to Discord
     """
@@ -65,10 +68,7 @@ class TestWebhookRequest(BaseModel):
     message: str
 
 @router.post("/test-webhook", response_model=Dict[str, Any])
-async def test_discord_webhook(
-    request: TestWebhookRequest,
-    discord_service: DiscordService = Depends()
-):
+async def test_discord_webhook(request: TestWebhookRequest):
     """
     Test the Discord webhook by sending a simple message
     """
@@ -98,3 +98,8 @@ async def test_discord_webhook(
             status_code=500,
             detail=f"Discord webhook test failed: {str(e)}"
         )
+
+@router.get("/queue", response_model=Dict[str, Any])
+async def get_discord_queue():
+    """Outbound notification queue depth, drops, batching and rate-limit counters"""
+    return discord_queue.info()
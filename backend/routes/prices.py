@@ -1,6 +1,6 @@
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
 from services.exchange_service import ExchangeService
-import asyncio
+from services.price_hub import PriceHub
 import logging
 import random
 from datetime import datetime
@@ -32,6 +32,27 @@ def should_log(symbol):
         return True
     return False
 
+@router.get("")
+async def get_prices(symbols: str = Query(..., description="Comma-separated symbols, e.g. BTCUSDT,ETHUSDT")):
+    """Get current prices for several symbols, backed by one bulk upstream call"""
+    # Normalize and de-duplicate while keeping the requested order
+    symbol_list = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="No symbols provided")
+    
+    exchange_service = ExchangeService()
+    prices = await exchange_service.get_current_prices(symbol_list)
+    
+    # Keep the single-symbol fallback cache warm as well
+    price_cache.update(prices)
+    
+    return [{"symbol": symbol, "price": prices[symbol]} for symbol in symbol_list]
+
+@router.get("/cache/stats")
+async def get_price_cache_stats():
+    """Price cache hit/miss/coalesced counters, for tuning the price TTL"""
+    return ExchangeService().price_cache_stats()
+
 @router.get("/{symbol}")
 async def get_price(symbol: str):
     """Get current price for a symbol"""
@@ -75,84 +96,19 @@ async def get_price(symbol: str):
         logger.warning(f"Using fallback price for {symbol}: {fallback_price}")
         return {"symbol": symbol, "price": fallback_price, "fallback": True}
 
-# WebSocket connection manager with improved error handling
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections = {}
-        self.price_cache = {}
-        
-    async def connect(self, websocket: WebSocket, symbol: str):
-        await websocket.accept()
-        if symbol not in self.active_connections:
-            self.active_connections[symbol] = []
-        self.active_connections[symbol].append(websocket)
-        
-    def disconnect(self, websocket: WebSocket, symbol: str):
-        if symbol in self.active_connections:
-            try:
-                self.active_connections[symbol].remove(websocket)
-            except ValueError:
-                pass  # Already removed
-            
-    async def broadcast(self, symbol: str, data: dict):
-        if symbol in self.active_connections:
-            dead_connections = []
-            for connection in self.active_connections[symbol]:
-                try:
-                    await connection.send_json(data)
-                except Exception as e:
-                    logger.error(f"Error sending data to client: {str(e)}")
-                    dead_connections.append(connection)
-            
-            # Clean up dead connections
-            for dead in dead_connections:
-                try:
-                    self.active_connections[symbol].remove(dead)
-                except ValueError:
-                    pass  # Already removed
-
-manager = ConnectionManager()
+# One producer per symbol, fanned out to every connected websocket
+price_hub = PriceHub(ExchangeService())
 
 @router.websocket("/ws/{symbol}")
 async def websocket_endpoint(websocket: WebSocket, symbol: str):
-    await manager.connect(websocket, symbol)
-    exchange_service = ExchangeService()
-    
-    # Send initial price immediately upon connection
-    try:
-        price = await exchange_service.get_current_price(symbol)
-        await manager.broadcast(symbol, {"symbol": symbol, "price": price})
-    except Exception as e:
-        logger.error(f"Error fetching initial price for {symbol}: {str(e)}")
-        # Use fallback
-        fallback_price = 65000.0 if symbol == "BTCUSDT" else 3500.0 if symbol == "ETHUSDT" else 100.0
-        await manager.broadcast(symbol, {"symbol": symbol, "price": fallback_price, "fallback": True})
+    await websocket.accept()
+    await price_hub.subscribe(symbol, websocket)
     
     try:
+        # Prices are pushed by the hub; we only listen here to notice the disconnect
         while True:
-            try:
-                price = await exchange_service.get_current_price(symbol)
-                manager.price_cache[symbol] = price
-                await manager.broadcast(symbol, {"symbol": symbol, "price": price})
-            except Exception as e:
-                logger.error(f"Error in websocket for {symbol}: {str(e)}")
-                # Use cached price if available
-                if symbol in manager.price_cache:
-                    await manager.broadcast(symbol, {
-                        "symbol": symbol, 
-                        "price": manager.price_cache[symbol], 
-                        "cached": True
-                    })
-                else:
-                    # Generate fallback price
-                    fallback_price = 65000.0 if symbol == "BTCUSDT" else 3500.0 if symbol == "ETHUSDT" else 100.0
-                    variation = random.uniform(-0.005, 0.005)  # ±0.5% variation
-                    await manager.broadcast(symbol, {
-                        "symbol": symbol, 
-                        "price": fallback_price * (1 + variation), 
-                        "fallback": True
-                    })
-            
-            await asyncio.sleep(1)  # Update every second
+            await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect(websocket, symbol)
+        pass
+    finally:
+        await price_hub.unsubscribe(symbol, websocket)
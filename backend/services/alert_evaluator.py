@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Callable, Dict, Any, Optional, Tuple
+
+from services.alert_index import AlertIndex
+from services.metrics import ALERT_CYCLE_SECONDS, ALERT_DETECTION_SECONDS
+
+logger = logging.getLogger("alert_evaluator")
+
+# on_trigger(alert_id, price, previous_price, price_time, triggered_at)
+TriggerCallback = Callable[[str, float, Optional[float], float, float], None]
+
+class AlertEvaluator:
+    """
+    Evaluates alerts as prices arrive instead of on a polling loop.
+
+    Every price the exchange service obtains (price hub polls, REST price
+    requests, bulk ticker snapshots) is handed to on_price, which only records
+    it and wakes the evaluation task; several ticks for a symbol arriving
+    before the task runs collapse into the newest one. A slow fallback poll
+    keeps prices flowing for symbols nobody else is asking about.
+
+    Detection latency is measured from the time the price was obtained to the
+    time the alert fired.
+    """
+
+    def __init__(self, exchange_service, index: AlertIndex, on_trigger: TriggerCallback,
+                 poll_interval: Optional[float] = None, latency_window: int = 1000):
+        self.exchange_service = exchange_service
+        self.index = index
+        self.on_trigger = on_trigger
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv("ALERT_POLL_INTERVAL", "10"))
+        self._pending: Dict[str, Tuple[float, float]] = {}  # symbol -> newest (price, price time)
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self._latencies = deque(maxlen=latency_window)  # ms, most recent triggers
+        self.stats = {"ticks": 0, "evaluations": 0, "triggered": 0}
+
+    def start(self):
+        """Start the evaluation and fallback poll tasks (call from a running loop)"""
+        if self._tasks:
+            return
+        self.exchange_service.add_price_listener(self.on_price)
+        self._tasks = [
+            asyncio.create_task(self._run(), name="alert-evaluator"),
+            asyncio.create_task(self._poll(), name="alert-poll"),
+        ]
+        logger.info(f"Alert evaluator started (fallback poll every {self.poll_interval}s)")
+
+    async def close(self):
+        self.exchange_service.remove_price_listener(self.on_price)
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def on_price(self, symbol: str, price: float, timestamp: float):
+        self.stats["ticks"] += 1
+        if not self.index.watches(symbol):
+            return
+        self._pending[symbol] = (price, timestamp)
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            pending, self._pending = self._pending, {}
+            started = time.perf_counter()
+            for symbol, (price, price_time) in pending.items():
+                self.evaluate(symbol, price, price_time)
+            ALERT_CYCLE_SECONDS.observe(time.perf_counter() - started)
+
+    def evaluate(self, symbol: str, price: float, price_time: float):
+        self.stats["evaluations"] += 1
+        for alert_id, previous in self.index.match(symbol, price):
+            triggered_at = time.time()
+            latency = max(triggered_at - price_time, 0.0)
+            self._latencies.append(latency * 1000)
+            ALERT_DETECTION_SECONDS.observe(latency)
+            self.stats["triggered"] += 1
+            try:
+                self.on_trigger(alert_id, price, previous, price_time, triggered_at)
+            except Exception as e:
+                logger.error(f"Error handling triggered alert {alert_id}: {str(e)}")
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            symbols = self.index.symbols()
+            if not symbols:
+                continue
+            try:
+                prices = await self.exchange_service.get_current_prices_timed(symbols)
+            except Exception as e:
+                logger.error(f"Fallback price poll failed: {str(e)}")
+                continue
+            # Cache hits aren't republished by the exchange service, so feed them
+            # here, stamped with when they were obtained rather than now
+            for symbol, (price, price_time) in prices.items():
+                if symbol not in self._pending:
+                    self.on_price(symbol, price, price_time)
+
+    def latency_stats(self) -> Dict[str, Any]:
+        """Detection latency (price time -> trigger time) over recent triggers"""
+        latencies = sorted(self._latencies)
+        if not latencies:
+            return {"count": 0, **self.stats}
+
+        def percentile(p: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3)
+
+        return {
+            "count": len(latencies),
+            "mean_ms": round(sum(latencies) / len(latencies), 3),
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(latencies[-1], 3),
+            **self.stats,
+        }
@@ -0,0 +1,158 @@
+import bisect
+import logging
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+logger = logging.getLogger("alert_index")
+
+CONDITIONS = ("above", "below", "crosses")
+
+# Sorts after any alert id, so (price, _MAX_ID) bounds every entry at `price`
+_MAX_ID = "\uffff"
+
+def cross_tolerance(value: float) -> float:
+    """How close the price must come to a 'crosses' threshold to count as touching it"""
+    return max(0.001 * value, 0.5)  # 0.1% or 0.5 units
+
+class AlertIndex:
+    """
+    Active alerts indexed by symbol, then by condition, as lists of
+    (threshold, alert id) kept sorted so a price move can be matched with
+    binary search instead of checking every alert:
+
+      above    triggers when price > threshold   -> prefix below the price
+      below    triggers when price < threshold   -> suffix above the price
+      crosses  triggers when the threshold lies between the previous and the
+               current price, or within cross_tolerance of the current price
+
+    Triggered alerts are removed as they are matched, so the cost of a price
+    update is O(log n) plus the number of alerts it triggers.
+    """
+
+    def __init__(self):
+        self._thresholds: Dict[str, Dict[str, List[Tuple[float, str]]]] = {}
+        self._entries: Dict[str, Tuple[str, str, float]] = {}  # alert id -> (symbol, condition, threshold)
+        self._last_prices: Dict[str, float] = {}  # previous price per symbol, for crosses
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, alert_id: str) -> bool:
+        return alert_id in self._entries
+
+    def symbols(self) -> List[str]:
+        """Symbols with at least one active alert"""
+        return list(self._thresholds)
+
+    def watches(self, symbol: str) -> bool:
+        return symbol in self._thresholds
+
+    def _entry(self, alert: Dict[str, Any]) -> Optional[Tuple[str, str, float]]:
+        """(symbol, condition, threshold) if the alert belongs in the index"""
+        if alert.get("status") != "active" or alert.get("condition") not in CONDITIONS:
+            return None
+        try:
+            threshold = float(alert["value"])
+        except (TypeError, ValueError):
+            logger.warning(f"Alert {alert['id']} has a non-numeric value {alert.get('value')!r}; not indexed")
+            return None
+        return alert["symbol"], alert["condition"], threshold
+
+    def _thresholds_for(self, symbol: str, condition: str) -> List[Tuple[float, str]]:
+        by_condition = self._thresholds.get(symbol)
+        if by_condition is None:
+            by_condition = self._thresholds[symbol] = {name: [] for name in CONDITIONS}
+        return by_condition[condition]
+
+    def add(self, alert: Dict[str, Any]):
+        """Index an alert if it is active; replaces any previous entry for its id"""
+        self.remove(alert["id"])
+        entry = self._entry(alert)
+        if entry is None:
+            return
+        symbol, condition, threshold = entry
+        bisect.insort(self._thresholds_for(symbol, condition), (threshold, alert["id"]))
+        self._entries[alert["id"]] = entry
+
+    def remove(self, alert_id: str):
+        entry = self._entries.pop(alert_id, None)
+        if entry is None:
+            return
+        symbol, condition, threshold = entry
+        thresholds = self._thresholds[symbol][condition]
+        i = bisect.bisect_left(thresholds, (threshold, alert_id))
+        if i < len(thresholds) and thresholds[i] == (threshold, alert_id):
+            del thresholds[i]
+        if not any(self._thresholds[symbol].values()):
+            del self._thresholds[symbol]
+            self._last_prices.pop(symbol, None)
+
+    def rebuild(self, alerts: Iterable[Dict[str, Any]]):
+        """Replace the whole index, sorting each threshold list once"""
+        self._thresholds.clear()
+        self._entries.clear()
+        for alert in alerts:
+            entry = self._entry(alert)
+            if entry is None:
+                continue
+            symbol, condition, threshold = entry
+            self._thresholds_for(symbol, condition).append((threshold, alert["id"]))
+            self._entries[alert["id"]] = entry
+        for by_condition in self._thresholds.values():
+            for thresholds in by_condition.values():
+                thresholds.sort()
+        for symbol in list(self._last_prices):
+            if symbol not in self._thresholds:
+                del self._last_prices[symbol]
+
+    def match(self, symbol: str, price: float) -> List[Tuple[str, Optional[float]]]:
+        """
+        Record a new price for `symbol` and pop every alert it triggers.
+
+        Returns (alert id, previous price) pairs; the previous price is None on
+        the first price seen for the symbol.
+        """
+        by_condition = self._thresholds.get(symbol)
+        previous = self._last_prices.get(symbol)
+        if by_condition is None:
+            return []
+        self._last_prices[symbol] = price
+
+        triggered = []
+
+        # above: every threshold strictly below the price
+        above = by_condition["above"]
+        end = bisect.bisect_left(above, (price,))
+        triggered.extend(alert_id for _, alert_id in above[:end])
+
+        # below: every threshold strictly above the price
+        below = by_condition["below"]
+        start = bisect.bisect_right(below, (price, _MAX_ID))
+        triggered.extend(alert_id for _, alert_id in below[start:])
+
+        # crosses: thresholds the price moved across, plus those it is touching
+        crosses = by_condition["crosses"]
+        if crosses:
+            candidates = set()
+            if previous is not None and previous != price:
+                # Moving up covers (previous, price], moving down [price, previous)
+                if previous < price:
+                    lo = bisect.bisect_right(crosses, (previous, _MAX_ID))
+                    hi = bisect.bisect_right(crosses, (price, _MAX_ID))
+                else:
+                    lo = bisect.bisect_left(crosses, (price,))
+                    hi = bisect.bisect_left(crosses, (previous,))
+                candidates.update(range(lo, hi))
+
+            # The tolerance grows with the threshold, so bound the window by
+            # both tolerance regimes and filter exactly inside it
+            near_lo = min(price / 1.001, price - 0.5)
+            near_hi = max(price / 0.999, price + 0.5)
+            lo = bisect.bisect_right(crosses, (near_lo, _MAX_ID))
+            hi = bisect.bisect_left(crosses, (near_hi,))
+            candidates.update(i for i in range(lo, hi)
+                              if abs(price - crosses[i][0]) < cross_tolerance(crosses[i][0]))
+            triggered.extend(crosses[i][1] for i in sorted(candidates))
+
+        for alert_id in triggered:
+            self.remove(alert_id)
+        return [(alert_id, previous) for alert_id in triggered]
@@ -0,0 +1,310 @@
+import asyncio
+import logging
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Iterable, Optional, Sequence, Tuple
+
+from services.alert_index import AlertIndex
+
+logger = logging.getLogger("alert_store")
+
+# API field name -> column name
+_FIELDS = {
+    "id": "id",
+    "symbol": "symbol",
+    "type": "type",
+    "condition": "condition",
+    "value": "value",
+    "notifyDiscord": "notify_discord",
+    "created_at": "created_at",
+    "status": "status",
+    "triggered_at": "triggered_at",
+    "triggered_price": "triggered_price",
+    "detection_latency_ms": "detection_latency_ms",
+}
+_SELECT = f"SELECT {', '.join(_FIELDS.values())} FROM alerts"
+
+# Changes kept for other workers to catch up from; a worker further behind
+# than this reloads everything
+CHANGE_LOG_SIZE = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    symbol TEXT NOT NULL,
+    type TEXT NOT NULL,
+    condition TEXT NOT NULL,
+    value TEXT NOT NULL,
+    notify_discord INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'active',
+    triggered_at TEXT,
+    triggered_price REAL,
+    detection_latency_ms REAL
+);
+CREATE INDEX IF NOT EXISTS alerts_symbol_status ON alerts (symbol, status);
+CREATE INDEX IF NOT EXISTS alerts_status ON alerts (status);
+CREATE TABLE IF NOT EXISTS alert_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    alert_id TEXT NOT NULL
+);
+"""
+
+def _from_row(row: Sequence) -> Dict[str, Any]:
+    alert = dict(zip(_FIELDS, row))
+    alert["notifyDiscord"] = bool(alert["notifyDiscord"])
+    return alert
+
+class AlertStore:
+    """
+    Alerts persisted in SQLite (WAL mode) with a write-through in-memory view.
+
+    Every write goes to the database first and then to the in-memory dict and
+    the alert index, so the evaluator's hot path never touches disk while the
+    alerts survive restarts. Listing with filters and pagination is served by
+    the database indexes. The connection is only used from one worker thread,
+    so a write waiting on another worker's lock never stalls the event loop.
+
+    With several workers sharing one database file, each write also appends
+    the alert id to a change log in the same transaction. Workers poll
+    PRAGMA data_version and, when another connection has committed, re-read
+    only the alerts named in the log since their last sync. Triggering is a
+    conditional UPDATE, so only one worker claims (and notifies for) an alert;
+    the trigger is applied in memory first and the claim runs in the background.
+    """
+
+    def __init__(self, path: Optional[str] = None, index: Optional[AlertIndex] = None):
+        self.path = path or os.getenv("ALERTS_DB_PATH", "alerts.db")
+        self.sync_interval = float(os.getenv("ALERTS_SYNC_INTERVAL", "1.0"))  # seconds between data_version checks
+        self.index = index if index is not None else AlertIndex()
+        self._alerts: Dict[str, Dict[str, Any]] = {}
+        self._sync_task: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alert-store")
+
+        self._db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints, no fsync per commit
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.executescript(_SCHEMA)
+
+        self._load()
+        logger.info(f"Alert store at {self.path}: {len(self._alerts)} alerts, {len(self.index)} active")
+
+    def _scalar(self, sql: str, params: Sequence = ()) -> Any:
+        return self._db.execute(sql, params).fetchone()[0]
+
+    def _load(self):
+        """Read every alert and rebuild the index"""
+        self._apply_load(*self._read_all())
+
+    def _read_all(self) -> Tuple[int, int, List[Sequence]]:
+        version = self._scalar("PRAGMA data_version")
+        change_seq = self._scalar("SELECT COALESCE(MAX(seq), 0) FROM alert_changes")
+        return version, change_seq, self._db.execute(f"{_SELECT} ORDER BY seq").fetchall()
+
+    def _apply_load(self, version: int, change_seq: int, rows: List[Sequence]):
+        self._version = version
+        self._change_seq = change_seq
+        self._alerts = {row[0]: _from_row(row) for row in rows}
+        self.index.rebuild(self._alerts.values())
+
+    async def _run(self, fn, *args):
+        """Run a database call on the store's thread"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def start(self):
+        """Start following writes made by other workers (call from a running loop)"""
+        if self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync(), name="alert-store-sync")
+
+    async def close(self):
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+        # Queued writes (e.g. trigger claims) finish before the connection closes
+        await self._run(self._db.close)
+        self._executor.shutdown()
+
+    async def _sync(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Error syncing alerts: {str(e)}")
+
+    async def refresh(self) -> int:
+        """
+        Apply changes other connections have committed since the last sync.
+        Returns the number of alerts re-read.
+        """
+        changes = await self._run(self._read_changes, self._version, self._change_seq)
+        if changes is None:
+            return 0
+        version, change_seq, changed = changes
+        if change_seq is None:
+            # The changes we missed have been pruned from the log
+            self._apply_load(*changed)
+            return len(self._alerts)
+
+        self._version, self._change_seq = version, change_seq
+        for alert_id, alert in changed.items():
+            if alert is None:
+                self._alerts.pop(alert_id, None)
+                self.index.remove(alert_id)
+            else:
+                self._alerts[alert_id] = alert
+                self.index.add(alert)
+        return len(changed)
+
+    def _read_changes(self, version: int, change_seq: int):
+        """
+        None if no other connection has committed since `version`; otherwise
+        (version, None, full load) if the change log no longer reaches back to
+        change_seq, or (version, newest change seq, {alert id: alert, or None
+        if deleted}).
+        """
+        # data_version only changes for commits made by *other* connections
+        current = self._scalar("PRAGMA data_version")
+        if current == version:
+            return None
+
+        oldest = self._scalar("SELECT MIN(seq) FROM alert_changes")
+        if oldest is not None and oldest > change_seq + 1:
+            return current, None, self._read_all()
+
+        changes = self._db.execute(
+            "SELECT seq, alert_id FROM alert_changes WHERE seq > ? ORDER BY seq", (change_seq,)
+        ).fetchall()
+        if not changes:
+            return current, change_seq, {}
+        changed = list({alert_id for _, alert_id in changes})
+
+        found = dict.fromkeys(changed)
+        for start in range(0, len(changed), 500):
+            chunk = changed[start:start + 500]
+            rows = self._db.execute(f"{_SELECT} WHERE id IN ({', '.join('?' for _ in chunk)})", chunk)
+            found.update((row[0], _from_row(row)) for row in rows)
+        return current, changes[-1][0], found
+
+    def _write(self, alert_id: str, sql: str, params: Sequence) -> int:
+        """Run one write and log it for other workers, atomically; returns rows changed"""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            count = self._db.execute(sql, params).rowcount
+            if count:
+                cursor = self._db.execute("INSERT INTO alert_changes (alert_id) VALUES (?)", (alert_id,))
+                if cursor.lastrowid % 1000 == 0:
+                    self._db.execute("DELETE FROM alert_changes WHERE seq <= ?",
+                                     (cursor.lastrowid - CHANGE_LOG_SIZE,))
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        return count
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def get(self, alert_id: str) -> Optional[Dict[str, Any]]:
+        return self._alerts.get(alert_id)
+
+    def all(self) -> Iterable[Dict[str, Any]]:
+        return self._alerts.values()
+
+    async def query(self, symbol: Optional[str] = None, status: Optional[str] = None,
+                    limit: Optional[int] = None, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Alerts in creation order, filtered; returns (page, total matching)"""
+        return await self._run(self._query, symbol, status, limit, offset)
+
+    def _query(self, symbol: Optional[str], status: Optional[str],
+               limit: Optional[int], offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        where, params = [], []
+        if symbol is not None:
+            where.append("symbol = ?")
+            params.append(symbol)
+        if status is not None:
+            where.append("status = ?")
+            params.append(status)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+
+        total = self._scalar(f"SELECT COUNT(*) FROM alerts{clause}", params)
+        rows = self._db.execute(
+            f"{_SELECT}{clause} ORDER BY seq LIMIT ? OFFSET ?",
+            [*params, limit if limit is not None else -1, offset],
+        ).fetchall()
+        return [_from_row(row) for row in rows], total
+
+    async def create(self, alert: Dict[str, Any]) -> Dict[str, Any]:
+        placeholders = ", ".join("?" for _ in _FIELDS)
+        await self._run(self._write, alert["id"],
+                        f"INSERT INTO alerts ({', '.join(_FIELDS.values())}) VALUES ({placeholders})",
+                        [alert.get(field) for field in _FIELDS])
+        self._alerts[alert["id"]] = alert
+        self.index.add(alert)
+        return alert
+
+    async def update(self, alert: Dict[str, Any]) -> bool:
+        """Replace every stored field of an existing alert"""
+        assignments = ", ".join(f"{column} = ?" for field, column in _FIELDS.items() if field != "id")
+        count = await self._run(self._write, alert["id"], f"UPDATE alerts SET {assignments} WHERE id = ?",
+                                [alert.get(field) for field in _FIELDS if field != "id"] + [alert["id"]])
+        if count == 0:
+            return False
+        self._alerts[alert["id"]] = alert
+        self.index.add(alert)
+        return True
+
+    async def delete(self, alert_id: str) -> bool:
+        count = await self._run(self._write, alert_id, "DELETE FROM alerts WHERE id = ?", (alert_id,))
+        self._alerts.pop(alert_id, None)
+        self.index.remove(alert_id)
+        return count > 0
+
+    def mark_triggered(self, alert_id: str, triggered_at: str, triggered_price: float,
+                       detection_latency_ms: float) -> "asyncio.Future[Optional[Dict[str, Any]]]":
+        """
+        Move an active alert to triggered in memory right away and claim it in
+        the database in the background (call from a running loop).
+
+        The returned future resolves to the updated alert, or None if it was
+        already triggered or deleted (e.g. claimed by another worker). If the
+        write fails the alert is made active and indexed again, so a later
+        price can still trigger it.
+        """
+        self.index.remove(alert_id)
+        alert = self._alerts.get(alert_id)
+        previous = dict(alert) if alert is not None else None
+        if alert is not None:
+            alert.update(status="triggered", triggered_at=triggered_at, triggered_price=triggered_price,
+                         detection_latency_ms=detection_latency_ms)
+        return asyncio.ensure_future(self._claim(alert_id, alert, previous,
+                                                 (triggered_at, triggered_price, detection_latency_ms, alert_id)))
+
+    async def _claim(self, alert_id: str, alert: Optional[Dict[str, Any]], previous: Optional[Dict[str, Any]],
+                     params: Sequence) -> Optional[Dict[str, Any]]:
+        try:
+            count = await self._run(
+                self._write,
+                alert_id,
+                "UPDATE alerts SET status = 'triggered', triggered_at = ?, triggered_price = ?, "
+                "detection_latency_ms = ? WHERE id = ? AND status = 'active'",
+                params,
+            )
+        except Exception as e:
+            logger.error(f"Error marking alert {alert_id} triggered: {str(e)}")
+            # Undo the in-memory transition, unless the alert was replaced meanwhile
+            if alert is not None and self._alerts.get(alert_id) is alert:
+                alert.clear()
+                alert.update(previous)
+                self.index.add(alert)
+            return None
+        if count == 0 or alert is None:
+            return None
+        return alert
@@ -0,0 +1,306 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from services.candles import Candles
+from services.exchange_service import INTERVAL_SECONDS
+from services.upstream_scheduler import PRIORITY_BACKFILL
+
+logger = logging.getLogger("backfill")
+
+MAX_ATTEMPTS = 5
+
+def parse_time(value: Any) -> int:
+    """Unix seconds from seconds or an ISO 8601 date/time (UTC unless it says otherwise)"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip()
+    if text.isdigit():
+        return int(text)
+    moment = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+def find_gaps(extents: Iterable[Tuple[int, int, int]], start: int, end: int) -> List[Tuple[int, int]]:
+    """
+    Open-time ranges between start and end (inclusive) the stored segments
+    don't cover. Each range starts on the end of the segment before it (or
+    at start) and ends on the start of the one after it (or at end), so
+    filling it joins them.
+    """
+    gaps = []
+    cursor = start
+    for first, last, _ in extents:
+        if last < cursor:
+            continue
+        if first > end:
+            break
+        if first > cursor:
+            gaps.append((cursor, first))
+        cursor = max(cursor, last)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+class BackfillManager:
+    """
+    Resumable background downloads of kline history into the candle store.
+
+    A job covers every (symbol, interval) pair of its symbols and intervals
+    from a start time to an end time (or the present). For each pair it
+    compares the stored segments with the requested range and downloads only
+    the gaps, walking forward in pages of KLINES_PER_REQUEST candles with
+    `concurrency` pages in flight. Its requests have the lowest upstream
+    priority, so they wait whenever live traffic needs the weight budget.
+
+    Jobs and their progress are checkpointed to a JSON file after every batch
+    of pages. The store itself records what has been downloaded, so a job
+    interrupted by a crash or restart simply finds smaller gaps when it is
+    run again; pending jobs are resumed when the manager starts.
+    """
+
+    def __init__(self, exchange_service, state_path: Optional[str] = None, concurrency: Optional[int] = None):
+        self.exchange_service = exchange_service
+        store = exchange_service.candle_store
+        default_path = os.path.join(store.directory, "backfill.json") if store is not None else "backfill.json"
+        self.state_path = state_path or os.getenv("BACKFILL_STATE_PATH", default_path)
+        self.concurrency = concurrency or int(os.getenv("BACKFILL_CONCURRENCY", "3"))  # kline pages in flight
+
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._loaded = False
+
+    @property
+    def store(self):
+        return self.exchange_service.candle_store
+
+    def load(self):
+        """Read checkpointed jobs; ones that were running are pending again"""
+        self._loaded = True
+        try:
+            with open(self.state_path) as f:
+                jobs = json.load(f)
+        except FileNotFoundError:
+            return
+        for job in jobs:
+            if job["status"] == "running":
+                job["status"] = "pending"
+            self.jobs[job["id"]] = job
+
+    async def _save(self):
+        snapshot = json.dumps(list(self.jobs.values()), indent=1)
+        await asyncio.get_running_loop().run_in_executor(None, self._write_state, snapshot)
+
+    def _write_state(self, snapshot: str):
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.state_path}.tmp"
+        with open(temporary, "w") as f:
+            f.write(snapshot)
+        os.replace(temporary, self.state_path)
+
+    def start(self):
+        """Resume pending jobs and run new ones in the background (call from a running loop)"""
+        if self._task is not None:
+            return
+        if not self._loaded:
+            self.load()
+        self._task = asyncio.create_task(self._run(), name="backfill")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            if self.jobs:
+                # Whatever was running resumes on the next start
+                await self._save()
+
+    async def submit(self, symbols: Iterable[str], intervals: Iterable[str], start: Any, end: Any = None) -> Dict[str, Any]:
+        """Queue a job and return it"""
+        if self.store is None:
+            raise ValueError("The candle store is disabled (CANDLE_STORE_DIR)")
+        if not self._loaded:
+            self.load()
+        symbols = [symbol.strip().upper() for symbol in symbols if symbol.strip()]
+        intervals = [interval.strip() for interval in intervals if interval.strip()]
+        unknown = [interval for interval in intervals if interval not in INTERVAL_SECONDS]
+        if unknown:
+            raise ValueError(f"Unsupported intervals: {', '.join(unknown)}")
+        if not symbols or not intervals:
+            raise ValueError("At least one symbol and one interval are required")
+        start = parse_time(start)
+        end = parse_time(end) if end is not None else None
+        if end is not None and end <= start:
+            raise ValueError("end must be after start")
+
+        now = datetime.now().isoformat()
+        job = {
+            "id": str(uuid.uuid4()),
+            "symbols": symbols,
+            "intervals": intervals,
+            "start": start,
+            "end": end,
+            "status": "pending",
+            "created_at": now,
+            "updated_at": now,
+            "tasks": {f"{symbol} {interval}": {"status": "pending", "cursor": None, "written": 0,
+                                               "requests": 0, "gaps": None, "error": None}
+                      for symbol in symbols for interval in intervals},
+        }
+        self.jobs[job["id"]] = job
+        await self._save()
+        self._wakeup.set()
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.get(job_id)
+        if job is not None and job["status"] in ("pending", "running"):
+            # A running job stops after its current batch of pages
+            job["status"] = "cancelled"
+            await self._save()
+        return job
+
+    def status(self, job_id: Optional[str] = None) -> Any:
+        if job_id is not None:
+            job = self.jobs.get(job_id)
+            return self._with_progress(job) if job is not None else None
+        return {
+            "state_path": self.state_path,
+            "running": self._task is not None and not self._task.done(),
+            "jobs": [self._with_progress(job) for job in self.jobs.values()],
+        }
+
+    def _with_progress(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        done = sum(1 for task in job["tasks"].values() if task["status"] == "done")
+        end = job["end"] or int(time.time())
+        fractions = []
+        for task in job["tasks"].values():
+            if task["status"] == "done":
+                fractions.append(1.0)
+            elif task["cursor"] is None:
+                fractions.append(0.0)
+            else:
+                fractions.append(min(max((task["cursor"] - job["start"]) / max(end - job["start"], 1), 0.0), 1.0))
+        return {**job, "tasks_done": done, "progress": round(sum(fractions) / len(fractions), 4)}
+
+    async def _run(self):
+        while True:
+            await self.run_pending()
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+    async def run_pending(self):
+        """Run queued jobs one after another until none are left"""
+        while True:
+            job = next((job for job in self.jobs.values() if job["status"] == "pending"), None)
+            if job is None:
+                return
+            await self._run_job(job)
+
+    async def _run_job(self, job: Dict[str, Any]):
+        job["status"] = "running"
+        logger.info(f"Backfilling {', '.join(job['symbols'])} ({', '.join(job['intervals'])}) "
+                    f"from {datetime.fromtimestamp(job['start'], timezone.utc).isoformat()}")
+        for name, task in job["tasks"].items():
+            if task["status"] == "done":
+                continue
+            symbol, interval = name.split(" ")
+            task["status"], task["error"] = "running", None
+            try:
+                await self._fill(job, task, symbol, interval)
+                if job["status"] == "cancelled":
+                    task["status"] = "cancelled"
+                    break
+                task["status"] = "done"
+            except asyncio.CancelledError:
+                task["status"] = "pending"
+                job["status"] = "pending"
+                raise
+            except Exception as e:
+                task["status"], task["error"] = "failed", str(e)
+                logger.error(f"Backfill of {symbol} {interval} failed: {str(e)}")
+            await self._save()
+
+        if job["status"] == "running":
+            failed = any(task["status"] == "failed" for task in job["tasks"].values())
+            job["status"] = "failed" if failed else "done"
+        job["updated_at"] = datetime.now().isoformat()
+        await self._save()
+
+    async def _fill(self, job: Dict[str, Any], task: Dict[str, Any], symbol: str, interval: str):
+        seconds = INTERVAL_SECONDS[interval]
+        now = int(time.time())
+        # Only closed candles are stored
+        end = min(job["end"] if job["end"] is not None else now, now - seconds) // seconds * seconds
+        start = -(-job["start"] // seconds) * seconds
+
+        gaps = find_gaps(self.store.extents(symbol, interval), start, end)
+        task["gaps"] = len(gaps)
+        for first, last in gaps:
+            if first == start and not self.store.range(symbol, interval, first, first):
+                # Nothing stored at the start: skip ahead to the listing, if it's later
+                listed = await self._fetch_page(task, symbol, interval, first, last, limit=1)
+                if not len(listed) or (listed.time[0] >= last and last != end):
+                    continue  # not listed yet, or listed where the stored history starts
+                first = int(listed.time[0])
+            await self._fill_range(job, task, symbol, interval, first, last)
+            if job["status"] == "cancelled":
+                return
+            task["gaps"] -= 1
+
+    async def _fill_range(self, job: Dict[str, Any], task: Dict[str, Any], symbol: str, interval: str,
+                          first: int, last: int):
+        seconds = INTERVAL_SECONDS[interval]
+        window = seconds * self.exchange_service.KLINES_PER_REQUEST
+        pages = [(page_start, min(page_start + window - seconds, last))
+                 for page_start in range(first, last + 1, window)]
+
+        # The last stored candle leads each batch, showing the store it continues what's there
+        bridge = Candles.empty()
+        for index in range(0, len(pages), self.concurrency):
+            if job["status"] == "cancelled":
+                return
+            batch = pages[index:index + self.concurrency]
+            results = await asyncio.gather(*(self._fetch_page(task, symbol, interval, page_start, page_end)
+                                             for page_start, page_end in batch))
+            rows = Candles.concat([bridge, *results]).dedupe()
+            if len(rows) > len(bridge):
+                task["written"] += await self.store.write(symbol, interval, rows)
+                bridge = rows[-1:]
+            task["cursor"] = batch[-1][1]
+            job["updated_at"] = datetime.now().isoformat()
+            await self._save()
+
+    async def _fetch_page(self, task: Dict[str, Any], symbol: str, interval: str, first: int, last: int,
+                          limit: Optional[int] = None) -> Candles:
+        params = {
+            "symbol": symbol,
+            "interval": interval,
+            "startTime": first * 1000,
+            "endTime": last * 1000,
+            "limit": limit or self.exchange_service.KLINES_PER_REQUEST,
+        }
+        for attempt in range(MAX_ATTEMPTS):
+            task["requests"] += 1
+            try:
+                response = await self.exchange_service._make_request("/api/v3/klines", params, priority=PRIORITY_BACKFILL)
+                return Candles.from_klines(response)
+            except Exception as e:
+                if self.exchange_service.geo_restricted or attempt == MAX_ATTEMPTS - 1:
+                    raise
+                delay = min(2 ** attempt, 30)
+                logger.warning(f"Backfill request for {symbol} {interval} failed ({str(e)}), retrying in {delay}s")
+                await asyncio.sleep(delay)
@@ -0,0 +1,145 @@
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+import time
+
+import numpy as np
+
+from services.candles import Candles, PRICE_COLUMNS, encode_binary_message
+
+# Distinct request limits per series whose encoded history block is kept
+MAX_ENCODED_WINDOWS = 4
+
+class CandleSeries:
+    """Cached candles for one (symbol, interval), oldest to newest"""
+
+    def __init__(self, candles: Candles, complete: bool = False):
+        self.candles = candles
+        self.complete = complete  # True when the exchange has no older history than this
+        self.refreshed_at = time.monotonic()
+        self.streamed_at = 0.0  # monotonic time of the last kline merged from the exchange websocket
+        # limit -> ((first time, last time, count), encoded block) for the closed part of a window
+        self._encoded_history: "OrderedDict[int, Tuple[Tuple[int, int, int], bytes]]" = OrderedDict()
+
+    @property
+    def last_time(self) -> Optional[int]:
+        return self.candles.last_time
+
+    @property
+    def nbytes(self) -> int:
+        return self.candles.nbytes
+
+    def covers(self, limit: int) -> bool:
+        """Whether this series can answer a request for `limit` candles"""
+        return self.complete or len(self.candles) >= limit
+
+    def merge_tail(self, tail: Candles):
+        """
+        Replace the forming candle and append newer ones.
+
+        `tail` starts at (or before) the last cached open time, so everything
+        from its first candle onward is overwritten. The series keeps its length
+        by dropping the same number of candles from the old end.
+
+        Windows already handed out (views from candles.tail()) share the
+        forming candle, so an in-place update shows through them; any other
+        merge builds new arrays and leaves earlier windows as they were.
+        """
+        if not len(tail):
+            return
+        if len(tail) == 1 and len(self.candles) and tail.time[0] == self.candles.time[-1]:
+            # Only the forming candle changed (the usual streamed or polled
+            # update): overwrite it in place instead of copying the series
+            for name in PRICE_COLUMNS:
+                getattr(self.candles, name)[-1] = getattr(tail, name)[0]
+            self.refreshed_at = time.monotonic()
+            return
+        size = len(self.candles)
+        cut = int(np.searchsorted(self.candles.time, tail.time[0], side="left"))
+
+        merged = Candles.concat([self.candles[:cut], tail])
+        if len(merged) > size and not self.complete:
+            merged = merged.tail(size)
+        self.candles = merged
+        self.refreshed_at = time.monotonic()
+
+    def encode_binary(self, limit: int) -> bytes:
+        """
+        Encode the latest `limit` candles in the binary wire format.
+
+        Everything but the last candle is closed history that never changes, so
+        its block is cached and reused until a new candle closes; only the
+        forming candle is encoded per call.
+        """
+        window = self.candles.tail(limit)
+        if len(window) < 2:
+            return encode_binary_message([window.to_binary_block()])
+
+        closed = window[:-1]
+        key = (int(closed.time[0]), int(closed.time[-1]), len(closed))
+        cached = self._encoded_history.get(limit)
+        if cached is not None and cached[0] == key:
+            history_block = cached[1]
+            self._encoded_history.move_to_end(limit)
+        else:
+            history_block = closed.to_binary_block()
+            self._encoded_history[limit] = (key, history_block)
+            while len(self._encoded_history) > MAX_ENCODED_WINDOWS:
+                self._encoded_history.popitem(last=False)
+
+        return encode_binary_message([history_block, window[-1:].to_binary_block()])
+
+class CandleCache:
+    """
+    LRU cache of candle series keyed by (symbol, interval), bounded by a
+    memory budget rather than an entry count, since a 50000-row 1m series
+    and a 200-row 1w series cost very different amounts.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], CandleSeries]" = OrderedDict()
+        self._bytes = 0
+        self.stats = {"hits": 0, "tail_refreshes": 0, "full_loads": 0, "store_loads": 0, "evictions": 0, "streamed": 0}
+
+    def peek(self, key: Tuple[str, str]) -> Optional[CandleSeries]:
+        """Look up a series without counting it as used"""
+        return self._entries.get(key)
+
+    def keys(self) -> List[Tuple[str, str]]:
+        return list(self._entries)
+
+    def get(self, key: Tuple[str, str]) -> Optional[CandleSeries]:
+        series = self._entries.get(key)
+        if series is not None:
+            self._entries.move_to_end(key)
+        return series
+
+    def put(self, key: Tuple[str, str], series: CandleSeries):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._entries[key] = series
+        self._bytes += series.nbytes
+        self._evict()
+
+    def resize(self, key: Tuple[str, str], old_nbytes: int):
+        """Account for a series that changed size in place"""
+        series = self._entries.get(key)
+        if series is not None:
+            self._bytes += series.nbytes - old_nbytes
+            self._evict()
+
+    def _evict(self):
+        # Always keep the most recently used entry, even if it alone exceeds the budget
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, series = self._entries.popitem(last=False)
+            self._bytes -= series.nbytes
+            self.stats["evictions"] += 1
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,97 @@
+import numpy as np
+from typing import Dict, Any, Optional, Tuple
+
+from services.candles import Candles
+
+# Chance per candle that the market trend reverses / that its strength is redrawn
+TREND_FLIP_PROBABILITY = 0.05
+STRENGTH_CHANGE_PROBABILITY = 0.1
+CYCLE_LENGTH = 20  # candles per cyclical swing
+
+def symbol_volatility(symbol: str) -> float:
+    """Per-candle volatility tier for a symbol"""
+    if symbol in ['BTCUSDT', 'ETHUSDT']:
+        return 0.02  # 2% for major coins
+    elif symbol in ['SOLUSDT', 'BNBUSDT', 'AVAXUSDT']:
+        return 0.03  # 3% for mid-cap
+    return 0.04  # 4% for smaller coins
+
+def simulate_candles(
+    rng: np.random.Generator,
+    count: int,
+    start_time: int,
+    interval_seconds: int,
+    start_price: float,
+    base_price: float,
+    volatility: float,
+    state: Optional[Dict[str, Any]] = None,
+) -> Tuple[Candles, Dict[str, Any]]:
+    """
+    Generate `count` simulated candles in bulk.
+
+    Same model as the original per-candle loop: a bull/bear trend whose
+    direction flips and whose strength is redrawn at random, uniform noise
+    scaled by the symbol's volatility tier, a 20-candle sine cycle, wicks
+    proportional to the body, and volume that grows with the size of the move.
+    Every random draw is made as one array, and the regime switches are
+    resolved with cumulative sums instead of a Python loop.
+
+    `state` carries the trend regime and cycle position between calls, so a
+    series can be extended one chunk at a time; the returned state continues
+    where this chunk ended.
+    """
+    if state is None:
+        state = {
+            "direction": int(rng.choice([1, -1])),  # 1 for bull, -1 for bear
+            "strength": float(rng.uniform(0.1, 0.3)),
+            "position": 0,                          # candles generated so far
+        }
+    if count <= 0:
+        return Candles.empty(), state
+
+    # Trend direction: flips after a candle apply from the next candle onward
+    flips = rng.random(count) < TREND_FLIP_PROBABILITY
+    flips_before = np.concatenate(([0], np.cumsum(flips[:-1])))
+    direction = state["direction"] * np.where(flips_before % 2 == 1, -1.0, 1.0)
+
+    # Trend strength: a redraw after candle i applies from candle i + 1 onward
+    redraws = rng.random(count) < STRENGTH_CHANGE_PROBABILITY
+    new_strengths = rng.uniform(0.1, 0.3, count)
+    last_redraw = np.maximum.accumulate(np.where(redraws, np.arange(count), -1))
+    source = np.concatenate(([-1], last_redraw[:-1]))
+    strength = np.where(source >= 0, new_strengths[np.maximum(source, 0)], state["strength"])
+
+    # Combined relative move per candle
+    trend_factor = direction * strength * rng.uniform(0.5, 1.5, count)
+    random_factor = rng.uniform(-1, 1, count) * volatility
+    position = state["position"] + np.arange(count)
+    cycle_factor = 0.005 * np.sin((position % CYCLE_LENGTH) / CYCLE_LENGTH * 2 * np.pi)
+    change = trend_factor + random_factor + cycle_factor
+
+    # Each candle opens at the previous close
+    close = start_price * np.cumprod(1 + change)
+    open_ = np.empty(count)
+    open_[0] = start_price
+    open_[1:] = close[:-1]
+
+    # Wicks: the long one on the close side, the short one on the open side
+    price_range = np.abs(close - open_) * rng.uniform(1.2, 2.0, count)
+    short_wick = price_range * rng.uniform(0.1, 0.4, count)
+    long_wick = price_range * rng.uniform(0.6, 0.9, count)
+    bearish = open_ > close
+    high = np.where(bearish, open_ + short_wick, close + long_wick)
+    low = np.where(bearish, close - long_wick, open_ - short_wick)
+
+    # Volume correlated with the size of the move
+    base_volume = base_price * rng.uniform(10, 100, count)
+    volume = base_volume * (1 + np.abs(change) * rng.uniform(5, 15, count))
+
+    times = start_time + np.arange(count, dtype=np.int64) * interval_seconds
+
+    # Regime in effect after the last candle, for the next chunk
+    end_state = {
+        "direction": int(direction[-1]) * (-1 if flips[-1] else 1),
+        "strength": float(new_strengths[last_redraw[-1]]) if last_redraw[-1] >= 0 else state["strength"],
+        "position": state["position"] + count,
+    }
+    return Candles(times, open_, high, low, close, volume), end_state
@@ -0,0 +1,335 @@
+import asyncio
+import bisect
+import logging
+import os
+import re
+import shutil
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, run a single worker
+    fcntl = None
+
+from services.candles import Candles, COLUMNS, PRICE_COLUMNS
+
+logger = logging.getLogger("candle_store")
+
+_DTYPES = {name: np.dtype("<i8") if name == "time" else np.dtype("<f8") for name in COLUMNS}
+# The time column is written last, so a reader never sees a time without its prices
+_WRITE_ORDER = PRICE_COLUMNS + ("time",)
+
+# Symbols and intervals become directory names
+_SYMBOL_PATTERN = re.compile(r"^[A-Z0-9]{1,30}$")
+_INTERVAL_PATTERN = re.compile(r"^[1-9]\d*[mhdw]$")
+
+def _column_path(segment_path: str, name: str) -> str:
+    return os.path.join(segment_path, f"{name}.bin")
+
+def _row_count(segment_path: str) -> int:
+    # A crash mid-append can leave some columns longer than others (or missing)
+    try:
+        return min(os.path.getsize(_column_path(segment_path, name)) for name in COLUMNS) // 8
+    except FileNotFoundError:
+        return 0
+
+class _Segment:
+    """A read-only memory map of one segment, re-mapped when it grows"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.first_time = int(os.path.basename(path))
+        self.count = 0
+        self._time_bytes = -1
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def refresh(self):
+        try:
+            time_bytes = os.path.getsize(_column_path(self.path, "time"))
+            if time_bytes == self._time_bytes:
+                return
+            count = _row_count(self.path)
+            columns = {
+                name: (np.memmap(_column_path(self.path, name), dtype=_DTYPES[name], mode="r", shape=(count,))
+                       if count else np.empty(0, dtype=_DTYPES[name]))
+                for name in COLUMNS
+            }
+        except FileNotFoundError:
+            # Joined into the previous segment since it was listed
+            time_bytes, count, columns = 0, 0, {}
+        self._columns = columns
+        self.count = count
+        self._time_bytes = time_bytes
+
+    @property
+    def time(self) -> np.ndarray:
+        return self._columns["time"]
+
+    @property
+    def last_time(self) -> Optional[int]:
+        return int(self.time[-1]) if self.count else None
+
+    def slice(self, start: int, stop: int) -> Candles:
+        return Candles(*(self._columns[name][start:stop] for name in COLUMNS))
+
+class CandleStore:
+    """
+    Append-only columnar candle files, memory-mapped for reads.
+
+    Each (symbol, interval) is a directory of segments, each a contiguous run
+    of closed candles in one file per column (little-endian int64 open times,
+    float64 prices and volume), named after its first open time:
+
+        <directory>/BTCUSDT/1m/1700000000/{time,open,high,low,close,volume}.bin
+
+    Candles are only appended to a segment when the new rows overlap its last
+    candle, which proves nothing is missing in between; otherwise they start
+    a new segment, and the space between segments is a gap the backfill job
+    can fill. When appended rows reach the next segment the two are joined.
+
+    Reads binary-search the mapped time column and slice the columns without
+    copying. Writes run on one worker thread, under a per-directory file lock
+    when several workers share the store.
+    """
+
+    def __init__(self, directory: str, max_open: int = 256):
+        self.directory = directory
+        self.max_open = max_open  # (symbol, interval) keys whose maps are kept open
+        self._segments: "OrderedDict[Tuple[str, str], Tuple[int, List[_Segment]]]" = OrderedDict()
+        self._written: Dict[Tuple[str, str], int] = {}  # latest open time written or queued per key
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="candle-store")
+        self.stats = {"reads": 0, "rows_read": 0, "writes": 0, "rows_written": 0,
+                      "segments_joined": 0, "errors": 0}
+
+    def _key_path(self, symbol: str, interval: str) -> str:
+        if not _SYMBOL_PATTERN.match(symbol) or not _INTERVAL_PATTERN.match(interval):
+            raise ValueError(f"Can't store candles for {symbol} {interval}")
+        return os.path.join(self.directory, symbol, interval)
+
+    # Reads (event loop)
+
+    def _open_segments(self, symbol: str, interval: str) -> List[_Segment]:
+        key = (symbol, interval)
+        path = self._key_path(symbol, interval)
+        try:
+            # Adding or removing a segment changes the directory's mtime
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            self._segments.pop(key, None)
+            return []
+        cached = self._segments.get(key)
+        if cached is not None and cached[0] == mtime:
+            self._segments.move_to_end(key)
+            return cached[1]
+
+        previous = {segment.path: segment for segment in cached[1]} if cached is not None else {}
+        segments = []
+        for name in os.listdir(path):
+            if name.isdigit():
+                segment_path = os.path.join(path, name)
+                segments.append(previous.get(segment_path) or _Segment(segment_path))
+        segments.sort(key=lambda segment: segment.first_time)
+        self._segments[key] = (mtime, segments)
+        self._segments.move_to_end(key)
+        while len(self._segments) > self.max_open:
+            self._segments.popitem(last=False)
+        return segments
+
+    def _read_segments(self, symbol: str, interval: str) -> List[_Segment]:
+        segments = self._open_segments(symbol, interval)
+        for segment in segments:
+            segment.refresh()
+        return [segment for segment in segments if segment.count]
+
+    def range(self, symbol: str, interval: str, start: Optional[int] = None, end: Optional[int] = None) -> Candles:
+        """
+        Stored candles with start <= open time <= end (in seconds; either bound
+        may be None). Within one segment the result is a view of the mapped
+        files; spanning several segments concatenates them.
+        """
+        parts = []
+        for segment in self._read_segments(symbol, interval):
+            if (end is not None and segment.first_time > end) or (start is not None and segment.last_time < start):
+                continue
+            lo = int(np.searchsorted(segment.time, start, side="left")) if start is not None else 0
+            hi = int(np.searchsorted(segment.time, end, side="right")) if end is not None else segment.count
+            if hi > lo:
+                parts.append(segment.slice(lo, hi))
+        # A crash while joining segments can leave them overlapping until the next write
+        candles = parts[0] if len(parts) == 1 else Candles.concat(parts).dedupe()
+        self.stats["reads"] += 1
+        self.stats["rows_read"] += len(candles)
+        return candles
+
+    def tail(self, symbol: str, interval: str, limit: int) -> Candles:
+        """The latest `limit` candles of the newest segment (so without gaps), as a view"""
+        segments = self._read_segments(symbol, interval)
+        if not segments:
+            return Candles.empty()
+        segment = segments[-1]
+        candles = segment.slice(max(segment.count - limit, 0), segment.count)
+        self.stats["reads"] += 1
+        self.stats["rows_read"] += len(candles)
+        return candles
+
+    def extents(self, symbol: str, interval: str) -> List[Tuple[int, int, int]]:
+        """(first open time, last open time, count) of each segment, oldest first"""
+        return [(segment.first_time, segment.last_time, segment.count)
+                for segment in self._read_segments(symbol, interval)]
+
+    def last_time(self, symbol: str, interval: str) -> Optional[int]:
+        segments = self._read_segments(symbol, interval)
+        return segments[-1].last_time if segments else None
+
+    # Writes
+
+    def write_closed(self, symbol: str, interval: str, candles: Candles, interval_seconds: int,
+                     now: Optional[float] = None):
+        """
+        Queue the closed candles of a freshly fetched or streamed window for
+        writing. Cheap when nothing new has closed, so it can be called on
+        every update.
+        """
+        if not len(candles):
+            return
+        key = (symbol, interval)
+        if now is None:
+            now = time.time()
+        closed = int(np.searchsorted(candles.time, now - interval_seconds, side="right"))
+        if closed == 0:
+            return
+        last = self._written.get(key)
+        if last is None:
+            last = self.last_time(symbol, interval)
+        if last is not None and candles.time[closed - 1] <= last:
+            return
+
+        # Keep the last stored candle in the rows, to show they continue it
+        start = int(np.searchsorted(candles.time, last, side="left")) if last is not None else 0
+        rows = Candles(*(getattr(candles, name)[start:closed].copy() for name in COLUMNS))
+        self._written[key] = int(rows.time[-1])
+        future = self._executor.submit(self.append, symbol, interval, rows)
+        future.add_done_callback(lambda f: self._on_written(key, f))
+
+    def _on_written(self, key: Tuple[str, str], future):
+        error = future.exception()
+        if error is not None:
+            self.stats["errors"] += 1
+            # Re-read the store's real end before the next write
+            self._written.pop(key, None)
+            logger.error(f"Error storing candles for {key[0]} {key[1]}: {str(error)}")
+
+    async def write(self, symbol: str, interval: str, candles: Candles) -> int:
+        """Append candles (oldest first, all closed) on the store's thread; returns the rows added"""
+        written = await asyncio.get_running_loop().run_in_executor(self._executor, self.append, symbol, interval, candles)
+        self._written.pop((symbol, interval), None)
+        return written
+
+    @contextmanager
+    def _locked(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, ".lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def append(self, symbol: str, interval: str, candles: Candles) -> int:
+        """Append candles (oldest first, all closed) and return the rows added; blocking"""
+        if not len(candles):
+            return 0
+        path = self._key_path(symbol, interval)
+        with self._locked(path):
+            segments = self._scan(path)
+            firsts = [first for first, _, _ in segments]
+
+            # The segment these candles continue, if they overlap its end
+            index = bisect.bisect_right(firsts, int(candles.time[0])) - 1
+            if index >= 0 and candles.time[0] <= segments[index][1]:
+                current, last, _ = segments[index]
+                rows = candles[int(np.searchsorted(candles.time, last, side="right")):]
+            else:
+                current, rows = int(candles.time[0]), candles
+            current_path = os.path.join(path, str(current))
+
+            written = 0
+            for following, following_last, _ in segments[index + 1:]:
+                # Everything from the next segment's start onward is stored already
+                cut = int(np.searchsorted(rows.time, following, side="left"))
+                written += self._append_rows(current_path, rows[:cut])
+                if candles.time[-1] < following:
+                    break
+                # The candles ran into the next segment: join it onto this one
+                self._join(current_path, os.path.join(path, str(following)))
+                rows = rows[int(np.searchsorted(rows.time, following_last, side="right")):]
+            else:
+                written += self._append_rows(current_path, rows)
+
+        self.stats["writes"] += 1
+        self.stats["rows_written"] += written
+        return written
+
+    def _scan(self, path: str) -> List[Tuple[int, int, int]]:
+        """(first, last, count) of every segment on disk, repairing leftovers of an interrupted join"""
+        segments = []
+        for name in sorted((name for name in os.listdir(path) if name.isdigit()), key=int):
+            segment_path = os.path.join(path, name)
+            count = _row_count(segment_path)
+            if not count:
+                shutil.rmtree(segment_path)
+                continue
+            last = self._read_time(segment_path, count - 1)
+            if segments and segments[-1][1] >= int(name):
+                # Overlaps its predecessor: finish joining it
+                previous, previous_last, _ = segments[-1]
+                previous_path = os.path.join(path, str(previous))
+                self._join(previous_path, segment_path)
+                segments[-1] = (previous, max(previous_last, last), _row_count(previous_path))
+                continue
+            segments.append((int(name), last, count))
+        return segments
+
+    @staticmethod
+    def _read_time(segment_path: str, index: int) -> int:
+        with open(_column_path(segment_path, "time"), "rb") as f:
+            f.seek(index * 8)
+            return int(np.frombuffer(f.read(8), dtype=_DTYPES["time"])[0])
+
+    def _join(self, path: str, following_path: str):
+        """Append a later segment's rows past the end of the segment at path, then remove it"""
+        count = _row_count(following_path)
+        following = Candles(*(np.fromfile(_column_path(following_path, name), dtype=_DTYPES[name], count=count)
+                              for name in COLUMNS))
+        last = self._read_time(path, _row_count(path) - 1)
+        self._append_rows(path, following[int(np.searchsorted(following.time, last, side="right")):])
+        shutil.rmtree(following_path)
+        self.stats["segments_joined"] += 1
+
+    @staticmethod
+    def _append_rows(segment_path: str, rows: Candles) -> int:
+        if not len(rows):
+            return 0
+        os.makedirs(segment_path, exist_ok=True)
+        count = _row_count(segment_path) if os.path.exists(_column_path(segment_path, "time")) else 0
+        for name in _WRITE_ORDER:
+            with open(_column_path(segment_path, name), "ab") as f:
+                # Drop the ends of columns a crash left longer than the rest
+                f.truncate(count * 8)
+                f.write(np.ascontiguousarray(getattr(rows, name), dtype=_DTYPES[name]).tobytes())
+        return len(rows)
+
+    async def close(self):
+        """Finish queued writes"""
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    def info(self) -> Dict[str, Any]:
+        return {"directory": self.directory, "open": len(self._segments), **self.stats}
@@ -0,0 +1,149 @@
+import numpy as np
+import struct
+from typing import Dict, List, Any, Iterable
+
+# Column order used everywhere candles are stored or serialized
+COLUMNS = ("time", "open", "high", "low", "close", "volume")
+PRICE_COLUMNS = COLUMNS[1:]
+
+# Binary wire format (little-endian, every section 8-byte aligned so a browser
+# can wrap each column in a BigInt64Array/Float64Array without copying):
+#
+#   message: b"CNDL" | uint16 version | uint16 block count | block...
+#   block:   uint32 candle count n | uint32 reserved (0) |
+#            time int64[n] | open, high, low, close, volume float64[n]
+#
+# A response is several blocks so the immutable closed history can be encoded
+# once and reused, with only the forming candle encoded per request. Clients
+# concatenate the blocks in order.
+BINARY_MEDIA_TYPE = "application/vnd.candles"
+BINARY_MAGIC = b"CNDL"
+BINARY_VERSION = 1
+_MESSAGE_HEADER = struct.Struct("<4sHH")
+_BLOCK_HEADER = struct.Struct("<II")
+
+class Candles:
+    """
+    Struct-of-arrays candle container.
+
+    `time` is the open time in seconds (int64); the price and volume columns
+    are float64. Slicing returns views, so taking the last N candles of a
+    cached series costs nothing until it is serialized.
+    """
+
+    __slots__ = COLUMNS
+
+    def __init__(self, time: np.ndarray, open: np.ndarray, high: np.ndarray,
+                 low: np.ndarray, close: np.ndarray, volume: np.ndarray):
+        self.time = time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def empty(cls) -> "Candles":
+        return cls(np.empty(0, dtype=np.int64), *(np.empty(0, dtype=np.float64) for _ in PRICE_COLUMNS))
+
+    @classmethod
+    def from_klines(cls, response: List[List]) -> "Candles":
+        """Parse a Binance /api/v3/klines response in one vectorized pass"""
+        if not response:
+            return cls.empty()
+        table = np.array([row[:6] for row in response], dtype=np.float64)
+        return cls(
+            (table[:, 0] // 1000).astype(np.int64),  # Convert from ms to seconds
+            table[:, 1].copy(), table[:, 2].copy(), table[:, 3].copy(),
+            table[:, 4].copy(), table[:, 5].copy(),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict]) -> "Candles":
+        if not rows:
+            return cls.empty()
+        return cls(
+            np.fromiter((row["time"] for row in rows), dtype=np.int64, count=len(rows)),
+            *(np.fromiter((row[name] for row in rows), dtype=np.float64, count=len(rows))
+              for name in PRICE_COLUMNS),
+        )
+
+    @classmethod
+    def concat(cls, parts: Iterable["Candles"]) -> "Candles":
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return cls(*(np.concatenate([getattr(part, name) for part in parts]) for name in COLUMNS))
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def __getitem__(self, index) -> "Candles":
+        if not isinstance(index, slice):
+            raise TypeError("Candles only supports slicing")
+        return Candles(*(getattr(self, name)[index] for name in COLUMNS))
+
+    def tail(self, limit: int) -> "Candles":
+        return self[-limit:] if len(self) > limit else self
+
+    def dedupe(self) -> "Candles":
+        """Drop candles whose open time doesn't advance past every earlier one"""
+        if len(self) < 2:
+            return self
+        running_max = np.maximum.accumulate(self.time)
+        keep = np.empty(len(self), dtype=bool)
+        keep[0] = True
+        keep[1:] = self.time[1:] > running_max[:-1]
+        if keep.all():
+            return self
+        return Candles(*(getattr(self, name)[keep] for name in COLUMNS))
+
+    @property
+    def last_time(self) -> Any:
+        return int(self.time[-1]) if len(self) else None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in COLUMNS)
+
+    def to_binary_block(self) -> bytes:
+        """Encode as one block of the binary wire format"""
+        parts = [_BLOCK_HEADER.pack(len(self), 0), self.time.astype("<i8", copy=False).tobytes()]
+        parts.extend(getattr(self, name).astype("<f8", copy=False).tobytes() for name in PRICE_COLUMNS)
+        return b"".join(parts)
+
+    @classmethod
+    def from_binary(cls, data: bytes) -> "Candles":
+        """Decode a binary wire-format message back into one Candles"""
+        magic, version, block_count = _MESSAGE_HEADER.unpack_from(data, 0)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            raise ValueError("Not a candle message or unsupported version")
+        offset = _MESSAGE_HEADER.size
+        blocks = []
+        for _ in range(block_count):
+            count, _reserved = _BLOCK_HEADER.unpack_from(data, offset)
+            offset += _BLOCK_HEADER.size
+            columns = []
+            for name in COLUMNS:
+                dtype = "<i8" if name == "time" else "<f8"
+                columns.append(np.frombuffer(data, dtype=dtype, count=count, offset=offset))
+                offset += 8 * count
+            blocks.append(cls(*columns))
+        return cls.concat(blocks)
+
+    def to_columns(self) -> Dict[str, list]:
+        """Column-oriented JSON shape: {"time": [...], "open": [...], ...}"""
+        return {name: getattr(self, name).tolist() for name in COLUMNS}
+
+    def to_rows(self) -> List[Dict]:
+        """Row-oriented JSON shape: [{"time": ..., "open": ..., ...}, ...]"""
+        return [
+            {"time": t, "open": o, "high": h, "low": l, "close": c, "volume": v}
+            for t, o, h, l, c, v in zip(*(getattr(self, name).tolist() for name in COLUMNS))
+        ]
+
+def encode_binary_message(blocks: List[bytes]) -> bytes:
+    """Join pre-encoded blocks into one binary wire-format message"""
+    return b"".join([_MESSAGE_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(blocks)), *blocks])
@@ -0,0 +1,196 @@
+import logging
+import time
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+logger = logging.getLogger("circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """No upstream host is currently accepting requests for an endpoint"""
+
+class UpstreamHostError(Exception):
+    """A request failed because of the host (network error, timeout, 5xx, 451), not the request"""
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one upstream host and endpoint.
+
+    failure_threshold consecutive failures open it; while open, requests are
+    refused without touching the network. After recovery_time one probe
+    request is let through (half-open): success closes the breaker, failure
+    re-opens it for twice as long, up to max_recovery_time.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_time: float = 10.0, max_recovery_time: float = 300.0):
+        self.failure_threshold = failure_threshold
+        self.base_recovery_time = recovery_time
+        self.max_recovery_time = max_recovery_time
+        self.state = CLOSED
+        self.failures = 0  # consecutive
+        self.recovery_time = recovery_time
+        self.opened_at = 0.0
+        self.probe_started: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_status: Optional[int] = None
+
+    def ready(self, now: Optional[float] = None) -> bool:
+        """Whether a request would be let through (without claiming the half-open probe)"""
+        now = time.monotonic() if now is None else now
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return now >= self.opened_at + self.recovery_time
+        # A probe that never reported back (e.g. cancelled) doesn't block forever
+        return self.probe_started is None or now >= self.probe_started + self.recovery_time
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        """Whether to send a request now; in half-open state only one probe at a time"""
+        now = time.monotonic() if now is None else now
+        if not self.ready(now):
+            return False
+        if self.state != CLOSED:
+            self.state = HALF_OPEN
+            self.probe_started = now
+        return True
+
+    def record_success(self) -> bool:
+        """Returns whether this closed a breaker that wasn't closed"""
+        recovered = self.state != CLOSED
+        self.state = CLOSED
+        self.failures = 0
+        self.recovery_time = self.base_recovery_time
+        self.probe_started = None
+        return recovered
+
+    def record_failure(self, error: str, status: Optional[int] = None, trip: bool = False,
+                       now: Optional[float] = None) -> bool:
+        """Count a failure; `trip` opens the breaker at once. Returns whether it opened."""
+        now = time.monotonic() if now is None else now
+        self.failures += 1
+        self.last_error = error
+        self.last_status = status
+        if self.state == HALF_OPEN:
+            self.recovery_time = min(self.recovery_time * 2, self.max_recovery_time)
+        elif not trip and self.failures < self.failure_threshold:
+            return False
+        elif trip and status == 451:
+            # Geo-restrictions don't lift in seconds
+            self.recovery_time = self.max_recovery_time
+        self.state = OPEN
+        self.opened_at = now
+        self.probe_started = None
+        return True
+
+    def info(self) -> Dict[str, Any]:
+        return {"state": self.state, "failures": self.failures, "recovery_time": self.recovery_time,
+                "last_error": self.last_error, "last_status": self.last_status}
+
+class UpstreamPool:
+    """
+    Interchangeable upstream hosts (e.g. api.binance.com and api1-3/api-gcp),
+    ranked by measured latency, each with a circuit breaker per endpoint.
+
+    Requests go to the fastest host whose breaker for the endpoint is
+    closed (or due a probe); a failing host is skipped until its breaker
+    lets a probe through, and the endpoint is unavailable only when every
+    host's breaker is open. Latencies are exponentially weighted averages
+    of real requests and periodic pings; hosts not measured yet keep their
+    configured order behind measured ones.
+    """
+
+    def __init__(self, hosts: Iterable[str], failure_threshold: int = 5, recovery_time: float = 10.0,
+                 max_recovery_time: float = 300.0, min_timeout: float = 2.0, timeout_factor: float = 4.0,
+                 alpha: float = 0.2):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.max_recovery_time = max_recovery_time
+        self.min_timeout = min_timeout  # seconds; adaptive timeouts never go below this
+        self.timeout_factor = timeout_factor  # adaptive timeout = factor x typical latency
+        self.alpha = alpha
+        self.set_hosts(hosts)
+
+    def set_hosts(self, hosts: Iterable[str]):
+        self.hosts = [host.rstrip("/") for host in hosts if host.strip()]
+        if not self.hosts:
+            raise ValueError("At least one upstream host is required")
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._latency: Dict[str, float] = {}  # host -> seconds
+        self._endpoint_latency: Dict[Tuple[str, str], Tuple[float, int]] = {}  # -> (seconds, samples)
+
+    def breaker(self, host: str, endpoint: str) -> CircuitBreaker:
+        key = (host, endpoint)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(self.failure_threshold, self.recovery_time,
+                                                           self.max_recovery_time)
+        return breaker
+
+    def ranked(self) -> List[str]:
+        """Hosts fastest first"""
+        order = {host: index for index, host in enumerate(self.hosts)}
+        return sorted(self.hosts, key=lambda host: (host not in self._latency, self._latency.get(host, 0.0), order[host]))
+
+    def pick(self, endpoint: str, exclude: Iterable[str] = (), claim: bool = True) -> Optional[str]:
+        """
+        The fastest host that may take a request for endpoint now, claiming a
+        half-open probe if need be. With claim=False nothing is claimed: only
+        pick with a claim right before sending, or the probe is held for nothing.
+        """
+        excluded = set(exclude)
+        for host in self.ranked():
+            if host in excluded:
+                continue
+            breaker = self.breaker(host, endpoint)
+            if breaker.allow() if claim else breaker.ready():
+                return host
+        return None
+
+    def available(self, endpoint: str) -> bool:
+        """Whether any host would accept a request for endpoint"""
+        return any(self.breaker(host, endpoint).ready() for host in self.hosts)
+
+    def geo_restricted(self) -> bool:
+        """Whether every host is refusing us with 451 on some endpoint"""
+        return all(any(breaker.state != CLOSED and breaker.last_status == 451
+                       for (host, _), breaker in self._breakers.items() if host == candidate)
+                   for candidate in self.hosts)
+
+    def timeout_for(self, host: str, endpoint: str, default: float) -> float:
+        """Per-request timeout from the endpoint's typical latency on this host, capped at default"""
+        latency, samples = self._endpoint_latency.get((host, endpoint), (0.0, 0))
+        if samples < 5:
+            return default
+        return min(default, max(self.min_timeout, latency * self.timeout_factor))
+
+    def record_latency(self, host: str, seconds: float):
+        previous = self._latency.get(host)
+        self._latency[host] = seconds if previous is None else previous + self.alpha * (seconds - previous)
+
+    def record_success(self, host: str, endpoint: str, seconds: float):
+        self.record_latency(host, seconds)
+        latency, samples = self._endpoint_latency.get((host, endpoint), (seconds, 0))
+        self._endpoint_latency[(host, endpoint)] = (latency + self.alpha * (seconds - latency), samples + 1)
+        if self.breaker(host, endpoint).record_success():
+            logger.info(f"Upstream {host}{endpoint} recovered")
+
+    def record_failure(self, host: str, endpoint: str, error: str, status: Optional[int] = None, trip: bool = False):
+        breaker = self.breaker(host, endpoint)
+        if breaker.record_failure(error, status, trip):
+            logger.warning(f"Circuit open for {host}{endpoint} for {breaker.recovery_time:.0f}s: {error}")
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "hosts": [
+                {
+                    "host": host,
+                    "latency_ms": round(self._latency[host] * 1000, 2) if host in self._latency else None,
+                    "endpoints": {endpoint: breaker.info() for (candidate, endpoint), breaker in self._breakers.items()
+                                  if candidate == host},
+                }
+                for host in self.ranked()
+            ],
+            "geo_restricted": self.geo_restricted(),
+        }
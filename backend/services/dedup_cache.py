@@ -0,0 +1,45 @@
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+class DedupCache:
+    """
+    Keys seen within the last `window` seconds.
+
+    Keys are kept in the order they were last added, which is also the order
+    they expire in, so expiry only ever pops from the front: insert, lookup
+    and expiry are all amortized O(1), however many keys are live.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._seen: "OrderedDict[Hashable, float]" = OrderedDict()  # key -> monotonic time added
+
+    def _expire(self, now: float):
+        seen = self._seen
+        while seen and now - next(iter(seen.values())) >= self.window:
+            seen.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        self._expire(time.monotonic())
+        return key in self._seen
+
+    def __len__(self) -> int:
+        self._expire(time.monotonic())
+        return len(self._seen)
+
+    def add(self, key: Hashable, now: Optional[float] = None):
+        """Record `key` as seen now; re-adding restarts its window"""
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        self._seen[key] = now
+        self._seen.move_to_end(key)
+
+    def check_and_add(self, key: Hashable) -> bool:
+        """Add `key` unless it was seen within the window; returns True if it was added"""
+        now = time.monotonic()
+        self._expire(now)
+        if key in self._seen:
+            return False
+        self._seen[key] = now
+        return True
@@ -0,0 +1,232 @@
+import aiohttp
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+from services.dedup_cache import DedupCache
+from services.metrics import DISCORD_DELIVERY_SECONDS, DISCORD_WEBHOOK_SECONDS
+
+logger = logging.getLogger("discord_queue")
+
+# Discord webhook limits
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+MAX_CONTENT_CHARS = 2000
+
+def _embed_chars(embed: Dict[str, Any]) -> int:
+    """Characters Discord counts towards the per-message embed limit"""
+    size = len(embed.get("title", "")) + len(embed.get("description", ""))
+    size += len(embed.get("footer", {}).get("text", ""))
+    size += len(embed.get("author", {}).get("name", ""))
+    for field in embed.get("fields", []):
+        size += len(field.get("name", "")) + len(field.get("value", ""))
+    return size
+
+def _default_dedup_key(content: Optional[str], embed: Dict[str, Any]) -> str:
+    # The embed timestamp differs on every build, so it can't be part of the key
+    return json.dumps({"content": content, "embed": {k: v for k, v in embed.items() if k != "timestamp"}},
+                      sort_keys=True, default=str)
+
+class DiscordQueue:
+    """
+    Bounded outbound queue for Discord notifications.
+
+    Producers call enqueue(), which never blocks: when the queue is full the
+    notification is dropped and counted. A single worker takes what has been
+    queued within the batch window and sends it as one webhook message of up
+    to 10 embeds, so a burst of triggers costs a tenth of the requests.
+    Notifications repeating one already queued within the service's dedup
+    window are skipped, as send_message does for direct sends. Requests go
+    through the service's pooled session.
+
+    The worker follows Discord's rate-limit headers: it waits out
+    X-RateLimit-Reset-After when a bucket is exhausted, retries 429s after
+    Retry-After, and backs off exponentially on network errors and 5xx.
+    """
+
+    def __init__(self, discord_service, max_size: Optional[int] = None, batch_window: Optional[float] = None,
+                 max_retries: int = 5):
+        self.discord_service = discord_service
+        self.max_size = max_size if max_size is not None else int(os.getenv("DISCORD_QUEUE_SIZE", "1000"))
+        self.batch_window = batch_window if batch_window is not None else float(os.getenv("DISCORD_BATCH_WINDOW", "0.5"))  # seconds
+        self.max_retries = max_retries
+        # (content, embed, monotonic time queued)
+        self._queue: "asyncio.Queue[Tuple[Optional[str], Dict[str, Any], float]]" = asyncio.Queue(self.max_size)
+        self._worker: Optional[asyncio.Task] = None
+        self._carry: Optional[Tuple[Optional[str], Dict[str, Any], float]] = None  # taken but didn't fit the last message
+        self._blocked_until = 0.0  # monotonic time before which the webhook bucket is exhausted
+        self._recent = DedupCache(discord_service.dedup_window)  # dedup keys queued within the window
+        self.stats = {
+            "enqueued": 0,
+            "dropped": 0,
+            "deduplicated": 0,
+            "sent_messages": 0,
+            "sent_embeds": 0,
+            "failed_embeds": 0,
+            "rate_limited": 0,
+            "retries": 0,
+        }
+
+    def start(self):
+        """Start the delivery worker (call from a running loop)"""
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run(), name="discord-queue")
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def enqueue(self, embed: Dict[str, Any], content: Optional[str] = None, dedup_key: Optional[str] = None) -> bool:
+        """
+        Queue one notification. Returns False if it was skipped as a duplicate
+        of one queued within the dedup window, or dropped because the queue is full.
+        """
+        key = dedup_key if dedup_key is not None else _default_dedup_key(content, embed)
+        if key in self._recent:
+            self.stats["deduplicated"] += 1
+            logger.info(f"Duplicate Discord notification skipped (within {self._recent.window}s window)")
+            return False
+
+        try:
+            self._queue.put_nowait((content, embed, time.monotonic()))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            logger.warning(f"Discord queue full ({self.max_size}), notification dropped")
+            return False
+        self._recent.add(key)
+        self.stats["enqueued"] += 1
+        return True
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "depth": self._queue.qsize() + (self._carry is not None),
+            "max_size": self.max_size,
+            "running": self._worker is not None,
+            "rate_limited_for": round(max(self._blocked_until - time.monotonic(), 0.0), 3),
+            **self.stats,
+        }
+
+    async def _next_batch(self) -> List[Tuple[Optional[str], Dict[str, Any], float]]:
+        """Wait for one notification, then take whatever else arrives within the batch window"""
+        if self._carry is not None:
+            first, self._carry = self._carry, None
+        else:
+            first = await self._queue.get()
+        batch = [first]
+        chars = _embed_chars(first[1])
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < MAX_EMBEDS_PER_MESSAGE:
+            if self._queue.empty():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self._queue.get_nowait()
+            size = _embed_chars(item[1])
+            if chars + size > MAX_EMBED_CHARS_PER_MESSAGE:
+                self._carry = item  # starts the next message
+                break
+            batch.append(item)
+            chars += size
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._send_batch(batch)
+            except Exception as e:
+                self.stats["failed_embeds"] += len(batch)
+                logger.error(f"Discord delivery failed for {len(batch)} notifications: {str(e)}")
+
+    def _payload(self, batch: List[Tuple[Optional[str], Dict[str, Any], float]]) -> Dict[str, Any]:
+        # Every distinct message text is kept, one per line, so mentions and
+        # per-alert messages survive batching
+        contents = list(dict.fromkeys(content for content, _, _ in batch if content))
+        content = "\n".join(contents)
+        if len(content) > MAX_CONTENT_CHARS:
+            content = content[:MAX_CONTENT_CHARS - 1] + "…"
+            if any("@everyone" in c for c in contents) and "@everyone" not in content:
+                content = "@everyone " + content[:MAX_CONTENT_CHARS - len("@everyone ") - 1] + "…"
+        return {"content": content, "embeds": [embed for _, embed, _ in batch]}
+
+    async def _send_batch(self, batch: List[Tuple[Optional[str], Dict[str, Any], float]]):
+        payload = self._payload(batch)
+        session = await self.discord_service.get_session()
+        for attempt in range(self.max_retries + 1):
+            # Wait out an exhausted rate-limit bucket before sending
+            delay = self._blocked_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            started = time.monotonic()
+            try:
+                async with session.post(self.discord_service.webhook_url, json=payload) as response:
+                    body = await response.text()
+                    self._note_rate_limit(response.headers)
+                    sent_at = time.monotonic()
+                    DISCORD_WEBHOOK_SECONDS.labels(str(response.status)).observe(sent_at - started)
+
+                    if response.status in (200, 204):
+                        self.stats["sent_messages"] += 1
+                        self.stats["sent_embeds"] += len(batch)
+                        for _, _, queued_at in batch:
+                            DISCORD_DELIVERY_SECONDS.observe(sent_at - queued_at)
+                        return
+
+                    if response.status == 429:
+                        self.stats["rate_limited"] += 1
+                        retry_after = self._retry_after(response, body)
+                        self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+                        logger.warning(f"Discord rate limited, retrying in {retry_after:.2f}s")
+                        self.stats["retries"] += 1
+                        continue
+
+                    if response.status < 500:
+                        # Won't succeed on retry (bad payload, deleted webhook, ...)
+                        raise Exception(f"Discord webhook failed with status {response.status}: {body[:200]}")
+                    error = f"status {response.status}"
+            except aiohttp.ClientError as e:
+                error = str(e)
+            except asyncio.TimeoutError:
+                error = "timeout"
+
+            if attempt < self.max_retries:
+                backoff = min(2 ** attempt, 30)
+                logger.warning(f"Discord delivery error ({error}), retrying in {backoff}s")
+                self.stats["retries"] += 1
+                await asyncio.sleep(backoff)
+
+        raise Exception(f"Gave up after {self.max_retries + 1} attempts")
+
+    def _note_rate_limit(self, headers):
+        """Block further sends until the bucket resets once it has no requests left"""
+        if headers.get("X-RateLimit-Remaining") == "0":
+            try:
+                reset_after = float(headers.get("X-RateLimit-Reset-After", "1"))
+            except ValueError:
+                reset_after = 1.0
+            self._blocked_until = max(self._blocked_until, time.monotonic() + reset_after)
+
+    @staticmethod
+    def _retry_after(response, body: str) -> float:
+        try:
+            return float(json.loads(body)["retry_after"])
+        except Exception:
+            pass
+        try:
+            return float(response.headers.get("Retry-After", "1"))
+        except ValueError:
+            return 1.0
@@ -7,12 +7,28 @@ import time
 import json
 import traceback
 
+from services.dedup_cache import DedupCache
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("discord_service")
 
 class DiscordService:
+    _instance = None  # For singleton pattern
+    _initialized = False
+    
+    def __new__(cls, *args, **kwargs):
+        # One shared service, so the env is read and the webhook logged once
+        if cls._instance is None:
+            cls._instance = super(DiscordService, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+    
     def __init__(self):
+        # Only initialize once, even if multiple instances are created
+        if self._initialized:
+            return
+            
         # Try to get from env, or use hardcoded value as fallback
         self.webhook_url = os.getenv("DISCORD_WEBHOOK_URL", "")
         
@@ -22,13 +38,38 @@ class DiscordService:
             logger.warning("Using hardcoded webhook URL as fallback")
         
         # Add a deduplication cache to prevent sending duplicate alerts
-        self.recent_alerts = {}
-        self.dedup_window = 5  # seconds to prevent duplicate alerts
+        self.dedup_window = float(os.getenv("DISCORD_DEDUP_WINDOW", "5"))  # seconds to prevent duplicate alerts
+        self.recent_alerts = DedupCache(self.dedup_window)
+        
+        # Shared webhook HTTP session (created in start(), closed in close())
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.http_pool_size = int(os.getenv("DISCORD_HTTP_POOL_SIZE", "10"))
         
         # Log webhook URL for debugging
         masked_url = self.webhook_url[:20] + "..." if self.webhook_url else "None"
         logger.info(f"Discord webhook URL: {masked_url}")
         
+        self._initialized = True
+        
+    async def start(self):
+        """Create the shared webhook HTTP session (called on app startup)"""
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(limit=self.http_pool_size)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30))
+        
+    async def close(self):
+        """Close the shared webhook HTTP session (called on app shutdown)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        
+    async def get_session(self) -> aiohttp.ClientSession:
+        # Lazily create the session if the service is used outside the app lifecycle
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+        
     async def send_message(self, content: str, embeds: Optional[list] = None) -> Dict[str, Any]:
         """
         Send a message to Discord using a webhook
@@ -46,57 +87,45 @@ class DiscordService:
         
         # Create a message signature for deduplication
         message_sig = f"{content}:{str(embeds)}"
-        current_time = time.time()
-        
-        # Check if this is a duplicate message within the deduplication window
-        if message_sig in self.recent_alerts:
-            last_sent = self.recent_alerts[message_sig]
-            if current_time - last_sent < self.dedup_window:
-                logger.warning(f"⚠️ Duplicate alert detected and prevented (within {self.dedup_window}s window)")
-                return {"success": True, "info": "Duplicate alert prevented"}
         
-        # Store this message in recent alerts cache
-        self.recent_alerts[message_sig] = current_time
-        
-        # Clean up old entries from the cache (older than 30 seconds)
-        self.recent_alerts = {k: v for k, v in self.recent_alerts.items() 
-                             if current_time - v < 30}
+        # Skip (and don't re-time) a message sent within the deduplication window
+        if not self.recent_alerts.check_and_add(message_sig):
+            logger.warning(f"⚠️ Duplicate alert detected and prevented (within {self.dedup_window}s window)")
+            return {"success": True, "info": "Duplicate alert prevented"}
                 
-        logger.info(f"⚠️ Sending Discord message: {content[:50]}...")
+        logger.debug("Sending Discord message: %s...", content[:50])
             
         payload = {"content": content}
         if embeds:
             payload["embeds"] = embeds
             
         try:
-            # Log more detailed information for debugging
+            # Full payloads only at DEBUG, and only serialized when that level is on
             masked_url = self.webhook_url[:20] + "..." if self.webhook_url else "None"
-            logger.info(f"⚠️ Webhook URL being used: {masked_url}")
-            logger.info(f"⚠️ Payload being sent: {json.dumps(payload)[:200]}...")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Webhook URL being used: %s, payload: %s...", masked_url, json.dumps(payload)[:200])
             
-            timeout = aiohttp.ClientTimeout(total=30)  # 30 second timeout
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(
-                    self.webhook_url, 
-                    json=payload,
-                    headers={"Content-Type": "application/json"}
-                ) as response:
-                    response_text = await response.text()
-                    logger.info(f"⚠️ Discord response status: {response.status}")
-                    logger.info(f"⚠️ Discord response text: {response_text}")
+            session = await self.get_session()
+            async with session.post(
+                self.webhook_url, 
+                json=payload,
+                headers={"Content-Type": "application/json"}
+            ) as response:
+                response_text = await response.text()
+                logger.debug("Discord response status %s: %s", response.status, response_text)
+                
+                if response.status not in [200, 204]:
+                    logger.error(f"⚠️ Discord webhook failed: {response_text}")
+                    # Print more detailed error information
+                    logger.error(f"⚠️ Request details: URL={masked_url}, Headers={session.headers}")
+                    raise Exception(f"Discord webhook failed with status {response.status}: {response_text}")
                     
-                    if response.status not in [200, 204]:
-                        logger.error(f"⚠️ Discord webhook failed: {response_text}")
-                        # Print more detailed error information
-                        logger.error(f"⚠️ Request details: URL={masked_url}, Headers={session.headers}")
-                        raise Exception(f"Discord webhook failed with status {response.status}: {response_text}")
-                        
-                    if response.status == 204:  # Discord returns 204 No Content on success
-                        logger.info("⚠️ Discord message sent successfully (204 No Content)")
-                        return {"success": True}
-                        
-                    logger.info("⚠️ Discord message sent successfully")
-                    return await response.json()
+                if response.status == 204:  # Discord returns 204 No Content on success
+                    logger.info("Discord message sent (204 No Content)")
+                    return {"success": True}
+                    
+                logger.info("Discord message sent")
+                return await response.json()
         except aiohttp.ClientError as e:
             logger.error(f"⚠️ Network error when sending to Discord: {str(e)}")
             logger.error(f"⚠️ Stack trace: {traceback.format_exc()}")
@@ -106,6 +135,51 @@ class DiscordService:
             logger.error(f"⚠️ Stack trace: {traceback.format_exc()}")
             raise
                 
+    def alert_embed(self, symbol: str, alert_type: str, condition: str, value: str, current_price: float) -> Dict[str, Any]:
+        """Build the Discord embed describing a triggered alert"""
+        # Ensure current_price is a float
+        current_price_float = float(current_price)
+        
+        # Format ISO timestamp for Discord
+        timestamp = datetime.datetime.utcnow().isoformat()
+        
+        return {
+            "title": f"🚨 Trading Alert: {symbol}",
+            "description": f"An alert has been triggered for {symbol}!",
+            "color": 16711680,  # Red color
+            "fields": [
+                {
+                    "name": "Alert Type",
+                    "value": alert_type.capitalize(),
+                    "inline": True
+                },
+                {
+                    "name": "Condition",
+                    "value": condition.capitalize(),
+                    "inline": True
+                },
+                {
+                    "name": "Trigger Value",
+                    "value": f"${value}",
+                    "inline": True
+                },
+                {
+                    "name": "Current Price",
+                    "value": f"${current_price_float:.2f}",
+                    "inline": True
+                },
+                {
+                    "name": "Triggered At",
+                    "value": f"<t:{int(time.time())}:F>",
+                    "inline": False
+                }
+            ],
+            "timestamp": timestamp,
+            "footer": {
+                "text": "Trading Bot Alert System"
+            }
+        }
+                
     async def send_alert(self, symbol: str, alert_type: str, condition: str, value: str, current_price: float) -> Dict[str, Any]:
         """
         Send a formatted alert to Discord
@@ -123,53 +197,12 @@ class DiscordService:
         try:
             # Generate a unique alert ID for this specific alert
             alert_id = f"{symbol}_{alert_type}_{condition}_{value}_{current_price}"
-            logger.info(f"Processing alert ID: {alert_id}")
-            
-            # Ensure current_price is a float
-            current_price_float = float(current_price)
-            
-            # Format ISO timestamp for Discord
-            timestamp = datetime.datetime.utcnow().isoformat()
+            logger.debug("Processing alert ID: %s", alert_id)
             
-            # Create a more detailed embed with better formatting
-            embed = {
-                "title": f"🚨 Trading Alert: {symbol}",
-                "description": f"An alert has been triggered for {symbol}!",
-                "color": 16711680,  # Red color
-                "fields": [
-                    {
-                        "name": "Alert Type",
-                        "value": alert_type.capitalize(),
-                        "inline": True
-                    },
-                    {
-                        "name": "Condition",
-                        "value": condition.capitalize(),
-                        "inline": True
-                    },
-                    {
-                        "name": "Trigger Value",
-                        "value": f"${value}",
-                        "inline": True
-                    },
-                    {
-                        "name": "Current Price",
-                        "value": f"${current_price_float:.2f}",
-                        "inline": True
-                    },
-                    {
-                        "name": "Triggered At",
-                        "value": f"<t:{int(time.time())}:F>",
-                        "inline": False
-                    }
-                ],
-                "timestamp": timestamp,
-                "footer": {
-                    "text": "Trading Bot Alert System"
-                }
-            }
+            embed = self.alert_embed(symbol, alert_type, condition, value, current_price)
             
-            logger.info(f"Sending alert to Discord for {symbol}, embed: {json.dumps(embed)[:200]}...")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Sending alert to Discord for %s, embed: %s...", symbol, json.dumps(embed)[:200])
             
             # Send the alert with @everyone mention to ensure notifications
             return await self.send_message(
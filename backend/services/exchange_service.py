@@ -1,5 +1,6 @@
 import aiohttp
-from typing import Dict, List, Any, Optional
+import asyncio
+from typing import Callable, Dict, Iterable, List, Any, Optional, Set, Tuple
 import os
 import time
 import hmac
@@ -9,63 +10,36 @@ import logging
 import random
 import math
 from datetime import datetime
-from functools import wraps
+from collections import OrderedDict
+
+import numpy as np
+
+from services.candle_cache import CandleCache, CandleSeries
+from services.candle_store import CandleStore
+from services.candles import Candles, encode_binary_message
+from services.candle_simulator import simulate_candles, symbol_volatility
+from services.rollup import RollupEngine, parse_interval
+from services.circuit_breaker import CircuitOpenError, UpstreamHostError, UpstreamPool
+from services.metrics import UPSTREAM_REQUEST_SECONDS
+from services.upstream_scheduler import (UpstreamScheduler, request_weight, PRIORITY_LIVE,
+                                         PRIORITY_CHARTS, PRIORITY_BACKGROUND)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("exchange_service")
 
-# Module-level log tracking to prevent excessive logging
-_LOG_TIMESTAMPS = {}
-_MIN_LOG_INTERVAL = 30  # minimum seconds between similar log messages
+# Fixed-length Binance kline intervals; '1M' (calendar month) is deliberately absent
+INTERVAL_SECONDS = {
+    '1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
+    '1h': 3600, '2h': 7200, '4h': 14400, '6h': 21600, '8h': 28800,
+    '12h': 43200, '1d': 86400, '3d': 259200, '1w': 604800
+}
 
-# Decorator to prevent excessive logging of similar messages
-def suppress_duplicate_logs(interval=30):
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            # Generate a key based on the function name and arguments
-            key = f"{func.__name__}"
-            if len(args) > 1 and isinstance(args[1], str):  # Assuming args[1] is symbol
-                key += f":{args[1]}"
-            
-            current_time = time.time()
-            last_log_time = _LOG_TIMESTAMPS.get(key, 0)
-            
-            # Suppress logging if this message was logged recently
-            should_log = (current_time - last_log_time) >= interval
-            
-            # Store original logger methods and temporarily modify them if needed
-            if not should_log:
-                orig_warning = logger.warning
-                orig_info = logger.info
-                
-                # Create no-op functions for temporarily disabling specific log levels
-                def silent_warning(msg, *args, **kwargs):
-                    pass
-                
-                def silent_info(msg, *args, **kwargs):
-                    pass
-                
-                # Replace the log methods with silent versions
-                logger.warning = silent_warning
-                logger.info = silent_info
-                
-                try:
-                    result = await func(*args, **kwargs)
-                finally:
-                    # Restore original logger methods
-                    logger.warning = orig_warning
-                    logger.info = orig_info
-                
-                return result
-            else:
-                # Update the timestamp for this message type
-                _LOG_TIMESTAMPS[key] = current_time
-                return await func(*args, **kwargs)
-        
-        return wrapper
-    return decorator
+# Binance's interchangeable API hosts, in order of preference until latencies are measured
+DEFAULT_API_HOSTS = (
+    "https://api.binance.com", "https://api1.binance.com", "https://api2.binance.com",
+    "https://api3.binance.com", "https://api-gcp.binance.com",
+)
 
 class ExchangeService:
     # Class variables to track service-wide state
@@ -75,6 +49,10 @@ class ExchangeService:
     _last_warning_times = {}  # Track last warning time for each symbol
     _simulation_log_frequency = 20  # Only log simulation messages every N requests
     
+    KLINES_PER_REQUEST = 1000  # Binance API limit per klines request
+    MAX_CANDLES = 50000        # Most candles a single get_candles call returns
+    MAX_SIMULATED_SERIES = 256 # Simulated (symbol, interval) series kept for consistency
+    
     def __new__(cls, *args, **kwargs):
         # Implement singleton pattern to ensure all code uses the same instance
         if cls._instance is None:
@@ -90,13 +68,41 @@ class ExchangeService:
         # API keys
         self.api_key = os.getenv("BINANCE_API_KEY", "")
         self.api_secret = os.getenv("BINANCE_API_SECRET", "")
-        self.base_url = "https://api.binance.com"
+        
+        # Interchangeable Binance API hosts, ranked by latency, each with a
+        # circuit breaker per endpoint (see UpstreamPool)
+        hosts = os.getenv("BINANCE_API_HOSTS", ",".join(DEFAULT_API_HOSTS)).split(",")
+        self.upstream = UpstreamPool(
+            hosts,
+            failure_threshold=int(os.getenv("EXCHANGE_BREAKER_FAILURES", "5")),
+            recovery_time=float(os.getenv("EXCHANGE_BREAKER_RECOVERY", "10")),  # seconds before the first probe
+            max_recovery_time=float(os.getenv("EXCHANGE_BREAKER_MAX_RECOVERY", "300")),
+            min_timeout=float(os.getenv("EXCHANGE_MIN_TIMEOUT", "2")),  # floor of the latency-based timeouts
+        )
+        self.failover_attempts = int(os.getenv("EXCHANGE_FAILOVER_ATTEMPTS", "2"))  # hosts a GET tries before failing
+        self.host_probe_interval = float(os.getenv("EXCHANGE_HOST_PROBE_INTERVAL", "30"))  # seconds between latency pings
+        self._probe_task: Optional[asyncio.Task] = None
+        # Price lookups optionally race a second host once the first is slow
+        self.hedge_prices = os.getenv("EXCHANGE_HEDGE_PRICES", "0") == "1"
+        self.hedge_delay = float(os.getenv("EXCHANGE_HEDGE_DELAY", "0.3"))  # seconds before hedging
+        self._hedge_stats = {"hedged": 0, "hedge_won": 0}
+        
+        # Shared upstream HTTP session (created in start(), closed in close())
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.http_pool_size = int(os.getenv("EXCHANGE_HTTP_POOL_SIZE", "100"))
+        self.http_pool_size_per_host = int(os.getenv("EXCHANGE_HTTP_POOL_SIZE_PER_HOST", "20"))
+        self.http_dns_cache_ttl = int(os.getenv("EXCHANGE_HTTP_DNS_CACHE_TTL", "300"))  # seconds
+        self.http_keepalive_timeout = float(os.getenv("EXCHANGE_HTTP_KEEPALIVE_TIMEOUT", "30"))  # seconds
+        self.http_timeout = float(os.getenv("EXCHANGE_HTTP_TIMEOUT", "10"))  # seconds, whole request
+        self.http_connect_timeout = float(os.getenv("EXCHANGE_HTTP_CONNECT_TIMEOUT", "5"))  # seconds
+        
+        # Request-weight budget shared by every upstream call, by priority
+        self.scheduler = UpstreamScheduler()
         
         # Price caching and simulation state
         self.last_price_cache = {}
         self.last_update_time = {}
         self.price_trends = {}  # Track price movement trends
-        self.geo_restricted = False  # Flag to track if we're in a restricted region
         self.fallback_mode = False   # Flag to indicate we're in fallback mode
         self.simulation_log_count = {}  # Counter to control simulation logging frequency per symbol
         
@@ -115,62 +121,254 @@ class ExchangeService:
         
         # Initialize price trends with random directions
         for symbol in self.base_prices:
-            self.price_trends[symbol] = {
-                'direction': random.choice([1, -1]),  # 1 for up, -1 for down
-                'strength': random.uniform(0.3, 1.0),  # Trend strength
-                'duration': random.randint(10, 30),    # How many updates before changing
-                'updates': 0                           # Counter for updates
-            }
+            self.price_trends[symbol] = self._new_price_trend()
             self.simulation_log_count[symbol] = 0
+        
+        # Last all-symbols ticker snapshot, reused by batch price lookups while fresh
+        self._bulk_prices: Dict[str, float] = {}
+        self._bulk_prices_time = 0.0
+        self._bulk_prices_lock = asyncio.Lock()
+        self.bulk_price_ttl = float(os.getenv("EXCHANGE_BULK_PRICE_TTL", "1.0"))  # seconds
+        
+        # Real-price TTL cache with single-flight refreshes (see get_current_price)
+        self._price_entries: Dict[str, Tuple[float, float]] = {}  # symbol -> (price, monotonic fetch time)
+        self._price_inflight: Dict[str, asyncio.Future] = {}
+        self.price_ttl = float(os.getenv("EXCHANGE_PRICE_TTL", "0.5"))  # seconds a price counts as fresh
+        self.price_stale_ttl = float(os.getenv("EXCHANGE_PRICE_STALE_TTL", "5.0"))  # seconds a stale price may still be served
+        self._price_stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+        
+        # Symbols whose price arrives over the exchange websocket (see StreamIngestor);
+        # their cached price stays fresh for longer, as pushes replace polling
+        self._streamed_symbols: Set[str] = set()
+        self.stream_price_ttl = float(os.getenv("STREAM_PRICE_TTL", "5.0"))  # seconds without a push before polling again
+        
+        # Per-(symbol, interval) kline history, refreshed from the tail only
+        self.candle_cache = CandleCache(int(float(os.getenv("CANDLE_CACHE_MAX_MB", "64")) * 1024 * 1024))
+        self.candle_tail_ttl = float(os.getenv("CANDLE_TAIL_TTL", "1.0"))  # seconds before re-checking the tail
+        self._candle_inflight: Dict[Tuple, asyncio.Future] = {}
+        self.candle_fetch_concurrency = int(os.getenv("CANDLE_FETCH_CONCURRENCY", "5"))  # kline pages in flight per load
+        self.candle_stream_ttl = float(os.getenv("STREAM_CANDLE_TTL", "5.0"))  # seconds a streamed kline keeps a series fresh
+        
+        # Closed candles persisted across restarts ("" disables the store)
+        store_dir = os.getenv("CANDLE_STORE_DIR", "candle_store")
+        self.candle_store = CandleStore(store_dir) if store_dir else None
+        
+        # Higher and non-exchange intervals aggregated from finer cached series
+        self.candle_rollup = os.getenv("CANDLE_ROLLUP", "1") != "0"
+        self.rollup = RollupEngine(self, INTERVAL_SECONDS)
+        
+        # Callbacks notified of every price the service obtains (see add_price_listener)
+        self._price_listeners: List[Callable[[str, float, float], None]] = []
+        
+        # Simulated candle series per (symbol, interval), extended as time moves on
+        self._simulated_series: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
             
         self._initialized = True
         
-    async def _make_request(self, endpoint: str, params: Optional[Dict] = None, method: str = "GET") -> Any:
-        url = f"{self.base_url}{endpoint}"
+    async def start(self):
+        """Create the shared upstream HTTP session (called on app startup)"""
+        if self._session is not None and not self._session.closed:
+            return
+            
+        # One keep-alive connection pool for every upstream call, so price ticks and
+        # kline pages reuse warm TCP/TLS connections instead of handshaking each time
+        connector = aiohttp.TCPConnector(
+            limit=self.http_pool_size,
+            limit_per_host=self.http_pool_size_per_host,
+            ttl_dns_cache=self.http_dns_cache_ttl,
+            keepalive_timeout=self.http_keepalive_timeout,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=self.http_timeout,
+            connect=self.http_connect_timeout,
+        )
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        if len(self.upstream.hosts) > 1 and self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_hosts(), name="upstream-probe")
+        
+    async def close(self):
+        """Close the shared upstream HTTP session (called on app shutdown)"""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self.candle_store is not None:
+            await self.candle_store.close()
         
-        # If already confirmed to be geo-restricted, fail fast
-        if self.geo_restricted and endpoint != "/api/v3/exchangeInfo":
-            raise Exception("Service unavailable from this location due to regulatory restrictions")
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Lazily create the session if the service is used outside the app lifecycle
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
         
+    @property
+    def base_url(self) -> str:
+        """The upstream host requests currently go to first"""
+        return self.upstream.ranked()[0]
+    
+    @base_url.setter
+    def base_url(self, url: str):
+        # Pin a single host (e.g. a local stand-in for the exchange)
+        self.upstream.set_hosts([url])
+    
+    @property
+    def geo_restricted(self) -> bool:
+        """Whether every upstream host is refusing us with 451 (their breakers keep probing)"""
+        return self.upstream.geo_restricted()
+    
+    def upstream_available(self, endpoint: str) -> bool:
+        """Whether any upstream host would take a request for endpoint right now"""
+        return self.upstream.available(endpoint)
+    
+    def upstream_info(self) -> Dict[str, Any]:
+        """Request-weight budget, host latencies and circuit breaker states"""
+        return {**self.scheduler.info(), **self.upstream.info(),
+                "hedging": {"enabled": self.hedge_prices, "delay": self.hedge_delay, **self._hedge_stats}}
+    
+    async def _probe_hosts(self):
+        """Keep every host's latency measured, so failover goes to the fastest one"""
+        while True:
+            for host in self.upstream.hosts:
+                started = time.monotonic()
+                try:
+                    await self.scheduler.acquire(request_weight("/api/v3/ping"), PRIORITY_BACKGROUND)
+                    session = await self._get_session()
+                    async with session.get(f"{host}/api/v3/ping", timeout=aiohttp.ClientTimeout(total=self.http_timeout)) as response:
+                        self.scheduler.record_response(response.status, response.headers)
+                        if response.status == 200:
+                            self.upstream.record_latency(host, time.monotonic() - started)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.debug(f"Latency probe of {host} failed: {str(e)}")
+            await asyncio.sleep(self.host_probe_interval)
+    
+    async def _make_request(self, endpoint: str, params: Optional[Dict] = None, method: str = "GET",
+                            priority: int = PRIORITY_CHARTS, hedge: bool = False) -> Any:
+        """
+        Send a request to the fastest upstream host whose breaker allows it.
+        
+        A GET the host fails (rather than rejects) is retried on the next
+        host, up to failover_attempts hosts. Raises CircuitOpenError without
+        touching the network while every host's breaker for the endpoint is
+        open. With `hedge`, a second host
+        gets the same request if the first hasn't answered within
+        hedge_delay, and whichever answers first wins.
+        """
+        if method not in ("GET", "POST"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        
+        if not self.upstream.available(endpoint):
+            raise CircuitOpenError(f"Exchange unavailable: every upstream circuit for {endpoint} is open")
+        
+        # Wait for (or be refused) request-weight budget before sending anything,
+        # and only then pick the host, so a half-open probe isn't held while queued
+        weight = request_weight(endpoint, params)
+        await self.scheduler.acquire(weight, priority)
+        host = self.upstream.pick(endpoint)
+        if host is None:
+            raise CircuitOpenError(f"Exchange unavailable: every upstream circuit for {endpoint} is open")
+        if not hedge or len(self.upstream.hosts) < 2:
+            tried = [host]
+            while True:
+                try:
+                    return await self._send_request(host, endpoint, params, method)
+                except UpstreamHostError:
+                    if method != "GET" or len(tried) >= self.failover_attempts:
+                        raise
+                    # Never wait for budget to retry; the caller has its own fallbacks
+                    host = self._pick_with_spare_budget(endpoint, tried, weight, priority)
+                    if host is None:
+                        raise
+                    tried.append(host)
+        
+        primary = asyncio.ensure_future(self._send_request(host, endpoint, params, method))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay)
+        if done:
+            return primary.result()
+        # Only hedge with budget to spare, and never by waiting for it
+        second = self._pick_with_spare_budget(endpoint, (host,), weight, priority)
+        if second is None:
+            return await primary
+        self._hedge_stats["hedged"] += 1
+        hedged = asyncio.ensure_future(self._send_request(second, endpoint, params, method))
+        pending = {primary, hedged}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedged:
+                            self._hedge_stats["hedge_won"] += 1
+                        return task.result()
+            # Both failed: report the first host's error
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def _pick_with_spare_budget(self, endpoint: str, exclude: Iterable[str], weight: int, priority: int) -> Optional[str]:
+        """Another host for a retry or hedge: only charges budget (never waiting) when one is available"""
+        if self.upstream.pick(endpoint, exclude=exclude, claim=False) is None:
+            return None
+        if not self.scheduler.try_acquire(weight, priority):
+            return None
+        return self.upstream.pick(endpoint, exclude=exclude)
+    
+    async def _send_request(self, host: str, endpoint: str, params: Optional[Dict], method: str) -> Any:
+        """One attempt against one host, reporting the outcome to its breaker"""
+        url = f"{host}{endpoint}"
+        # Don't sit out the full timeout on a host that normally answers in milliseconds
+        timeout = aiohttp.ClientTimeout(total=self.upstream.timeout_for(host, endpoint, self.http_timeout),
+                                        connect=self.http_connect_timeout)
+        started = time.monotonic()
         try:
-            async with aiohttp.ClientSession() as session:
-                if method == "GET":
-                    async with session.get(url, params=params, timeout=10) as response:
-                        if response.status != 200:
-                            text = await response.text()
-                            
-                            # Check for geo-restriction error
-                            if response.status == 451:
-                                self.geo_restricted = True
-                                # Only log this once per class, using the class variable
-                                if not ExchangeService._geo_restriction_logged:
-                                    logger.warning("Binance API access is geo-restricted. Switching to simulation mode.")
-                                    ExchangeService._geo_restriction_logged = True
-                                raise Exception(f"API request failed with status 451: {text}")
-                            
-                            logger.error(f"API request failed: {text}")
-                            raise Exception(f"API request failed with status {response.status}: {text}")
-                        return await response.json()
-                elif method == "POST":
-                    async with session.post(url, json=params, timeout=10) as response:
-                        if response.status != 200:
-                            text = await response.text()
-                            
-                            # Check for geo-restriction error
-                            if response.status == 451:
-                                self.geo_restricted = True
-                                # Only log this once per class, using the class variable
-                                if not ExchangeService._geo_restriction_logged:
-                                    logger.warning("Binance API access is geo-restricted. Switching to simulation mode.")
-                                    ExchangeService._geo_restriction_logged = True
-                                raise Exception(f"API request failed with status 451: {text}")
-                            
-                            logger.error(f"API request failed: {text}")
-                            raise Exception(f"API request failed with status {response.status}: {text}")
-                        return await response.json()
+            session = await self._get_session()
+            request_kwargs = {"params": params} if method == "GET" else {"json": params}
+            async with session.request(method, url, timeout=timeout, **request_kwargs) as response:
+                self.scheduler.record_response(response.status, response.headers)
+                if response.status != 200:
+                    text = await response.text()
+                    UPSTREAM_REQUEST_SECONDS.labels(endpoint, str(response.status)).observe(time.monotonic() - started)
+                    
+                    # Check for geo-restriction error
+                    if response.status == 451:
+                        self.upstream.record_failure(host, endpoint, "geo-restricted", 451, trip=True)
+                        # Only log this once per class, using the class variable
+                        if not ExchangeService._geo_restriction_logged:
+                            logger.warning(f"Binance API access is geo-restricted at {host}. Trying other hosts, "
+                                           "simulating while none is reachable.")
+                            ExchangeService._geo_restriction_logged = True
+                        raise UpstreamHostError(f"API request failed with status 451: {text}")
+                    
+                    logger.error(f"API request failed: {text}")
+                    if response.status >= 500:
+                        self.upstream.record_failure(host, endpoint, f"status {response.status}", response.status)
+                        raise UpstreamHostError(f"API request failed with status {response.status}: {text}")
+                    # The host is fine; the request (or our rate limit) isn't
+                    self.upstream.record_success(host, endpoint, time.monotonic() - started)
+                    raise Exception(f"API request failed with status {response.status}: {text}")
+                data = await response.json()
+                elapsed = time.monotonic() - started
+                UPSTREAM_REQUEST_SECONDS.labels(endpoint, "200").observe(elapsed)
+                self.upstream.record_success(host, endpoint, elapsed)
+                return data
         except aiohttp.ClientError as e:
+            UPSTREAM_REQUEST_SECONDS.labels(endpoint, "error").observe(time.monotonic() - started)
+            self.upstream.record_failure(host, endpoint, f"network error: {str(e)}")
             logger.error(f"Network error in _make_request: {str(e)}")
-            raise Exception(f"Network error when connecting to exchange: {str(e)}")
+            raise UpstreamHostError(f"Network error when connecting to exchange: {str(e)}")
+        except asyncio.TimeoutError:
+            UPSTREAM_REQUEST_SECONDS.labels(endpoint, "timeout").observe(time.monotonic() - started)
+            self.upstream.record_failure(host, endpoint, f"timeout after {timeout.total:.1f}s")
+            logger.error(f"Timeout in _make_request for {url}")
+            raise UpstreamHostError(f"Timeout when connecting to exchange ({endpoint})")
         except Exception as e:
             # Only log unexpected errors that aren't 451 errors to reduce log spam
             if not str(e).startswith("API request failed with status 451"):
@@ -198,12 +396,23 @@ class ExchangeService:
         headers = {'X-MBX-APIKEY': self.api_key}
         
         url = f"{self.base_url}{endpoint}"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params, headers=headers) as response:
-                if response.status != 200:
-                    text = await response.text()
-                    raise Exception(f"API request failed: {text}")
-                return await response.json()
+        await self.scheduler.acquire(request_weight(endpoint, params), PRIORITY_LIVE)
+        session = await self._get_session()
+        async with session.get(url, params=params, headers=headers) as response:
+            self.scheduler.record_response(response.status, response.headers)
+            if response.status != 200:
+                text = await response.text()
+                raise Exception(f"API request failed: {text}")
+            return await response.json()
+    
+    @staticmethod
+    def _new_price_trend() -> Dict[str, Any]:
+        return {
+            'direction': random.choice([1, -1]),  # 1 for up, -1 for down
+            'strength': random.uniform(0.3, 1.0),  # Trend strength
+            'duration': random.randint(10, 30),    # How many updates before changing
+            'updates': 0                           # Counter for updates
+        }
     
     def _generate_simulated_price(self, symbol: str) -> float:
         """
@@ -224,8 +433,10 @@ class ExchangeService:
         last_update = self.last_update_time[symbol]
         time_diff = now - last_update
         
-        # Get current trend info
-        trend = self.price_trends[symbol]
+        # Get current trend info (symbols outside base_prices get one on first use)
+        trend = self.price_trends.get(symbol)
+        if trend is None:
+            trend = self.price_trends[symbol] = self._new_price_trend()
         
         # Update trend if it's time to change
         trend['updates'] += 1
@@ -291,38 +502,132 @@ class ExchangeService:
             
         return should_log
 
-    @suppress_duplicate_logs(interval=30)
+    def add_price_listener(self, callback: Callable[[str, float, float], None]):
+        """
+        Register callback(symbol, price, timestamp) for every price the service
+        obtains: single and bulk exchange fetches and simulated fallbacks.
+        Callbacks run inline on the event loop, so they must be cheap.
+        """
+        if callback not in self._price_listeners:
+            self._price_listeners.append(callback)
+    
+    def remove_price_listener(self, callback: Callable[[str, float, float], None]):
+        if callback in self._price_listeners:
+            self._price_listeners.remove(callback)
+    
+    def _publish_price(self, symbol: str, price: float, timestamp: Optional[float] = None):
+        if not self._price_listeners:
+            return
+        timestamp = timestamp if timestamp is not None else time.time()
+        for callback in self._price_listeners:
+            try:
+                callback(symbol, price, timestamp)
+            except Exception as e:
+                logger.error(f"Price listener failed for {symbol}: {str(e)}")
+    
+    def _cached_price(self, symbol: str) -> Optional[Tuple[float, float]]:
+        """Return (price, age in seconds) of the last real price seen for a symbol"""
+        entry = self._price_entries.get(symbol)
+        if entry is None:
+            return None
+        return entry[0], time.monotonic() - entry[1]
+    
+    def _price_ttl_for(self, symbol: str) -> float:
+        return self.stream_price_ttl if symbol in self._streamed_symbols else self.price_ttl
+    
+    def _store_price(self, symbol: str, price: float, fetched_at: Optional[float] = None):
+        """Record a real exchange price in the TTL cache and the simulation state"""
+        self._price_entries[symbol] = (price, fetched_at if fetched_at is not None else time.monotonic())
+        
+        # Update simulation base with real data
+        if symbol in self.base_prices:
+            self.base_prices[symbol] = price
+        
+        # Cache the last valid price
+        self.last_price_cache[symbol] = price
+        self.last_update_time[symbol] = time.time()
+        
+        self._publish_price(symbol, price, self.last_update_time[symbol])
+    
+    def price_cache_stats(self) -> Dict[str, Any]:
+        """Counters for tuning the price TTL against load"""
+        stats = dict(self._price_stats)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_ratio"] = (stats["hits"] + stats["stale_hits"] + stats["coalesced"]) / lookups if lookups else 0.0
+        stats["entries"] = len(self._price_entries)
+        stats["in_flight"] = len(self._price_inflight)
+        stats["ttl"] = self.price_ttl
+        stats["stale_ttl"] = self.price_stale_ttl
+        return stats
+    
+    def _fetch_price_single_flight(self, symbol: str) -> "asyncio.Future[float]":
+        """Start (or join) the one upstream price request for a symbol"""
+        future = self._price_inflight.get(symbol)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch_price(symbol))
+            self._price_inflight[symbol] = future
+            future.add_done_callback(lambda f: self._on_price_fetched(symbol, f))
+        return future
+    
+    def _on_price_fetched(self, symbol: str, future: "asyncio.Future[float]"):
+        if self._price_inflight.get(symbol) is future:
+            del self._price_inflight[symbol]
+        # Mark the exception as retrieved for background refreshes nobody awaits
+        if not future.cancelled() and future.exception() is not None:
+            self._price_stats["errors"] += 1
+    
+    async def _fetch_price(self, symbol: str) -> float:
+        # Try to get from Binance API
+        endpoint = "/api/v3/ticker/price"
+        params = {"symbol": symbol}
+        
+        logger.debug(f"Fetching price for {symbol}")
+        response = await self._make_request(endpoint, params, priority=PRIORITY_LIVE, hedge=self.hedge_prices)
+        price = float(response["price"])
+        
+        self._store_price(symbol, price)
+        self.fallback_mode = False
+        
+        logger.debug(f"Successfully fetched price for {symbol}: {price}")
+        return price
+    
     async def get_current_price(self, symbol: str) -> float:
-        """Get current price for a symbol with error handling and fallbacks"""
+        """
+        Get current price for a symbol with caching, error handling and fallbacks.
+        
+        Prices younger than price_ttl are served from cache. Up to price_stale_ttl
+        the cached price is still returned while one background refresh runs
+        (stale-while-revalidate). Concurrent misses for a symbol all await the same
+        upstream request instead of each firing their own.
+        """
         try:
-            # If we already know we're geo-restricted, skip the API call
-            if self.geo_restricted:
-                raise Exception("Using simulation mode due to geo-restrictions")
-                
-            # Try to get from Binance API
-            endpoint = "/api/v3/ticker/price"
-            params = {"symbol": symbol}
+            # While every host's breaker is open, skip the API call until one probes again
+            if not self.upstream_available("/api/v3/ticker/price"):
+                raise CircuitOpenError("Using simulation mode while the exchange is unreachable")
             
-            logger.info(f"Fetching price for {symbol}")
-            response = await self._make_request(endpoint, params)
-            price = float(response["price"])
+            cached = self._cached_price(symbol)
+            if cached is not None:
+                price, age = cached
+                if age < self._price_ttl_for(symbol):
+                    self._price_stats["hits"] += 1
+                    return price
+                if age < self.price_stale_ttl:
+                    self._price_stats["stale_hits"] += 1
+                    self._fetch_price_single_flight(symbol)
+                    return price
             
-            # Update simulation base with real data
-            if symbol in self.base_prices:
-                self.base_prices[symbol] = price
-            
-            # Cache the last valid price
-            self.last_price_cache[symbol] = price
-            self.last_update_time[symbol] = time.time()
-            self.fallback_mode = False
+            if symbol in self._price_inflight:
+                self._price_stats["coalesced"] += 1
+            else:
+                self._price_stats["misses"] += 1
             
-            logger.info(f"Successfully fetched price for {symbol}: {price}")
-            return price
+            # Shield so a cancelled caller doesn't cancel the request other callers share
+            return await asyncio.shield(self._fetch_price_single_flight(symbol))
             
         except Exception as e:
-            # Only log the full error message if it's not about geo-restrictions
-            if not self.geo_restricted and not str(e).startswith("API request failed with status 451"):
-                logger.error(f"Error fetching price for {symbol}: {str(e)}")
+            # Only log the full error message if it's not about geo-restrictions or open circuits
+            if not isinstance(e, CircuitOpenError) and not str(e).startswith("API request failed with status 451"):
+                logger.error(f"Error fetching price for {symbol}: {str(e)}", extra={"rate_key": f"price-error:{symbol}"})
             
             # Only log the simulation mode switch once per symbol
             if not self.fallback_mode:
@@ -331,6 +636,7 @@ class ExchangeService:
             
             # Generate a simulated price based on trends and patterns
             simulated_price = self._generate_simulated_price(symbol)
+            self._publish_price(symbol, simulated_price)
             
             # Log simulated prices very infrequently to reduce noise
             if self._should_log_simulation(symbol):
@@ -338,174 +644,454 @@ class ExchangeService:
             
             return simulated_price
     
+    async def get_current_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        Get current prices for several symbols with a single upstream call.
+        
+        Symbols with a fresh cached price are answered from the cache; the rest
+        come from one all-symbols ticker fetch (or the last snapshot while it is
+        still fresh). Any symbol the exchange doesn't return falls back to
+        simulation on its own.
+        """
+        timed = await self.get_current_prices_timed(symbols)
+        return {symbol: price for symbol, (price, _) in timed.items()}
+    
+    async def get_current_prices_timed(self, symbols: List[str]) -> Dict[str, Tuple[float, float]]:
+        """Like get_current_prices, with the wall-clock time each price was obtained"""
+        prices = {}
+        missing = []
+        reachable = self.upstream_available("/api/v3/ticker/price")
+        now = time.time()
+        for symbol in symbols:
+            cached = self._cached_price(symbol)
+            if cached is not None and cached[1] < self._price_ttl_for(symbol) and reachable:
+                self._price_stats["hits"] += 1
+                prices[symbol] = (cached[0], now - cached[1])
+            else:
+                missing.append(symbol)
+        
+        if not missing:
+            return prices
+        
+        snapshot = {}
+        snapshot_time = now
+        if reachable:
+            self._price_stats["misses"] += 1
+            try:
+                snapshot = await self._get_bulk_prices()
+                snapshot_time = time.time() - (time.monotonic() - self._bulk_prices_time)
+            except Exception as e:
+                if not isinstance(e, CircuitOpenError) and not str(e).startswith("API request failed with status 451"):
+                    logger.error(f"Error fetching bulk prices: {str(e)}")
+        
+        for symbol in missing:
+            price = snapshot.get(symbol)
+            if price is None:
+                simulated = self._generate_simulated_price(symbol)
+                simulated_at = time.time()
+                self._publish_price(symbol, simulated, simulated_at)
+                prices[symbol] = (simulated, simulated_at)
+            else:
+                # Seed the simulation state so a later fallback continues from here
+                self.last_price_cache[symbol] = price
+                self.last_update_time[symbol] = time.time()
+                prices[symbol] = (price, snapshot_time)
+        
+        if snapshot:
+            self.fallback_mode = False
+        
+        return prices
+    
+    async def _get_bulk_prices(self) -> Dict[str, float]:
+        """Fetch (or reuse) the all-symbols ticker snapshot"""
+        if self._bulk_prices and time.monotonic() - self._bulk_prices_time < self.bulk_price_ttl:
+            return self._bulk_prices
+        
+        # Concurrent batch requests wait for the one fetch already in progress
+        async with self._bulk_prices_lock:
+            if self._bulk_prices and time.monotonic() - self._bulk_prices_time < self.bulk_price_ttl:
+                return self._bulk_prices
+            
+            response = await self._make_request("/api/v3/ticker/price", priority=PRIORITY_LIVE)
+            fetched_at = time.monotonic()
+            self._bulk_prices = {item["symbol"]: float(item["price"]) for item in response}
+            self._bulk_prices_time = fetched_at
+            
+            # One bulk fetch refreshes the price cache for every symbol
+            now = time.time()
+            for symbol, price in self._bulk_prices.items():
+                self._price_entries[symbol] = (price, fetched_at)
+                if symbol in self.base_prices:
+                    self.base_prices[symbol] = price
+                if symbol in self.last_price_cache:
+                    self.last_price_cache[symbol] = price
+                    self.last_update_time[symbol] = now
+                self._publish_price(symbol, price, now)
+            
+            return self._bulk_prices
+    
+    def limit_streamed_symbols(self, subscribed: Set[str]):
+        """Forget pushed prices for symbols no longer subscribed (all of them while disconnected)"""
+        self._streamed_symbols &= subscribed
+    
+    def on_stream_price(self, symbol: str, price: float):
+        """A price pushed by the exchange websocket: cache it and notify price listeners"""
+        self._streamed_symbols.add(symbol)
+        self._store_price(symbol, price)
+        self.fallback_mode = False
+    
+    def on_stream_kline(self, symbol: str, interval: str, kline: List) -> bool:
+        """
+        Merge a kline pushed by the exchange websocket ([open time ms, open,
+        high, low, close, volume]) into the cached series, if there is one.
+        Returns whether it was applied.
+        """
+        key = (symbol, interval)
+        series = self.candle_cache.peek(key)
+        if series is None or series.last_time is None:
+            return False
+        
+        open_time = int(kline[0]) // 1000
+        if open_time < series.last_time:
+            return False  # an update for a candle that has already closed
+        if interval in INTERVAL_SECONDS and open_time - series.last_time > INTERVAL_SECONDS[interval]:
+            # Candles were missed (e.g. while reconnecting); the REST tail refresh fills the gap
+            series.streamed_at = 0.0
+            return False
+        
+        old_nbytes = series.nbytes
+        series.merge_tail(Candles.from_klines([kline]))
+        series.streamed_at = time.monotonic()
+        self.candle_cache.resize(key, old_nbytes)
+        self.candle_cache.stats["streamed"] += 1
+        self._persist_candles(symbol, interval, series.candles)
+        return True
+    
     async def get_candles(self, symbol: str, interval: str, limit: int = 5000) -> List[Dict]:
         """
         Get candlestick data from Binance or generate simulated data
         if the API is not accessible
         """
+        candles = await self.get_candle_columns(symbol, interval, limit)
+        return candles.to_rows()
+    
+    async def get_candle_columns(self, symbol: str, interval: str, limit: int = 5000) -> Candles:
+        """
+        Get candlestick data as columns, from Binance or simulation.
+        
+        History is cached per (symbol, interval): once loaded, later requests only
+        fetch candles from the last cached open time onward (the forming candle
+        plus anything newer), and not even that within candle_tail_ttl.
+        """
+        candles, _ = await self._get_candle_window(symbol, interval, limit)
+        return candles
+    
+    async def get_candles_binary(self, symbol: str, interval: str, limit: int = 5000) -> bytes:
+        """
+        Get candlestick data in the binary wire format (see services/candles.py).
+        
+        For cached exchange history the closed candles' block is reused across
+        requests, so repeated loads only encode the forming candle.
+        """
+        candles, series = await self._get_candle_window(symbol, interval, limit)
+        if series is not None:
+            return series.encode_binary(len(candles))
+        return encode_binary_message([candles.to_binary_block()])
+    
+    async def _get_candle_window(self, symbol: str, interval: str, limit: int) -> Tuple[Candles, Optional[CandleSeries]]:
+        """Return the latest `limit` candles and the cached series they came from (None if simulated)"""
+        limit = min(limit, self.MAX_CANDLES)
+        
         try:
-            # If we already know we're geo-restricted, skip the API call
-            if self.geo_restricted:
-                return self._generate_simulated_candles(symbol, interval, limit)
-                
-            endpoint = "/api/v3/klines"
-            max_per_request = 1000  # Binance API limit per request
-            
-            # Calculate number of requests needed
-            num_requests = (limit + max_per_request - 1) // max_per_request  # Ceiling division
-            num_requests = min(num_requests, 5)  # Limit to 5 requests (5000 candles)
+            if self.candle_rollup:
+                rolled = await self.rollup.get_window(symbol, interval, limit)
+                if rolled is not None:
+                    return rolled
             
-            all_candles = []
-            end_time = None
+            key = (symbol, interval)
+            series = self.candle_cache.get(key)
             
-            # Make multiple requests if needed
-            for _ in range(num_requests):
-                params = {
-                    "symbol": symbol,
-                    "interval": interval,
-                    "limit": max_per_request
-                }
-                
-                # Add endTime parameter for pagination if we have it
-                if end_time:
-                    params["endTime"] = end_time
-                
-                response = await self._make_request(endpoint, params)
-                
-                # Break if no more candles
-                if not response:
-                    break
-                    
-                # Format candles
-                formatted_batch = []
-                for candle in response:
-                    formatted_batch.append({
-                        "time": candle[0] / 1000,  # Convert from ms to seconds
-                        "open": float(candle[1]),
-                        "high": float(candle[2]),
-                        "low": float(candle[3]),
-                        "close": float(candle[4]),
-                        "volume": float(candle[5])
-                    })
-                
-                # Add to our collection
-                all_candles = formatted_batch + all_candles  # Prepend as we're going backward in time
-                
-                # If we got fewer than requested, we've reached the limit
-                if len(response) < max_per_request:
-                    break
-                    
-                # Set the end time for the next request to be 1ms before the oldest candle
-                end_time = response[0][0] - 1
-                
-                # If we've collected enough candles, stop
-                if len(all_candles) >= limit:
-                    break
+            if series is None or not series.covers(limit):
+                # Nothing to serve and no host to ask: simulate until a breaker probes again
+                if not self.upstream_available("/api/v3/klines"):
+                    return self._generate_simulated_candles(symbol, interval, limit), None
+                series = await self._candle_single_flight(
+                    ("full", symbol, interval, limit),
+                    lambda: self._load_candle_history(symbol, interval, limit),
+                )
+            elif (time.monotonic() - series.refreshed_at >= self.candle_tail_ttl
+                  and time.monotonic() - series.streamed_at >= self.candle_stream_ttl):
+                try:
+                    await self._candle_single_flight(
+                        ("tail", symbol, interval),
+                        lambda: self._refresh_candle_tail(symbol, interval, series),
+                    )
+                except Exception as e:
+                    # Serve the history we already have rather than dropping to simulation
+                    logger.warning(f"Error refreshing candles for {symbol}: {str(e)}")
+                # The refresh may have replaced the series with a full reload
+                series = self.candle_cache.get(key) or series
+            else:
+                self.candle_cache.stats["hits"] += 1
             
-            # Trim to requested limit and ensure correct order (oldest to newest)
-            return all_candles[-limit:] if len(all_candles) > limit else all_candles
+            return series.candles.tail(limit), series
             
         except Exception as e:
             logger.warning(f"Error fetching candles for {symbol}: {str(e)}")
             logger.info(f"Generating simulated candle data for {symbol}")
-            return self._generate_simulated_candles(symbol, interval, limit)
+            return self._generate_simulated_candles(symbol, interval, limit), None
+    
+    async def _candle_single_flight(self, key: Tuple, factory) -> Any:
+        """Run factory() once for concurrent callers sharing the same key"""
+        future = self._candle_inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._candle_inflight[key] = future
+            future.add_done_callback(lambda f: self._candle_inflight.pop(key, None))
+        return await asyncio.shield(future)
     
-    def _generate_simulated_candles(self, symbol: str, interval: str, limit: int) -> List[Dict]:
-        """Generate realistic-looking simulated candle data"""
-        interval_seconds = {
-            '1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
-            '1h': 3600, '2h': 7200, '4h': 14400, '6h': 21600, '8h': 28800,
-            '12h': 43200, '1d': 86400, '3d': 259200, '1w': 604800
-        }.get(interval, 3600)  # Default to 1h if interval not recognized
+    async def _load_candle_history(self, symbol: str, interval: str, limit: int) -> CandleSeries:
+        """Load up to `limit` of the latest candles, from the store where it has them, and cache them"""
+        stored = None
+        if self.candle_store is not None and interval in INTERVAL_SECONDS:
+            stored = await self._load_stored_candles(symbol, interval, limit)
         
-        # Get base price from cached data or fallback
-        base_price = self.base_prices.get(symbol, 100.0)
+        if stored is not None:
+            candles, complete = stored, False
+            self.candle_cache.stats["store_loads"] += 1
+        elif interval in INTERVAL_SECONDS:
+            candles, complete = await self._fetch_klines_concurrent(symbol, interval, limit)
+        else:
+            candles, complete = await self._fetch_klines_sequential(symbol, interval, limit)
+        
+        # Trim to requested limit (pages are oldest to newest already)
+        series = CandleSeries(candles.tail(limit), complete=complete)
+        self.candle_cache.put((symbol, interval), series)
+        self.candle_cache.stats["full_loads"] += 1
+        self._persist_candles(symbol, interval, series.candles)
+        return series
+    
+    async def _load_stored_candles(self, symbol: str, interval: str, limit: int) -> Optional[Candles]:
+        """
+        The latest `limit` candles from the store, brought up to date with only
+        the candles since its last one. None if the store can't cover the
+        request more cheaply than a full download.
+        """
+        stored = self.candle_store.tail(symbol, interval, limit)
+        if not len(stored):
+            return None
+        missing = (int(time.time()) - stored.last_time) // INTERVAL_SECONDS[interval] + 1
+        if missing >= limit or len(stored) + missing - 1 < limit:
+            return None
         
-        # Generate candles
-        candles = []
-        now = int(time.time())
+        fresh = await self._fetch_klines_since(symbol, interval, stored.last_time, missing)
+        if not len(fresh) or fresh.time[0] > stored.last_time:
+            return None
+        # Copies the mapped rows, since the cached series is updated in place
+        cut = int(np.searchsorted(stored.time, fresh.time[0], side="left"))
+        return Candles.concat([stored[:cut], fresh]).tail(limit)
+    
+    def _persist_candles(self, symbol: str, interval: str, candles: Candles):
+        """Queue newly closed candles for the store"""
+        if self.candle_store is not None and interval in INTERVAL_SECONDS:
+            self.candle_store.write_closed(symbol, interval, candles, INTERVAL_SECONDS[interval])
+    
+    def get_stored_candles(self, symbol: str, interval: str, start: Optional[int] = None,
+                           end: Optional[int] = None, limit: int = 5000) -> Candles:
+        """The latest `limit` stored candles opening between start and end (seconds, inclusive)"""
+        if self.candle_store is None:
+            return Candles.empty()
+        return self.candle_store.range(symbol, interval, start, end).tail(min(limit, self.MAX_CANDLES))
+    
+    async def _fetch_klines_since(self, symbol: str, interval: str, start_time: int, limit: int) -> Candles:
+        """Fetch up to `limit` candles opening at or after start_time (seconds), all pages in flight at once"""
+        max_per_request = self.KLINES_PER_REQUEST
+        window_ms = INTERVAL_SECONDS[interval] * 1000 * max_per_request
+        num_requests = (limit + max_per_request - 1) // max_per_request  # Ceiling division
+        start_ms = start_time * 1000
+        semaphore = asyncio.Semaphore(self.candle_fetch_concurrency)
         
-        # Start from oldest candle
-        current_time = now - (interval_seconds * limit)
-        price = base_price * random.uniform(0.8, 1.2) # Start with some variation
+        async def fetch_page(page: int) -> List[List]:
+            params = {
+                "symbol": symbol,
+                "interval": interval,
+                "startTime": start_ms + page * window_ms,
+                "endTime": start_ms + (page + 1) * window_ms - 1,
+                "limit": max_per_request
+            }
+            async with semaphore:
+                return await self._make_request("/api/v3/klines", params)
         
-        # Generate a volatility factor for this symbol
-        if symbol in ['BTCUSDT', 'ETHUSDT']:
-            volatility = 0.02  # 2% for major coins
-        elif symbol in ['SOLUSDT', 'BNBUSDT', 'AVAXUSDT']:
-            volatility = 0.03  # 3% for mid-cap
-        else:
-            volatility = 0.04  # 4% for smaller coins
-            
-        # Simulate a general market trend (bull or bear)
-        market_trend = random.choice([1, -1])  # 1 for bull, -1 for bear
-        trend_strength = random.uniform(0.1, 0.3)
-        
-        # Generate candles
-        for i in range(limit):
-            # Calculate price movement
-            trend_factor = market_trend * trend_strength * random.uniform(0.5, 1.5)
-            random_factor = random.uniform(-1, 1) * volatility
-            
-            # Add some cyclical patterns
-            cycle_position = (i % 20) / 20  # Position in a 20-candle cycle
-            cycle_factor = 0.005 * math.sin(cycle_position * 2 * math.pi)
-            
-            # Combined price change
-            price_change = price * (trend_factor + random_factor + cycle_factor)
-            
-            # Calculate candle values
-            candle_open = price
-            candle_close = price + price_change
+        pages = await asyncio.gather(*(fetch_page(page) for page in range(num_requests)))
+        return Candles.concat(Candles.from_klines(response) for response in pages).dedupe()
+    
+    async def _fetch_klines_concurrent(self, symbol: str, interval: str, limit: int) -> Tuple[Candles, bool]:
+        """
+        Fetch deep history with all pages in flight at once.
+        
+        With a fixed interval length the page windows can be computed up front:
+        page i covers the open times in (now - (i+1)*W, now - i*W] with
+        W = KLINES_PER_REQUEST intervals, so windows neither overlap nor leave gaps.
+        """
+        max_per_request = self.KLINES_PER_REQUEST
+        window_ms = INTERVAL_SECONDS[interval] * 1000 * max_per_request
+        num_requests = (limit + max_per_request - 1) // max_per_request  # Ceiling division
+        now_ms = int(time.time() * 1000)
+        semaphore = asyncio.Semaphore(self.candle_fetch_concurrency)
+        
+        async def fetch_page(page: int) -> List[List]:
+            params = {
+                "symbol": symbol,
+                "interval": interval,
+                "startTime": now_ms - (page + 1) * window_ms + 1,
+                "endTime": now_ms - page * window_ms,
+                "limit": max_per_request
+            }
+            async with semaphore:
+                return await self._make_request("/api/v3/klines", params)
+        
+        pages = await asyncio.gather(*(fetch_page(page) for page in range(num_requests)))
+        
+        # Merge oldest page first, dropping any repeated open times in one pass
+        candles = Candles.concat(Candles.from_klines(response) for response in reversed(pages)).dedupe()
+        
+        # History is complete if the oldest window reaches back before the listing
+        oldest = pages[-1] if pages else []
+        oldest_window_start = now_ms - num_requests * window_ms + 1
+        complete = not oldest or oldest[0][0] > oldest_window_start + INTERVAL_SECONDS[interval] * 1000
+        
+        return candles, complete
+    
+    async def _fetch_klines_sequential(self, symbol: str, interval: str, limit: int) -> Tuple[Candles, bool]:
+        """Walk back page by page, for intervals without a fixed length (e.g. 1M)"""
+        max_per_request = self.KLINES_PER_REQUEST
+        num_requests = (limit + max_per_request - 1) // max_per_request  # Ceiling division
+        
+        pages = []
+        fetched = 0
+        end_time = None
+        complete = False
+        
+        for _ in range(num_requests):
+            params = {
+                "symbol": symbol,
+                "interval": interval,
+                "limit": max_per_request
+            }
             
-            # Determine high and low with some randomness
-            price_range = abs(candle_close - candle_open) * random.uniform(1.2, 2.0)
-            if candle_open > candle_close:  # Bearish candle
-                candle_high = candle_open + (price_range * random.uniform(0.1, 0.4))
-                candle_low = candle_close - (price_range * random.uniform(0.6, 0.9))
-            else:  # Bullish candle
-                candle_high = candle_close + (price_range * random.uniform(0.6, 0.9))
-                candle_low = candle_open - (price_range * random.uniform(0.1, 0.4))
+            # Add endTime parameter for pagination if we have it
+            if end_time:
+                params["endTime"] = end_time
             
-            # Generate volume with some correlation to price movement
-            base_volume = base_price * random.uniform(10, 100)
-            volume_factor = 1 + (abs(price_change) / price) * random.uniform(5, 15)
-            volume = base_volume * volume_factor
+            response = await self._make_request("/api/v3/klines", params)
             
-            # Create candle
-            candle = {
-                "time": current_time,
-                "open": candle_open,
-                "high": candle_high,
-                "low": candle_low,
-                "close": candle_close,
-                "volume": volume
-            }
+            # Break if no more candles
+            if not response:
+                complete = True
+                break
             
-            candles.append(candle)
+            pages.append(Candles.from_klines(response))
+            fetched += len(response)
             
-            # Update for next candle
-            current_time += interval_seconds
-            price = candle_close
+            # If we got fewer than requested, we've reached the start of the listing
+            if len(response) < max_per_request:
+                complete = True
+                break
             
-            # Occasionally change market trend
-            if random.random() < 0.05:  # 5% chance per candle
-                market_trend *= -1
+            # Set the end time for the next request to be 1ms before the oldest candle
+            end_time = response[0][0] - 1
             
-            # Occasionally change trend strength
-            if random.random() < 0.1:  # 10% chance per candle
-                trend_strength = random.uniform(0.1, 0.3)
+            if fetched >= limit:
+                break
         
-        return candles
+        # Pages were collected newest first; join them oldest to newest once
+        return Candles.concat(reversed(pages)), complete
+    
+    async def _refresh_candle_tail(self, symbol: str, interval: str, series: CandleSeries):
+        """Fetch only the forming candle and anything newer, and merge it into the series"""
+        if series.last_time is None:
+            return
+        
+        params = {
+            "symbol": symbol,
+            "interval": interval,
+            "startTime": int(series.last_time * 1000),
+            "limit": self.KLINES_PER_REQUEST
+        }
+        response = await self._make_request("/api/v3/klines", params)
+        
+        # A full page means we've been away too long for one round trip; reload instead
+        if len(response) >= self.KLINES_PER_REQUEST:
+            await self._load_candle_history(symbol, interval, len(series.candles))
+            return
+        
+        old_nbytes = series.nbytes
+        series.merge_tail(Candles.from_klines(response))
+        self.candle_cache.resize((symbol, interval), old_nbytes)
+        self.candle_cache.stats["tail_refreshes"] += 1
+        self._persist_candles(symbol, interval, series.candles)
+    
+    def _generate_simulated_candles(self, symbol: str, interval: str, limit: int, seed: Optional[int] = None) -> Candles:
+        """
+        Generate realistic-looking simulated candle data.
+        
+        Without a seed the series is cached per (symbol, interval) and extended
+        as new intervals start, so repeat requests see one consistent history.
+        With a seed the output is deterministic and bypasses the cache.
+        """
+        interval_seconds = INTERVAL_SECONDS.get(interval) or parse_interval(interval) or 3600  # Default to 1h if interval not recognized
+        last_open = int(time.time()) // interval_seconds * interval_seconds
+        
+        # Get base price from cached data or fallback
+        base_price = self.base_prices.get(symbol, 100.0)
+        volatility = symbol_volatility(symbol)
+        
+        if seed is not None:
+            rng = np.random.default_rng(seed)
+            candles, _ = simulate_candles(
+                rng, limit, last_open - (limit - 1) * interval_seconds, interval_seconds,
+                base_price * rng.uniform(0.8, 1.2), base_price, volatility,
+            )
+            return candles
+        
+        key = (symbol, interval)
+        simulated = self._simulated_series.get(key)
+        
+        if simulated is None or len(simulated["candles"]) < limit:
+            rng = np.random.default_rng()
+            candles, state = simulate_candles(
+                rng, limit, last_open - (limit - 1) * interval_seconds, interval_seconds,
+                base_price * rng.uniform(0.8, 1.2),  # Start with some variation
+                base_price, volatility,
+            )
+            simulated = {"candles": candles, "rng": rng, "state": state}
+        else:
+            # Append the intervals that started since the series was last extended
+            candles = simulated["candles"]
+            missing = (last_open - candles.last_time) // interval_seconds
+            if missing > 0:
+                new_candles, simulated["state"] = simulate_candles(
+                    simulated["rng"], missing, candles.last_time + interval_seconds, interval_seconds,
+                    float(candles.close[-1]), base_price, volatility, simulated["state"],
+                )
+                size = len(candles)
+                simulated["candles"] = Candles.concat([candles, new_candles]).tail(size)
+        
+        self._simulated_series[key] = simulated
+        self._simulated_series.move_to_end(key)
+        while len(self._simulated_series) > self.MAX_SIMULATED_SERIES:
+            self._simulated_series.popitem(last=False)
+        
+        return simulated["candles"].tail(limit)
     
     async def get_exchange_info(self) -> Dict:
         """Get exchange information or return simulated data if API is not accessible"""
         try:
-            if self.geo_restricted:
+            if not self.upstream_available("/api/v3/exchangeInfo"):
                 return self._get_simulated_exchange_info()
                 
             endpoint = "/api/v3/exchangeInfo"
-            response = await self._make_request(endpoint)
+            response = await self._make_request(endpoint, priority=PRIORITY_BACKGROUND)
             
             # Filter only necessary information
             symbols_info = []
@@ -0,0 +1,271 @@
+import os
+import numpy as np
+from collections import OrderedDict
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+from services.candles import Candles
+
+# Every indicator returns arrays aligned with the candle columns, NaN where
+# there isn't enough history yet (e.g. the first period - 1 values of an SMA).
+
+# Largest growth factor allowed inside one block of the vectorized EWM before
+# starting a new block; keeps the rescaled cumulative sum far from overflow.
+_EWM_MAX_SCALE = 1e50
+
+def _ewm(values: np.ndarray, alpha: float, initial: float) -> np.ndarray:
+    """
+    y[t] = (1 - alpha) * y[t-1] + alpha * x[t], with y[-1] = initial.
+
+    Vectorized in blocks: inside a block the recursion has the closed form
+    y[k] = w^(k+1) * (y0 + alpha * sum_{j<=k} x[j] * w^-(j+1)) with w = 1 - alpha,
+    i.e. one cumsum per block. Blocks are sized so w^-k stays representable.
+    """
+    n = len(values)
+    out = np.empty(n)
+    if n == 0:
+        return out
+    w = 1.0 - alpha
+    if w <= 0.0:
+        out[:] = values
+        return out
+
+    block = max(1, min(n, int(np.log(_EWM_MAX_SCALE) / -np.log(w))))
+    powers = w ** np.arange(1, block + 1)  # w^(k+1) for k in [0, block)
+    carry = initial
+    for start in range(0, n, block):
+        chunk = values[start:start + block]
+        p = powers[:len(chunk)]
+        out[start:start + len(chunk)] = p * (carry + alpha * np.cumsum(chunk / p))
+        carry = out[start + len(chunk) - 1]
+    return out
+
+def seeded_ewm(values: np.ndarray, period: int, alpha: float) -> np.ndarray:
+    """EWM seeded with the SMA of the first `period` values (the charting convention)"""
+    out = np.full(len(values), np.nan)
+    if period < 1 or len(values) < period:
+        return out
+    seed = values[:period].mean()
+    out[period - 1] = seed
+    out[period:] = _ewm(values[period:], alpha, seed)
+    return out
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    if period < 1 or len(values) < period:
+        return out
+    # Windowed mean rather than a cumsum difference, which loses all precision
+    # once the series spans many orders of magnitude (as simulated data can)
+    out[period - 1:] = sliding_window_view(values, period).mean(axis=1)
+    return out
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    return seeded_ewm(values, period, 2.0 / (period + 1))
+
+def rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """Relative strength index with Wilder smoothing"""
+    out = np.full(len(close), np.nan)
+    if period < 1 or len(close) <= period:
+        return out
+    delta = np.diff(close)
+    avg_gain = seeded_ewm(np.clip(delta, 0, None), period, 1.0 / period)
+    avg_loss = seeded_ewm(np.clip(-delta, 0, None), period, 1.0 / period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    values = np.where(avg_loss == 0, 100.0, values)
+    out[1:] = np.where(np.isnan(avg_gain), np.nan, values)
+    return out
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = np.full(len(close), np.nan)
+    start = max(fast, slow) - 1
+    if len(close) > start:
+        signal_line[start:] = ema(line[start:], signal)
+    return {"macd": line, "signal": signal_line, "histogram": line - signal_line}
+
+def bollinger(close: np.ndarray, period: int = 20, width: float = 2.0) -> Dict[str, np.ndarray]:
+    middle = sma(close, period)
+    deviation = np.full(len(close), np.nan)
+    if period >= 1 and len(close) >= period:
+        deviation[period - 1:] = sliding_window_view(close, period).std(axis=1)
+    return {"upper": middle + width * deviation, "middle": middle, "lower": middle - width * deviation}
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """Average true range with Wilder smoothing"""
+    if len(close) == 0:
+        return np.empty(0)
+    prev_close = np.concatenate(([close[0]], close[:-1]))
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    true_range[0] = high[0] - low[0]
+    return seeded_ewm(true_range, period, 1.0 / period)
+
+def vwap(candles: Candles, session_seconds: int = 86400) -> np.ndarray:
+    """Volume-weighted average price, re-anchored at each UTC session (day by default)"""
+    if len(candles) == 0:
+        return np.empty(0)
+    typical = (candles.high + candles.low + candles.close) / 3.0
+    weighted = np.cumsum(typical * candles.volume)
+    volume = np.cumsum(candles.volume)
+
+    # Subtract the running totals as they stood before each session started
+    session = candles.time // session_seconds
+    starts = np.flatnonzero(np.concatenate(([True], session[1:] != session[:-1])))
+    lengths = np.diff(np.concatenate((starts, [len(candles)])))
+    base_weighted = np.repeat(np.concatenate(([0.0], weighted))[starts], lengths)
+    base_volume = np.repeat(np.concatenate(([0.0], volume))[starts], lengths)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (weighted - base_weighted) / (volume - base_volume)
+
+# name -> (default parameters, parameter types)
+INDICATORS: Dict[str, Tuple[Tuple, Tuple]] = {
+    "sma": ((20,), (int,)),
+    "ema": ((20,), (int,)),
+    "rsi": ((14,), (int,)),
+    "macd": ((12, 26, 9), (int, int, int)),
+    "bb": ((20, 2.0), (int, float)),
+    "atr": ((14,), (int,)),
+    "vwap": ((), ()),
+}
+ALIASES = {"bollinger": "bb"}
+MAX_PERIOD = 5000
+
+IndicatorResult = Union[np.ndarray, Dict[str, np.ndarray]]
+
+def parse_specs(specs: str) -> List[Tuple[str, Tuple]]:
+    """
+    Parse "ema:9,rsi:14,macd:12:26:9" into [("ema", (9,)), ("rsi", (14,)), ...].
+    Missing parameters take their defaults; raises ValueError on anything unknown.
+    """
+    parsed = []
+    for raw in specs.split(","):
+        raw = raw.strip().lower()
+        if not raw:
+            continue
+        name, *args = raw.split(":")
+        name = ALIASES.get(name, name)
+        if name not in INDICATORS:
+            raise ValueError(f"Unknown indicator: {name}")
+        defaults, types = INDICATORS[name]
+        if len(args) > len(defaults):
+            raise ValueError(f"Too many parameters for {name}: {raw}")
+        try:
+            params = tuple(cast(arg) for cast, arg in zip(types, args)) + defaults[len(args):]
+        except ValueError:
+            raise ValueError(f"Invalid parameters for {name}: {raw}")
+        if any(isinstance(p, int) and not 1 <= p <= MAX_PERIOD for p in params):
+            raise ValueError(f"Periods must be between 1 and {MAX_PERIOD}: {raw}")
+        parsed.append((name, params))
+    if not parsed:
+        raise ValueError("No indicators requested")
+    return parsed
+
+def spec_key(name: str, params: Tuple) -> str:
+    """Canonical spec string, e.g. ("macd", (12, 26, 9)) -> "macd:12:26:9" """
+    return ":".join([name, *(f"{p:g}" if isinstance(p, float) else str(p) for p in params)])
+
+def compute(candles: Candles, name: str, params: Tuple) -> IndicatorResult:
+    if name == "sma":
+        return sma(candles.close, *params)
+    if name == "ema":
+        return ema(candles.close, *params)
+    if name == "rsi":
+        return rsi(candles.close, *params)
+    if name == "macd":
+        return macd(candles.close, *params)
+    if name == "bb":
+        return bollinger(candles.close, *params)
+    if name == "atr":
+        return atr(candles.high, candles.low, candles.close, *params)
+    if name == "vwap":
+        return vwap(candles)
+    raise ValueError(f"Unknown indicator: {name}")
+
+def to_json(values: IndicatorResult) -> Any:
+    """Arrays to lists, with NaN (not enough history yet) as null"""
+    if isinstance(values, dict):
+        return {key: to_json(array) for key, array in values.items()}
+    return np.where(np.isnan(values), None, values).tolist()
+
+# Rough in-memory cost of one JSON-ready value: a list slot plus a float object
+_BYTES_PER_VALUE = 32
+
+def _result_bytes(values: IndicatorResult) -> int:
+    if isinstance(values, dict):
+        return sum(array.size for array in values.values()) * _BYTES_PER_VALUE
+    return values.size * _BYTES_PER_VALUE
+
+def _window_key(candles: Candles) -> Tuple:
+    """Identifies the candle window: its span plus every column of the forming candle"""
+    if len(candles) == 0:
+        return (0,)
+    return (len(candles), int(candles.time[0]), int(candles.time[-1]),
+            *(float(getattr(candles, name)[-1]) for name in ("open", "high", "low", "close", "volume")))
+
+class IndicatorEngine:
+    """
+    Computes indicators over the cached candle columns, once per distinct input.
+
+    There is one memo slot per (symbol, interval, spec, window length) holding
+    the JSON-ready result and the window it was computed from; a request
+    whose window differs (a new candle, or any change to the forming one)
+    recomputes and replaces the slot, so every viewer of the same chart shares
+    one computation and old windows never pile up. Slots are evicted LRU once
+    their estimated size exceeds the memory budget.
+    """
+
+    def __init__(self, exchange_service, max_bytes: Optional[int] = None):
+        self.exchange_service = exchange_service
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.getenv("INDICATOR_CACHE_MAX_MB", "64")) * 1024 * 1024)
+        self._memo: "OrderedDict[Tuple, Tuple[Tuple, Any, int]]" = OrderedDict()  # slot -> (window, result, bytes)
+        self._bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    async def get_indicators(self, symbol: str, interval: str, specs: str, limit: int = 5000) -> Dict[str, Any]:
+        parsed = parse_specs(specs)
+        candles = await self.exchange_service.get_candle_columns(symbol, interval, limit)
+        window = _window_key(candles)
+
+        indicators = {}
+        for name, params in parsed:
+            key = spec_key(name, params)
+            indicators[key] = self._compute_memoized((symbol, interval, key, len(candles)), window, candles, name, params)
+
+        return {
+            "symbol": symbol,
+            "timeframe": interval,
+            "time": candles.time.tolist(),
+            "indicators": indicators,
+        }
+
+    def _compute_memoized(self, slot: Tuple, window: Tuple, candles: Candles, name: str, params: Tuple) -> Any:
+        entry = self._memo.get(slot)
+        if entry is not None and entry[0] == window:
+            self.stats["hits"] += 1
+            self._memo.move_to_end(slot)
+            return entry[1]
+
+        self.stats["misses"] += 1
+        values = compute(candles, name, params)
+        result = to_json(values)
+        size = _result_bytes(values)
+        if entry is not None:
+            self._bytes -= entry[2]
+            del self._memo[slot]
+        self._memo[slot] = (window, result, size)
+        self._bytes += size
+        # Always keep the most recently used slot, even if it alone exceeds the budget
+        while self._bytes > self.max_bytes and len(self._memo) > 1:
+            _, (_, _, evicted) = self._memo.popitem(last=False)
+            self._bytes -= evicted
+            self.stats["evictions"] += 1
+        return result
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "entries": len(self._memo),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,143 @@
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from typing import Dict, List, Any, Hashable, Optional
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets one record per key through per interval and counts the rest.
+
+    The key is the record's `rate_key` when the log call passes one (e.g.
+    extra={"rate_key": f"price-error:{symbol}"} to group messages that only
+    differ in their details), otherwise its logger, level and message. A
+    record may also pass `rate_interval` to use its own interval. The next
+    record let through for a key says how many were suppressed before it.
+
+    Runs on the thread that logs, before anything is queued, so suppressed
+    records cost one dict lookup. Records from other threads may race on a
+    key's count, which at worst lets an extra record through.
+    """
+
+    def __init__(self, interval: float = 30.0, max_keys: int = 10000):
+        super().__init__()
+        self.interval = interval  # seconds; 0 disables rate limiting
+        self.max_keys = max_keys
+        self._seen: Dict[Hashable, List[float]] = {}  # key -> [last let through, suppressed since]
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        interval = getattr(record, "rate_interval", self.interval)
+        if interval <= 0:
+            return True
+        key = getattr(record, "rate_key", None) or (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        entry = self._seen.get(key)
+        if entry is not None and now - entry[0] < interval:
+            entry[1] += 1
+            self.suppressed += 1
+            return False
+
+        if entry is not None and entry[1]:
+            record.msg = f"{record.getMessage()} ({int(entry[1])} similar suppressed in the last {now - entry[0]:.0f}s)"
+            record.args = None
+        elif entry is None and len(self._seen) >= self.max_keys:
+            self._prune(now)
+        self._seen[key] = [now, 0]
+        return True
+
+    def _prune(self, now: float):
+        self._seen = {key: entry for key, entry in self._seen.items() if now - entry[0] < self.interval}
+        if len(self._seen) >= self.max_keys:
+            self._seen.clear()
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread unformatted.
+
+    The stock QueueHandler formats every record on the calling thread; here
+    only %-style arguments are merged into the message (they could change
+    before the listener gets to them) and the formatter runs in the
+    listener. The queue is a SimpleQueue, whose put doesn't take a Python
+    level lock; past max_size records are dropped instead of piling up.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        super().__init__(queue.SimpleQueue())
+        self.max_size = max_size
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+_handler: Optional[DeferredQueueHandler] = None
+_output: Optional[logging.Handler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_rate_limit: Optional[RateLimitFilter] = None
+
+def configure_logging(level: Optional[str] = None, rate_limit_interval: Optional[float] = None,
+                      queue_size: Optional[int] = None) -> logging.handlers.QueueListener:
+    """
+    Route every log record through a bounded queue to a background thread
+    that formats and writes it, rate-limiting repeats on the way in.
+    Replaces whatever handlers the root logger had; call stop_logging() on
+    shutdown to flush what's queued.
+    """
+    global _handler, _output, _listener, _rate_limit
+    stop_logging()
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    interval = rate_limit_interval if rate_limit_interval is not None else float(os.getenv("LOG_RATE_LIMIT", "30"))
+    size = queue_size if queue_size is not None else int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+    _output = logging.StreamHandler(sys.stderr)
+    _output.setFormatter(logging.Formatter(LOG_FORMAT))
+    _rate_limit = RateLimitFilter(interval)
+    _handler = DeferredQueueHandler(size)
+    _handler.addFilter(_rate_limit)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    numeric_level = logging.getLevelName(level)
+    root.setLevel(numeric_level if isinstance(numeric_level, int) else logging.INFO)
+
+    _listener = logging.handlers.QueueListener(_handler.queue, _output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def stop_logging():
+    """Write out everything queued and stop the listener thread; later records are written directly"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        root = logging.getLogger()
+        root.removeHandler(_handler)
+        _output.addFilter(_rate_limit)
+        root.addHandler(_output)
+
+def logging_info() -> Dict[str, Any]:
+    if _handler is None:
+        return {"configured": False}
+    return {
+        "configured": True,
+        "queued": _handler.queue.qsize(),
+        "dropped": _handler.dropped,
+        "suppressed": _rate_limit.suppressed,
+        "rate_limit_interval": _rate_limit.interval,
+    }
@@ -0,0 +1,154 @@
+import math
+from bisect import bisect_left
+from typing import Callable, Dict, List, Any, Iterable, Optional, Sequence, Tuple
+
+# Prometheus text exposition format, version 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4"  # the response adds the charset
+
+# Seconds; from sub-millisecond cache paths to upstream timeouts
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _HistogramChild:
+    """One label combination's buckets; observe() only bumps preallocated counts"""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # per bucket, not cumulative; the last is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets, optionally labelled.
+
+    labels() returns the child for a label combination, creating it the first
+    time; hot paths with a fixed label set can keep the child and call
+    observe() on it directly. Updates happen on the event loop only, so no
+    locking is needed.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(sorted(buckets))
+        self._children: Dict[Tuple[str, ...], _HistogramChild] = {}
+
+    def labels(self, *values: str) -> _HistogramChild:
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            child = self._children[values] = _HistogramChild(self.bounds)
+        return child
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def remove(self, *values: str):
+        self._children.pop(values, None)
+
+    def samples(self) -> Iterable[str]:
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), child.counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, values)} {_format_value(child.sum)}"
+            yield f"{self.name}_count{_labels(self.labelnames, values)} {child.count}"
+
+class Collected:
+    """
+    A counter or gauge read at scrape time from state the code keeps anyway
+    (stats dicts, queue sizes, subscriber sets), so it costs nothing until
+    /metrics is requested. `collect` returns (label values, value) pairs.
+    """
+
+    def __init__(self, name: str, documentation: str, type: str, labelnames: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[Sequence[str], float]]]):
+        if type not in ("counter", "gauge"):
+            raise ValueError(f"Unsupported metric type: {type}")
+        self.name = name
+        self.documentation = documentation
+        self.type = type
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def samples(self) -> Iterable[str]:
+        for values, value in self.collect():
+            yield f"{self.name}{_labels(self.labelnames, values)} {_format_value(value)}"
+
+class Registry:
+    """The metrics /metrics renders, in registration order"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def register(self, metric):
+        # Re-registering a name replaces it, so re-created services don't leave stale collectors behind
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def collected(self, name: str, documentation: str, type: str, collect: Callable,
+                  labelnames: Sequence[str] = ()) -> Collected:
+        return self.register(Collected(name, documentation, type, labelnames, collect))
+
+    def get(self, name: str) -> Optional[Any]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# Histograms observed on hot paths
+UPSTREAM_REQUEST_SECONDS = REGISTRY.histogram(
+    "exchange_request_duration_seconds", "Upstream exchange request latency by endpoint and status",
+    ("endpoint", "status"))
+PRICE_SEND_SECONDS = REGISTRY.histogram(
+    "price_ws_send_duration_seconds", "Time to send one price tick to one websocket subscriber", ("symbol",))
+ALERT_CYCLE_SECONDS = REGISTRY.histogram(
+    "alert_evaluation_cycle_seconds", "Time to evaluate the alerts for one batch of price updates")
+ALERT_DETECTION_SECONDS = REGISTRY.histogram(
+    "alert_detection_latency_seconds", "Time from a price being obtained to the alerts it triggers firing")
+DISCORD_DELIVERY_SECONDS = REGISTRY.histogram(
+    "discord_delivery_latency_seconds", "Time from queueing a Discord notification to its webhook delivery",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+DISCORD_WEBHOOK_SECONDS = REGISTRY.histogram(
+    "discord_webhook_duration_seconds", "Discord webhook request latency by status", ("status",))
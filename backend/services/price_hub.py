@@ -0,0 +1,142 @@
+from fastapi import WebSocket
+from typing import Dict, Set, Optional, Any
+import asyncio
+import json
+import logging
+import random
+import time
+
+from services.metrics import PRICE_SEND_SECONDS
+
+logger = logging.getLogger("price_hub")
+
+# Last-resort prices used when neither the exchange nor the cache can provide one
+FALLBACK_PRICES = {
+    'BTCUSDT': 65000.0,
+    'ETHUSDT': 3500.0,
+}
+
+class PriceHub:
+    """
+    Fan-out hub for live price websockets.
+
+    Runs exactly one producer task per subscribed symbol: the task is started
+    when the first client subscribes and cancelled when the last one leaves.
+    Every tick is fetched once, encoded once and sent to all subscribers
+    concurrently, so upstream calls stay at one per symbol per interval no
+    matter how many viewers are connected.
+    """
+
+    def __init__(self, exchange_service, interval: float = 1.0, send_timeout: float = 5.0):
+        self.exchange_service = exchange_service
+        self.interval = interval          # seconds between ticks
+        self.send_timeout = send_timeout  # drop clients that can't take a tick within this time
+        self.subscribers: Dict[str, Set[WebSocket]] = {}
+        self.last_prices: Dict[str, float] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def subscribe(self, symbol: str, websocket: WebSocket):
+        """Register a websocket for a symbol, starting its producer if needed"""
+        sockets = self.subscribers.setdefault(symbol, set())
+        sockets.add(websocket)
+
+        # Give late joiners the latest tick right away instead of waiting a full interval
+        if symbol in self.last_prices:
+            await self._send(websocket, json.dumps({"symbol": symbol, "price": self.last_prices[symbol]}),
+                             PRICE_SEND_SECONDS.labels(symbol))
+
+        task = self._tasks.get(symbol)
+        if task is None or task.done():
+            self._tasks[symbol] = asyncio.create_task(self._produce(symbol))
+            logger.info(f"Started price producer for {symbol}")
+
+    async def unsubscribe(self, symbol: str, websocket: WebSocket):
+        """Remove a websocket, stopping the symbol's producer when nobody is left"""
+        sockets = self.subscribers.get(symbol)
+        if sockets is None:
+            return
+        sockets.discard(websocket)
+
+        if not sockets:
+            del self.subscribers[symbol]
+            PRICE_SEND_SECONDS.remove(symbol)
+            task = self._tasks.pop(symbol, None)
+            if task is not None:
+                task.cancel()
+                logger.info(f"Stopped price producer for {symbol}")
+
+    async def close(self):
+        """Cancel every producer task (called on app shutdown)"""
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def subscriber_count(self, symbol: Optional[str] = None) -> int:
+        if symbol is not None:
+            return len(self.subscribers.get(symbol, ()))
+        return sum(len(sockets) for sockets in self.subscribers.values())
+
+    async def _next_payload(self, symbol: str) -> Dict[str, Any]:
+        try:
+            price = await self.exchange_service.get_current_price(symbol)
+            self.last_prices[symbol] = price
+            return {"symbol": symbol, "price": price}
+        except Exception as e:
+            logger.error(f"Error fetching price for {symbol}: {str(e)}")
+
+            # Use cached price if available
+            if symbol in self.last_prices:
+                return {"symbol": symbol, "price": self.last_prices[symbol], "cached": True}
+
+            # Generate fallback price
+            fallback_price = FALLBACK_PRICES.get(symbol, 100.0)
+            variation = random.uniform(-0.005, 0.005)  # ±0.5% variation
+            return {"symbol": symbol, "price": fallback_price * (1 + variation), "fallback": True}
+
+    async def _produce(self, symbol: str):
+        try:
+            while self.subscribers.get(symbol):
+                started = time.monotonic()
+
+                payload = await self._next_payload(symbol)
+                await self.broadcast(symbol, payload)
+
+                # Keep a steady cadence regardless of how long the fetch and fan-out took
+                elapsed = time.monotonic() - started
+                await asyncio.sleep(max(0.0, self.interval - elapsed))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Price producer for {symbol} crashed: {str(e)}")
+        finally:
+            if self._tasks.get(symbol) is asyncio.current_task():
+                del self._tasks[symbol]
+
+    async def broadcast(self, symbol: str, data: dict):
+        """Send one tick to every subscriber of a symbol, encoding it only once"""
+        sockets = self.subscribers.get(symbol)
+        if not sockets:
+            return
+
+        message = json.dumps(data)
+        targets = list(sockets)
+        latency = PRICE_SEND_SECONDS.labels(symbol)
+        results = await asyncio.gather(*(self._send(ws, message, latency) for ws in targets))
+
+        # Clean up dead connections
+        for websocket, ok in zip(targets, results):
+            if not ok:
+                sockets.discard(websocket)
+
+    async def _send(self, websocket: WebSocket, message: str, latency=None) -> bool:
+        try:
+            started = time.monotonic()
+            await asyncio.wait_for(websocket.send_text(message), timeout=self.send_timeout)
+            if latency is not None:
+                latency.observe(time.monotonic() - started)
+            return True
+        except Exception as e:
+            logger.error(f"Error sending data to client: {str(e)}")
+            return False
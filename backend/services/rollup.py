@@ -0,0 +1,167 @@
+import os
+import re
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from services.candles import Candles
+from services.candle_cache import CandleSeries
+
+_UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+_INTERVAL_PATTERN = re.compile(r"^([1-9]\d*)([mhdw])$")
+
+# Weekly candles open on Monday 00:00 UTC; the epoch was a Thursday
+_WEEK_OFFSET = 4 * 86400
+
+def parse_interval(interval: str) -> Optional[int]:
+    """Seconds in a fixed-length interval such as '45m', '2h' or '1w'; None otherwise (e.g. '1M')"""
+    match = _INTERVAL_PATTERN.match(interval)
+    if match is None:
+        return None
+    return int(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+
+def bucket_starts(times: np.ndarray, interval_seconds: int) -> np.ndarray:
+    """Open time of the interval_seconds bar each open time falls in"""
+    offset = _WEEK_OFFSET if interval_seconds % _UNIT_SECONDS["w"] == 0 else 0
+    return (times - offset) // interval_seconds * interval_seconds + offset
+
+def aggregate(candles: Candles, interval_seconds: int) -> Candles:
+    """
+    Roll finer candles up into interval_seconds bars in one vectorized pass:
+    first open, highest high, lowest low, last close and summed volume of
+    the candles in each bar. The first and last bars may be partial.
+    """
+    if not len(candles):
+        return candles
+    buckets = bucket_starts(candles.time, interval_seconds)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(candles)] - 1
+    return Candles(
+        buckets[starts],
+        candles.open[starts],
+        np.maximum.reduceat(candles.high, starts),
+        np.minimum.reduceat(candles.low, starts),
+        candles.close[ends],
+        np.add.reduceat(candles.volume, starts),
+    )
+
+class RolledSeries(CandleSeries):
+    """Bars aggregated from a finer source interval"""
+
+    def __init__(self, candles: Candles, source: str, complete: bool = False):
+        super().__init__(candles, complete=complete)
+        self.source = source
+
+class RollupEngine:
+    """
+    Candles for any fixed-length interval derived from a finer cached series.
+
+    A 1m base series per symbol, loaded to max_base_candles the first time
+    it is needed and then kept current by the exchange service's tail
+    refreshes (or the kline stream), serves every window that fits in it:
+    with the default 20000 minutes, 1000-bar windows up to 15m, including
+    non-exchange intervals like 2m and 10m, cost no further upstream
+    requests when switching timeframes. Deeper windows use a finer cached
+    series if one covers them; otherwise exchange intervals are fetched
+    natively and the rest roll up from the coarsest exchange interval that
+    divides them.
+
+    Rolled bars are cached per (symbol, interval); as source candles arrive
+    only the last, partial bar onward is re-aggregated.
+    """
+
+    def __init__(self, exchange_service, native_intervals: Dict[str, int], base_interval: str = "1m",
+                 max_base_candles: Optional[int] = None, max_series: int = 256):
+        self.exchange_service = exchange_service
+        # Sources must share epoch-aligned bar boundaries, which 3d and 1w bars don't with finer ones
+        self.sources = sorted(((seconds, name) for name, seconds in native_intervals.items()
+                               if seconds <= _UNIT_SECONDS["d"]))
+        self.native = native_intervals
+        self.base_interval = base_interval
+        self.max_base_candles = max_base_candles if max_base_candles is not None else int(
+            os.getenv("ROLLUP_BASE_CANDLES", "20000"))
+        self.max_series = max_series
+        self._series: "OrderedDict[Tuple[str, str], RolledSeries]" = OrderedDict()
+        self.stats = {"full": 0, "incremental": 0, "native": 0}
+
+    def _source_for(self, symbol: str, interval: str, interval_seconds: int, limit: int) -> Optional[Tuple[str, int]]:
+        """(source interval, source candles to fetch), or None to fetch the interval natively"""
+        candidates = [(seconds, name) for seconds, name in self.sources
+                      if seconds < interval_seconds and interval_seconds % seconds == 0]
+        if not candidates:
+            return None
+
+        def needed(seconds: int) -> int:
+            # One bar extra, since the oldest one is usually partial
+            return (limit + 1) * (interval_seconds // seconds)
+
+        # The base is loaded to its full depth once, then serves every window that fits
+        base_seconds = self.native[self.base_interval]
+        if interval_seconds % base_seconds == 0 and needed(base_seconds) <= self.max_base_candles:
+            return self.base_interval, self.max_base_candles
+
+        # A finer series that is already cached deep enough costs nothing
+        for seconds, name in candidates:
+            series = self.exchange_service.candle_cache.peek((symbol, name))
+            if series is not None and series.covers(needed(seconds)):
+                return name, needed(seconds)
+
+        if interval in self.native:
+            return None
+
+        # Not an exchange interval: the coarsest source needs the fewest pages
+        seconds, name = candidates[-1]
+        return name, min(needed(seconds), self.exchange_service.MAX_CANDLES)
+
+    async def get_window(self, symbol: str, interval: str, limit: int) -> Optional[Tuple[Candles, Optional[CandleSeries]]]:
+        """
+        The latest `limit` bars and the series they came from (None if the
+        source was simulated), or None if the interval should be fetched natively.
+        """
+        if interval == self.base_interval:
+            return None
+        interval_seconds = parse_interval(interval)
+        if interval_seconds is None:
+            return None
+        source = self._source_for(symbol, interval, interval_seconds, limit)
+        if source is None:
+            self.stats["native"] += 1
+            return None
+        source_interval, count = source
+
+        window, source_series = await self.exchange_service._get_candle_window(symbol, source_interval, count)
+        if source_series is None:
+            # Simulated source; don't mix it into the cache of real bars
+            return self._complete_bars(window, interval_seconds, False).tail(limit), None
+
+        key = (symbol, interval)
+        rolled = self._series.get(key)
+        if (rolled is not None and rolled.source == source_interval and rolled.covers(limit)
+                and len(window) and window.time[0] <= rolled.last_time):
+            # Re-aggregate from the last (partial) bar onward
+            start = int(np.searchsorted(window.time, rolled.last_time, side="left"))
+            rolled.merge_tail(aggregate(window[start:], interval_seconds))
+            self.stats["incremental"] += 1
+        else:
+            rolled = RolledSeries(self._complete_bars(window, interval_seconds, source_series.complete),
+                                  source_interval, complete=source_series.complete)
+            self.stats["full"] += 1
+
+        self._series[key] = rolled
+        self._series.move_to_end(key)
+        while len(self._series) > self.max_series:
+            self._series.popitem(last=False)
+        return rolled.candles.tail(limit), rolled
+
+    @staticmethod
+    def _complete_bars(window: Candles, interval_seconds: int, complete: bool) -> Candles:
+        bars = aggregate(window, interval_seconds)
+        # The oldest bar is missing its first candles unless the window starts on
+        # a bar boundary or at the start of the listing
+        if len(bars) > 1 and not complete and bars.time[0] < window.time[0]:
+            bars = bars[1:]
+        return bars
+
+    def info(self) -> Dict[str, Any]:
+        return {"series": len(self._series), "max_base_candles": self.max_base_candles, **self.stats}
@@ -0,0 +1,221 @@
+import aiohttp
+import asyncio
+import json
+import logging
+import os
+import random
+from typing import Callable, Dict, Iterable, List, Any, Optional, Set
+
+logger = logging.getLogger("stream_ingestor")
+
+# Binance allows 1024 streams per connection and 5 incoming messages per second
+MAX_STREAMS = 1024
+PARAMS_PER_MESSAGE = 200
+MESSAGE_SPACING = 0.25  # seconds between subscription messages
+
+STREAM_TYPES = ("miniTicker", "aggTrade", "kline")
+
+class StreamIngestor:
+    """
+    Live prices and candles from Binance combined websocket streams.
+
+    For every symbol something is watching (price websockets, active alerts)
+    it subscribes to <symbol>@miniTicker and <symbol>@aggTrade, and to
+    <symbol>@kline_<interval> for every cached candle series. Pushed prices
+    go into the exchange service's price cache, and from there to its price
+    listeners (the alert evaluator and streaming indicators); pushed klines
+    are merged into the cached candle series.
+
+    The wanted streams are reconciled every reconcile_interval with
+    SUBSCRIBE/UNSUBSCRIBE messages on the open connection. A dropped
+    connection is re-opened with exponential backoff and everything is
+    subscribed again. While the stream is down cached prices and candles age
+    out at their normal TTLs, so REST polling, and the simulation behind it,
+    take over on their own.
+    """
+
+    def __init__(self, exchange_service, symbol_sources: Iterable[Callable[[], Iterable[str]]] = (),
+                 url: Optional[str] = None, stream_types: Optional[Iterable[str]] = None,
+                 reconcile_interval: float = 1.0, heartbeat: float = 30.0):
+        self.exchange_service = exchange_service
+        self.symbol_sources = list(symbol_sources)
+        self.url = url or os.getenv("BINANCE_STREAM_URL", "wss://stream.binance.com:9443/stream")
+        if stream_types is None:
+            stream_types = os.getenv("BINANCE_STREAM_TYPES", ",".join(STREAM_TYPES)).split(",")
+        self.stream_types = [name.strip() for name in stream_types if name.strip()]
+        unknown = set(self.stream_types) - set(STREAM_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown stream types: {', '.join(sorted(unknown))}")
+        self.reconcile_interval = reconcile_interval
+        self.heartbeat = heartbeat  # seconds between websocket pings
+        self.max_backoff = 60.0
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._tasks: List[asyncio.Task] = []
+        self._subscribed: Set[str] = set()
+        self._request_id = 0
+        self._reconcile_lock = asyncio.Lock()
+        self.stats = {"connects": 0, "disconnects": 0, "frames": 0, "prices": 0, "klines": 0,
+                      "klines_skipped": 0, "errors": 0}
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None and not self._ws.closed
+
+    def start(self):
+        """Connect and keep the subscriptions current (call from a running loop)"""
+        if self._tasks:
+            return
+        self._session = aiohttp.ClientSession()
+        self._tasks = [
+            asyncio.create_task(self._run(), name="stream-ingestor"),
+            asyncio.create_task(self._reconcile_loop(), name="stream-reconcile"),
+        ]
+        logger.info(f"Streaming prices from {self.url} ({', '.join(self.stream_types)})")
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def wanted_streams(self) -> Set[str]:
+        """Stream names for everything currently watched, capped at MAX_STREAMS"""
+        symbols = set()
+        for source in self.symbol_sources:
+            symbols.update(source())
+
+        price_types = [name for name in self.stream_types if name != "kline"]
+        streams = [f"{symbol.lower()}@{name}" for symbol in sorted(symbols) for name in price_types]
+        if "kline" in self.stream_types:
+            streams.extend(f"{symbol.lower()}@kline_{interval}"
+                           for symbol, interval in self.exchange_service.candle_cache.keys())
+
+        if len(streams) > MAX_STREAMS:
+            logger.warning(f"{len(streams)} streams wanted, only the first {MAX_STREAMS} are subscribed")
+            streams = streams[:MAX_STREAMS]
+        return set(streams)
+
+    async def _run(self):
+        backoff = 1.0
+        while True:
+            try:
+                async with self._session.ws_connect(self.url, heartbeat=self.heartbeat) as ws:
+                    self._ws = ws
+                    self._subscribed = set()
+                    self.stats["connects"] += 1
+                    backoff = 1.0
+                    logger.info(f"Connected to {self.url}")
+                    await self._reconcile()
+                    async for message in ws:
+                        if message.type == aiohttp.WSMsgType.TEXT:
+                            self.handle_frame(message.data)
+                        elif message.type == aiohttp.WSMsgType.ERROR:
+                            raise ws.exception() or Exception("websocket error")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Exchange stream error: {str(e)}")
+            finally:
+                self._on_disconnect()
+
+            # Jitter keeps several workers from reconnecting in lockstep
+            delay = backoff * random.uniform(0.5, 1.0)
+            logger.info(f"Reconnecting to exchange stream in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _on_disconnect(self):
+        if self._ws is not None:
+            self.stats["disconnects"] += 1
+        self._ws = None
+        self._subscribed = set()
+        # Polling takes over until the stream is back
+        self.exchange_service.limit_streamed_symbols(set())
+
+    async def _reconcile_loop(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            if not self.connected:
+                continue
+            try:
+                await self._reconcile()
+            except Exception as e:
+                logger.error(f"Error updating stream subscriptions: {str(e)}")
+
+    async def _reconcile(self):
+        """Subscribe to newly wanted streams and drop the ones nobody watches any more"""
+        async with self._reconcile_lock:
+            ws = self._ws
+            if ws is None or ws.closed:
+                return
+            wanted = self.wanted_streams()
+            removed = sorted(self._subscribed - wanted)
+            added = sorted(wanted - self._subscribed)
+            first = True
+            for method, names in (("UNSUBSCRIBE", removed), ("SUBSCRIBE", added)):
+                for start in range(0, len(names), PARAMS_PER_MESSAGE):
+                    if not first:
+                        await asyncio.sleep(MESSAGE_SPACING)
+                    first = False
+                    self._request_id += 1
+                    await ws.send_json({"method": method, "params": names[start:start + PARAMS_PER_MESSAGE],
+                                        "id": self._request_id})
+            if ws is not self._ws:
+                return  # disconnected meanwhile; the next connection subscribes from scratch
+            self._subscribed = wanted
+            if removed or added:
+                logger.info(f"Exchange stream subscriptions: +{len(added)} -{len(removed)} ({len(wanted)} total)")
+
+            price_types = {name for name in self.stream_types if name != "kline"}
+            self.exchange_service.limit_streamed_symbols(
+                {name.split("@")[0].upper() for name in wanted if name.split("@")[1] in price_types}
+            )
+
+    def handle_frame(self, text: str):
+        """Apply one combined-stream frame ({"stream": ..., "data": ...})"""
+        self.stats["frames"] += 1
+        try:
+            frame = json.loads(text)
+            data = frame.get("data")
+            if data is None:
+                # Reply to a SUBSCRIBE/UNSUBSCRIBE request
+                if frame.get("error"):
+                    self.stats["errors"] += 1
+                    logger.error(f"Exchange stream request {frame.get('id')} failed: {frame['error']}")
+                return
+
+            event = data.get("e")
+            if event == "aggTrade":
+                self.exchange_service.on_stream_price(data["s"], float(data["p"]))
+                self.stats["prices"] += 1
+            elif event == "24hrMiniTicker":
+                self.exchange_service.on_stream_price(data["s"], float(data["c"]))
+                self.stats["prices"] += 1
+            elif event == "kline":
+                kline = data["k"]
+                row = [kline["t"], kline["o"], kline["h"], kline["l"], kline["c"], kline["v"]]
+                if self.exchange_service.on_stream_kline(data["s"], kline["i"], row):
+                    self.stats["klines"] += 1
+                else:
+                    self.stats["klines_skipped"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Bad exchange stream frame: {str(e)}")
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "connected": self.connected,
+            "streams": len(self._subscribed),
+            **self.stats,
+        }
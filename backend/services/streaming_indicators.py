@@ -0,0 +1,311 @@
+import math
+import numpy as np
+from collections import OrderedDict, deque
+from typing import Dict, List, Any, Optional, Set, Tuple, Union
+import time
+
+from services.indicators import parse_specs, spec_key, ema, seeded_ewm
+from services.exchange_service import INTERVAL_SECONDS
+
+# Every streaming indicator has the same two operations:
+#
+#   seed(closes)          load the committed state from closed-candle history
+#   update(close, closed) O(1); with closed=False the value for the forming
+#                         candle is returned without touching committed state,
+#                         with closed=True the candle is committed
+#
+# update() returns None until there is enough history for a value.
+
+StreamValue = Union[None, float, Dict[str, Optional[float]]]
+
+class StreamingEWM:
+    """Exponentially weighted average seeded with the SMA of its first `period` inputs"""
+
+    def __init__(self, period: int, alpha: float):
+        self.period = period
+        self.alpha = alpha
+        self.value: Optional[float] = None  # committed average
+        self._warmup: List[float] = []      # inputs seen before the first average exists
+
+    def seed(self, values: np.ndarray):
+        self._warmup = []
+        self.value = None
+        if len(values) >= self.period:
+            self.value = float(seeded_ewm(values, self.period, self.alpha)[-1])
+        else:
+            self._warmup = [float(v) for v in values]
+
+    def update(self, x: float, closed: bool) -> Optional[float]:
+        if self.value is None:
+            # Warm-up is O(period) once, then every update is O(1)
+            if len(self._warmup) + 1 < self.period:
+                if closed:
+                    self._warmup.append(x)
+                return None
+            result = (sum(self._warmup) + x) / self.period
+            if closed:
+                self.value = result
+                self._warmup = []
+            return result
+
+        result = self.value + self.alpha * (x - self.value)
+        if closed:
+            self.value = result
+        return result
+
+class StreamingEMA(StreamingEWM):
+    def __init__(self, period: int):
+        super().__init__(period, 2.0 / (period + 1))
+
+class StreamingRSI:
+    """RSI with Wilder smoothing of gains and losses"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.avg_gain = StreamingEWM(period, 1.0 / period)
+        self.avg_loss = StreamingEWM(period, 1.0 / period)
+        self.prev_close: Optional[float] = None
+
+    def seed(self, closes: np.ndarray):
+        delta = np.diff(closes)
+        self.avg_gain.seed(np.clip(delta, 0, None))
+        self.avg_loss.seed(np.clip(-delta, 0, None))
+        self.prev_close = float(closes[-1]) if len(closes) else None
+
+    def update(self, close: float, closed: bool) -> Optional[float]:
+        if self.prev_close is None:
+            if closed:
+                self.prev_close = close
+            return None
+        delta = close - self.prev_close
+        gain = self.avg_gain.update(max(delta, 0.0), closed)
+        loss = self.avg_loss.update(max(-delta, 0.0), closed)
+        if closed:
+            self.prev_close = close
+        if gain is None or loss is None:
+            return None
+        if loss == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+class StreamingMACD:
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+        self.start = max(fast, slow) - 1
+
+    def seed(self, closes: np.ndarray):
+        self.fast.seed(closes)
+        self.slow.seed(closes)
+        line = ema(closes, self.fast.period) - ema(closes, self.slow.period)
+        self.signal.seed(line[self.start:] if len(closes) > self.start else np.empty(0))
+
+    def update(self, close: float, closed: bool) -> Dict[str, Optional[float]]:
+        fast = self.fast.update(close, closed)
+        slow = self.slow.update(close, closed)
+        if fast is None or slow is None:
+            return {"macd": None, "signal": None, "histogram": None}
+        line = fast - slow
+        signal = self.signal.update(line, closed)
+        return {"macd": line, "signal": signal, "histogram": None if signal is None else line - signal}
+
+class StreamingWindow:
+    """
+    Rolling mean and population variance over the last `period` closes,
+    maintained with sliding Welford updates (one add/replace per candle).
+    """
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window: deque = deque(maxlen=period)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def seed(self, closes: np.ndarray):
+        tail = closes[-self.period:]
+        self.window = deque((float(v) for v in tail), maxlen=self.period)
+        self.mean = float(tail.mean()) if len(tail) else 0.0
+        self.m2 = float(((tail - self.mean) ** 2).sum()) if len(tail) else 0.0
+
+    def _next(self, x: float) -> Tuple[float, float, int]:
+        size = len(self.window)
+        if size < self.period:
+            # Growing window: plain Welford add
+            mean = self.mean + (x - self.mean) / (size + 1)
+            return mean, self.m2 + (x - self.mean) * (x - mean), size + 1
+        # Full window: replace the oldest value
+        old = self.window[0]
+        mean = self.mean + (x - old) / size
+        return mean, max(self.m2 + (x - old) * (x - mean + old - self.mean), 0.0), size
+
+    def update(self, close: float, closed: bool) -> Optional[Tuple[float, float]]:
+        """(mean, population std) over the window including `close`"""
+        mean, m2, size = self._next(close)
+        if closed:
+            self.window.append(close)
+            self.mean, self.m2 = mean, m2
+        if size < self.period:
+            return None
+        return mean, math.sqrt(m2 / size)
+
+class StreamingSMA:
+    def __init__(self, period: int):
+        self.window = StreamingWindow(period)
+
+    def seed(self, closes: np.ndarray):
+        self.window.seed(closes)
+
+    def update(self, close: float, closed: bool) -> Optional[float]:
+        stats = self.window.update(close, closed)
+        return None if stats is None else stats[0]
+
+class StreamingBollinger:
+    def __init__(self, period: int = 20, width: float = 2.0):
+        self.window = StreamingWindow(period)
+        self.width = width
+
+    def seed(self, closes: np.ndarray):
+        self.window.seed(closes)
+
+    def update(self, close: float, closed: bool) -> Dict[str, Optional[float]]:
+        stats = self.window.update(close, closed)
+        if stats is None:
+            return {"upper": None, "middle": None, "lower": None}
+        mean, std = stats
+        return {"upper": mean + self.width * std, "middle": mean, "lower": mean - self.width * std}
+
+# Only close-driven indicators can be maintained from a price stream
+STREAMING_INDICATORS = {
+    "ema": StreamingEMA,
+    "sma": StreamingSMA,
+    "rsi": StreamingRSI,
+    "macd": StreamingMACD,
+    "bb": StreamingBollinger,
+}
+
+class IndicatorStream:
+    """One streaming indicator for a (symbol, interval), tracking the forming candle"""
+
+    def __init__(self, indicator, interval_seconds: int):
+        self.indicator = indicator
+        self.interval_seconds = interval_seconds
+        self.forming_time: Optional[int] = None  # open time of the candle being built
+        self.forming_close: Optional[float] = None
+        self.value: StreamValue = None
+        self.stale = True  # needs seeding from candle history
+
+    def seed(self, candles):
+        if len(candles) == 0:
+            return
+        self.indicator.seed(candles.close[:-1])
+        self.forming_time = int(candles.time[-1])
+        self.forming_close = float(candles.close[-1])
+        self.value = self.indicator.update(self.forming_close, closed=False)
+        self.stale = False
+
+    def on_price(self, price: float, timestamp: float):
+        if self.stale:
+            return
+        bucket = int(timestamp) // self.interval_seconds * self.interval_seconds
+        if bucket > self.forming_time:
+            if bucket - self.forming_time > self.interval_seconds:
+                # Whole candles went by without a tick; re-seed from history on next read
+                self.stale = True
+                return
+            # The last tick of the previous candle is its close
+            self.indicator.update(self.forming_close, closed=True)
+            self.forming_time = bucket
+        elif bucket < self.forming_time:
+            return  # late tick for a candle we've already closed
+        self.forming_close = price
+        self.value = self.indicator.update(price, closed=False)
+
+    def is_current(self, now: float) -> bool:
+        """Whether the stream has seen the candle that is forming right now"""
+        bucket = int(now) // self.interval_seconds * self.interval_seconds
+        return not self.stale and self.forming_time is not None and self.forming_time >= bucket
+
+class IndicatorStreams:
+    """
+    Registry of streaming indicators keyed by (symbol, interval, spec).
+
+    Streams are shared by every consumer: each is seeded once from the cached
+    candles, then advanced in O(1) by the prices the exchange service already
+    obtains (via its price listener), independent of history length. Reads
+    also fetch the (TTL-cached) current price, so a symbol nobody else is
+    polling still moves.
+    """
+
+    def __init__(self, exchange_service, max_streams: int = 1024, history: int = 5000):
+        self.exchange_service = exchange_service
+        self.max_streams = max_streams
+        self.history = history  # candles used to seed a stream
+        self._streams: "OrderedDict[Tuple[str, str, str], IndicatorStream]" = OrderedDict()
+        self._by_symbol: Dict[str, Set[Tuple[str, str, str]]] = {}
+        exchange_service.add_price_listener(self.on_price)
+
+    def on_price(self, symbol: str, price: float, timestamp: float):
+        keys = self._by_symbol.get(symbol)
+        if not keys:
+            return
+        for key in keys:
+            self._streams[key].on_price(price, timestamp)
+
+    async def get_values(self, symbol: str, interval: str, specs: str) -> Dict[str, Any]:
+        """Current values (forming candle included) for each requested spec"""
+        if interval not in INTERVAL_SECONDS:
+            raise ValueError(f"Unsupported interval for streaming indicators: {interval}")
+        parsed = parse_specs(specs)
+        for name, _ in parsed:
+            if name not in STREAMING_INDICATORS:
+                raise ValueError(f"Indicator {name} needs full candles and can't be streamed")
+
+        # Nothing else may be publishing prices for this symbol (no price
+        # websocket viewers, no alerts), so fetch one; it is TTL-cached
+        price = await self.exchange_service.get_current_price(symbol)
+
+        now = time.time()
+        streams = {}
+        candles = None
+        for name, params in parsed:
+            key = (symbol, interval, spec_key(name, params))
+            stream = self._streams.get(key)
+            if stream is None:
+                stream = self._add(key, IndicatorStream(STREAMING_INDICATORS[name](*params), INTERVAL_SECONDS[interval]))
+            self._streams.move_to_end(key)
+
+            if not stream.is_current(now):
+                if candles is None:
+                    candles = await self.exchange_service.get_candle_columns(symbol, interval, self.history)
+                stream.seed(candles)
+            # A cache hit isn't republished to listeners, so apply it here (idempotent)
+            stream.on_price(price, now)
+            streams[key[2]] = stream
+
+        forming_time = max((stream.forming_time or 0) for stream in streams.values())
+        return {
+            "symbol": symbol,
+            "timeframe": interval,
+            "time": forming_time or None,
+            "indicators": {spec: stream.value for spec, stream in streams.items()},
+        }
+
+    def _add(self, key: Tuple[str, str, str], stream: IndicatorStream) -> IndicatorStream:
+        self._streams[key] = stream
+        self._by_symbol.setdefault(key[0], set()).add(key)
+        while len(self._streams) > self.max_streams:
+            old_key, _ = self._streams.popitem(last=False)
+            keys = self._by_symbol.get(old_key[0])
+            if keys is not None:
+                keys.discard(old_key)
+                if not keys:
+                    del self._by_symbol[old_key[0]]
+        return stream
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "streams": len(self._streams),
+            "symbols": len(self._by_symbol),
+            "stale": sum(1 for stream in self._streams.values() if stream.stale),
+        }
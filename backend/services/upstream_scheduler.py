@@ -0,0 +1,196 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from typing import Dict, List, Any, Mapping, Optional
+
+logger = logging.getLogger("upstream_scheduler")
+
+# Request priorities, most urgent first
+PRIORITY_LIVE = 0        # current prices, which alert checks run on
+PRIORITY_CHARTS = 1      # candle history for chart loads
+PRIORITY_BACKGROUND = 2  # exchangeInfo and other reference data
+PRIORITY_BACKFILL = 3    # bulk history downloads
+PRIORITY_NAMES = {PRIORITY_LIVE: "live", PRIORITY_CHARTS: "charts",
+                  PRIORITY_BACKGROUND: "background", PRIORITY_BACKFILL: "backfill"}
+
+# Per priority: the share of the weight limit it may use, and the longest it
+# waits for budget before being rejected (None: as long as it takes). Lower
+# priorities stop short of the limit, leaving headroom for the ones above.
+PRIORITY_POLICY = {
+    PRIORITY_LIVE: (1.0, 5.0),
+    PRIORITY_CHARTS: (0.9, 5.0),
+    PRIORITY_BACKGROUND: (0.6, 60.0),
+    PRIORITY_BACKFILL: (0.5, None),
+}
+
+# Binance's documented request weights; endpoints not listed weigh 1
+_ENDPOINT_WEIGHTS = {
+    "/api/v3/klines": 2,
+    "/api/v3/exchangeInfo": 20,
+    "/api/v3/account": 20,
+    "/api/v3/avgPrice": 2,
+}
+
+def request_weight(endpoint: str, params: Optional[Mapping[str, Any]] = None) -> int:
+    """Weight Binance charges for one request"""
+    params = params or {}
+    if endpoint in ("/api/v3/ticker/price", "/api/v3/ticker/bookTicker"):
+        return 2 if "symbol" in params else 4
+    if endpoint == "/api/v3/ticker/24hr":
+        return 2 if "symbol" in params else 80
+    if endpoint == "/api/v3/depth":
+        limit = int(params.get("limit", 100))
+        return 5 if limit <= 100 else 25 if limit <= 500 else 50 if limit <= 1000 else 250
+    return _ENDPOINT_WEIGHTS.get(endpoint, 1)
+
+class UpstreamBudgetExceeded(Exception):
+    """A request was rejected to keep within the upstream request-weight limit"""
+
+class UpstreamScheduler:
+    """
+    Keeps upstream traffic inside Binance's request-weight limit per minute.
+
+    Each request is charged its documented weight against the current
+    minute's budget before it is sent, and the count is corrected from the
+    X-MBX-USED-WEIGHT-1M header of every response, which also reflects other
+    workers sharing the IP. A request whose priority has used up its share of
+    the budget waits for the next minute, behind waiting requests of the same
+    or higher priority, or is rejected with UpstreamBudgetExceeded if that
+    would take longer than its priority may wait. A 429 or 418 response
+    blocks everything until its Retry-After has passed.
+    """
+
+    def __init__(self, weight_limit: Optional[int] = None, policy: Optional[Dict[int, tuple]] = None):
+        self.weight_limit = weight_limit or int(os.getenv("BINANCE_WEIGHT_LIMIT", "6000"))
+        self.policy = policy or PRIORITY_POLICY
+        self._window = self._current_window()
+        self._used = 0
+        self._blocked_until = 0.0  # wall-clock time a 429/418 told us to wait for
+        self._waiters: List[tuple] = []  # heap of (priority, seq, weight, future)
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self.stats = {priority: {"requests": 0, "weight": 0, "waited": 0, "wait_seconds": 0.0,
+                                 "max_wait_seconds": 0.0, "rejected": 0}
+                      for priority in self.policy}
+
+    @staticmethod
+    def _current_window() -> int:
+        # Binance's weight counter resets on the wall-clock minute
+        return int(time.time() // 60)
+
+    def _roll(self):
+        window = self._current_window()
+        if window != self._window:
+            self._window = window
+            self._used = 0
+
+    def _fits(self, weight: int, priority: int) -> bool:
+        share = self.policy[priority][0]
+        return time.time() >= self._blocked_until and self._used + weight <= self.weight_limit * share
+
+    def _available_at(self) -> float:
+        """Wall-clock time more budget becomes available"""
+        return max((self._window + 1) * 60, self._blocked_until)
+
+    def _charge(self, weight: int, priority: int):
+        self._used += weight
+        stats = self.stats[priority]
+        stats["requests"] += 1
+        stats["weight"] += weight
+
+    def try_acquire(self, weight: int, priority: int = PRIORITY_CHARTS) -> bool:
+        """Charge a request only if it fits right away"""
+        self._roll()
+        ahead = any(waiter[0] <= priority and not waiter[3].done() for waiter in self._waiters)
+        if ahead or not self._fits(weight, priority):
+            return False
+        self._charge(weight, priority)
+        return True
+
+    async def acquire(self, weight: int, priority: int = PRIORITY_CHARTS):
+        """Wait until a request of this weight may be sent, or raise UpstreamBudgetExceeded"""
+        if self.try_acquire(weight, priority):
+            return
+
+        max_wait = self.policy[priority][1]
+        stats = self.stats[priority]
+        if max_wait is not None and self._available_at() - time.time() > max_wait:
+            stats["rejected"] += 1
+            raise UpstreamBudgetExceeded(
+                f"Upstream request weight budget exhausted ({self._used}/{self.weight_limit} used this minute)"
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), weight, future))
+        self._schedule_wakeup()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(future, max_wait)
+        except asyncio.TimeoutError:
+            stats["rejected"] += 1
+            raise UpstreamBudgetExceeded("Timed out waiting for upstream request weight budget")
+        finally:
+            waited = time.monotonic() - started
+            stats["waited"] += 1
+            stats["wait_seconds"] += waited
+            stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+
+    def _schedule_wakeup(self):
+        if self._wakeup is not None:
+            return
+        delay = max(self._available_at() - time.time(), 0.0)
+        self._wakeup = asyncio.get_running_loop().call_later(delay, self._release)
+
+    def _release(self):
+        """Let waiting requests through in priority order while they fit"""
+        self._wakeup = None
+        self._roll()
+        while self._waiters:
+            priority, _, weight, future = self._waiters[0]
+            if future.done():  # timed out or cancelled
+                heapq.heappop(self._waiters)
+                continue
+            if not self._fits(weight, priority):
+                break
+            heapq.heappop(self._waiters)
+            self._charge(weight, priority)
+            future.set_result(None)
+        if self._waiters:
+            self._schedule_wakeup()
+
+    def record_response(self, status: int, headers: Mapping[str, str]):
+        """Correct the budget from a response's used-weight header and back off on 429/418"""
+        used = headers.get("X-MBX-USED-WEIGHT-1M")
+        if used is not None:
+            self._roll()
+            # Our own count may include requests still in flight
+            self._used = max(self._used, int(used))
+        if status in (418, 429):
+            retry_after = float(headers.get("Retry-After", "60"))
+            self._blocked_until = max(self._blocked_until, time.time() + retry_after)
+            logger.warning(f"Upstream rate limit hit (status {status}); pausing requests for {retry_after:.0f}s")
+
+    def info(self) -> Dict[str, Any]:
+        self._roll()
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, _, future in self._waiters:
+            if not future.done():
+                queued[PRIORITY_NAMES[priority]] += 1
+        return {
+            "weight_limit": self.weight_limit,
+            "weight_used": self._used,
+            "resets_in": round(max((self._window + 1) * 60 - time.time(), 0.0), 3),
+            "blocked_for": round(max(self._blocked_until - time.time(), 0.0), 3),
+            "queued": queued,
+            "priorities": {
+                PRIORITY_NAMES[priority]: {
+                    **stats,
+                    "share": self.policy[priority][0],
+                    "avg_wait_seconds": round(stats["wait_seconds"] / stats["waited"], 4) if stats["waited"] else 0.0,
+                }
+                for priority, stats in self.stats.items()
+            },
+        }
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Make the backend packages (services, routes, models) importable from the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the shared ExchangeService from writing a candle store into the working
+# directory; store tests use their own under tmp_path
+os.environ.setdefault("CANDLE_STORE_DIR", "")
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+from services.alert_evaluator import AlertEvaluator
+from services.alert_index import AlertIndex
+
+def alert(alert_id, condition, value, symbol="BTCUSDT"):
+    return {"id": alert_id, "symbol": symbol, "condition": condition, "value": str(value), "status": "active"}
+
+class FakeExchange:
+    """Price listeners plus a batch lookup answering from a fixed, already cached price"""
+
+    def __init__(self, prices=None):
+        self.prices = prices or {}
+        self.listeners = []
+        self.polls = 0
+
+    def add_price_listener(self, callback):
+        self.listeners.append(callback)
+
+    def remove_price_listener(self, callback):
+        self.listeners.remove(callback)
+
+    async def get_current_prices_timed(self, symbols):
+        self.polls += 1
+        return {symbol: self.prices[symbol] for symbol in symbols if symbol in self.prices}
+
+def test_a_burst_of_ticks_is_evaluated_once():
+    fired = []
+
+    async def scenario():
+        index = AlertIndex()
+        index.add(alert("above-110", "above", 110))
+        exchange = FakeExchange()
+        evaluator = AlertEvaluator(exchange, index, lambda alert_id, price, *args: fired.append((alert_id, price)),
+                                   poll_interval=3600)
+        evaluator.start()
+        now = time.time()
+        for price in range(100, 121):
+            for listener in exchange.listeners:
+                listener("BTCUSDT", float(price), now)
+        await asyncio.sleep(0.01)
+        await evaluator.close()
+        return evaluator.stats
+
+    stats = asyncio.run(scenario())
+    # Only the newest of the 21 ticks is evaluated
+    assert stats["ticks"] == 21 and stats["evaluations"] == 1
+    assert fired == [("above-110", 120.0)]
+
+def test_fallback_poll_triggers_without_ticks():
+    fired = []
+    obtained = time.time() - 2.0  # a price cached two seconds ago
+
+    async def scenario():
+        index = AlertIndex()
+        index.add(alert("below-60k", "below", 60000))
+        exchange = FakeExchange({"BTCUSDT": (59000.0, obtained)})
+        evaluator = AlertEvaluator(exchange, index, lambda *args: fired.append(args), poll_interval=0.01)
+        evaluator.start()
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if fired:
+                break
+        await evaluator.close()
+        return evaluator
+
+    evaluator = asyncio.run(scenario())
+    assert len(fired) == 1
+    alert_id, price, _, price_time, _ = fired[0]
+    assert (alert_id, price, price_time) == ("below-60k", 59000.0, obtained)
+    # Latency runs from when the price was obtained, not when the poll saw it
+    assert evaluator.latency_stats()["max_ms"] >= 2000
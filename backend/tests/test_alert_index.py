@@ -0,0 +1,102 @@
+import random
+
+from services.alert_index import AlertIndex, cross_tolerance
+
+def alert(alert_id, condition, value, symbol="BTCUSDT", status="active"):
+    return {"id": alert_id, "symbol": symbol, "condition": condition, "value": str(value), "status": status}
+
+def triggered(index, symbol, price):
+    return sorted(alert_id for alert_id, _ in index.match(symbol, price))
+
+def test_above_and_below_are_strict():
+    index = AlertIndex()
+    index.add(alert("above-100", "above", 100))
+    index.add(alert("below-100", "below", 100))
+    assert triggered(index, "BTCUSDT", 100) == []
+    assert triggered(index, "BTCUSDT", 100.01) == ["above-100"]
+    assert triggered(index, "BTCUSDT", 99.99) == ["below-100"]
+    assert len(index) == 0
+
+def test_crosses_range_boundaries():
+    index = AlertIndex()
+    # Far enough apart that the near-threshold tolerance doesn't apply
+    for value in (1000, 2000, 3000):
+        index.add(alert(f"crosses-{value}", "crosses", value))
+    assert triggered(index, "BTCUSDT", 500) == []  # first price: nothing to cross from
+    # Moving up covers (previous, price]
+    assert triggered(index, "BTCUSDT", 2000) == ["crosses-1000", "crosses-2000"]
+    # Moving down covers [price, previous): 2000 is gone, 3000 isn't in range
+    index.add(alert("crosses-2000b", "crosses", 2000))
+    assert triggered(index, "BTCUSDT", 1500) == []
+    assert triggered(index, "BTCUSDT", 2500) == ["crosses-2000b"]
+
+def test_crosses_near_threshold_tolerance():
+    index = AlertIndex()
+    index.add(alert("small", "crosses", 10))       # tolerance 0.5
+    index.add(alert("large", "crosses", 100000, symbol="ETHUSDT"))  # tolerance 100
+    assert cross_tolerance(10) == 0.5
+    assert cross_tolerance(100000) == 100
+    assert triggered(index, "BTCUSDT", 10.5) == []
+    assert triggered(index, "BTCUSDT", 10.49) == ["small"]
+    assert triggered(index, "ETHUSDT", 100100) == []
+    assert triggered(index, "ETHUSDT", 100099) == ["large"]
+
+def test_add_remove_and_rebuild_bookkeeping():
+    index = AlertIndex()
+    index.add(alert("a", "above", 100))
+    index.add(alert("b", "below", 50, symbol="ETHUSDT"))
+    index.add(alert("bad", "above", "not a number"))
+    index.add(alert("inactive", "above", 1, status="triggered"))
+    assert len(index) == 2 and "bad" not in index and "inactive" not in index
+    assert sorted(index.symbols()) == ["BTCUSDT", "ETHUSDT"]
+
+    # Re-adding replaces the old threshold
+    index.add(alert("a", "above", 200))
+    assert triggered(index, "BTCUSDT", 150) == []
+    index.remove("a")
+    index.remove("a")  # removing twice is harmless
+    assert index.symbols() == ["ETHUSDT"] and not index.watches("BTCUSDT")
+
+    index.rebuild([alert("c", "crosses", 10), alert("d", "below", 5, status="triggered")])
+    assert len(index) == 1 and "c" in index and index.symbols() == ["BTCUSDT"]
+
+def brute_force(alerts, symbol, price, last_price):
+    """The per-alert checks check_alerts used to make"""
+    fired = []
+    for a in alerts.values():
+        if a["status"] != "active" or a["symbol"] != symbol:
+            continue
+        value = float(a["value"])
+        previous = price if last_price is None else last_price
+        if a["condition"] == "above":
+            hit = price > value
+        elif a["condition"] == "below":
+            hit = price < value
+        else:
+            hit = (previous < value <= price or price <= value < previous
+                   or abs(price - value) < cross_tolerance(value))
+        if hit:
+            fired.append(a["id"])
+    return sorted(fired)
+
+def test_matches_brute_force_evaluation():
+    rng = random.Random(3)
+    for _ in range(200):
+        index, alerts, last_prices = AlertIndex(), {}, {}
+        for i in range(rng.randint(0, 60)):
+            value = round(rng.uniform(90, 110), 1) if rng.random() < 0.8 else rng.uniform(0, 3)
+            a = alert(f"a{i:03d}", rng.choice(["above", "below", "crosses"]), value, symbol=rng.choice("XY"))
+            alerts[a["id"]] = a
+            index.add(a)
+        for _ in range(30):
+            symbol = rng.choice("XY")
+            price = round(rng.uniform(88, 112), 1) if rng.random() < 0.9 else rng.uniform(0, 3)
+            expected = brute_force(alerts, symbol, price, last_prices.get(symbol))
+            assert triggered(index, symbol, price) == expected
+            for alert_id in expected:
+                alerts[alert_id]["status"] = "triggered"
+            # The index forgets a symbol's last price once it has no active alerts
+            if any(a["symbol"] == symbol and a["status"] == "active" for a in alerts.values()):
+                last_prices[symbol] = price
+            else:
+                last_prices.pop(symbol, None)
@@ -0,0 +1,115 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from services.alert_store import AlertStore
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "alerts.db")
+    monkeypatch.setenv("ALERTS_DB_PATH", path)
+    return path
+
+def new_alert(alert_id, symbol="BTCUSDT", condition="above", value="100"):
+    return {
+        "id": alert_id,
+        "symbol": symbol,
+        "type": "price",
+        "condition": condition,
+        "value": value,
+        "notifyDiscord": True,
+        "created_at": "2024-01-01T00:00:00",
+        "status": "active",
+    }
+
+def test_crud_round_trip(db_path):
+    async def scenario():
+        store = AlertStore()
+        await store.create(new_alert("a"))
+        await store.create(new_alert("b", symbol="ETHUSDT"))
+        await store.create(new_alert("c"))
+
+        page, total = await store.query(symbol="BTCUSDT", limit=1, offset=1)
+        assert total == 2 and [alert["id"] for alert in page] == ["c"]
+        assert page[0]["notifyDiscord"] is True
+
+        assert await store.update({**new_alert("a"), "value": "200"})
+        assert not await store.update(new_alert("missing"))
+        assert await store.delete("b")
+        assert not await store.delete("b")
+        assert "b" not in store.index and store.get("b") is None
+        await store.close()
+
+        # Everything survives a restart, and the index is rebuilt from disk
+        reopened = AlertStore()
+        assert reopened.get("a")["value"] == "200"
+        assert len(reopened) == 2 and len(reopened.index) == 2
+        await reopened.close()
+
+    asyncio.run(scenario())
+
+def test_refresh_applies_changes_from_another_connection(db_path):
+    async def scenario():
+        first, second = AlertStore(), AlertStore()
+        assert await second.refresh() == 0
+
+        await first.create(new_alert("a"))
+        await first.create(new_alert("b"))
+        assert await second.refresh() == 2
+        assert "a" in second.index and second.get("b") is not None
+
+        await first.update({**new_alert("a"), "status": "triggered"})
+        await first.delete("b")
+        assert await second.refresh() == 2
+        assert second.get("a")["status"] == "triggered" and "a" not in second.index
+        assert second.get("b") is None
+
+        # A connection's own commits don't make it re-read anything
+        assert await first.refresh() == 0
+        await first.close()
+        await second.close()
+
+    asyncio.run(scenario())
+
+def test_only_one_store_claims_a_trigger(db_path):
+    async def scenario():
+        first = AlertStore()
+        await first.create(new_alert("a"))
+        second = AlertStore()
+
+        claim = first.mark_triggered("a", "2024-01-02T00:00:00", 101.0, 1.5)
+        # Applied in memory before the write completes
+        assert first.get("a")["status"] == "triggered" and "a" not in first.index
+        alert = await claim
+        assert alert["triggered_price"] == 101.0
+
+        assert await second.mark_triggered("a", "2024-01-02T00:00:01", 102.0, 2.0) is None
+        await second.refresh()
+        assert second.get("a")["triggered_price"] == 101.0
+        await first.close()
+        await second.close()
+
+    asyncio.run(scenario())
+
+def test_failed_claim_reindexes_the_alert(db_path):
+    async def scenario():
+        store = AlertStore()
+        await store.create(new_alert("a"))
+
+        # Another connection holding the write lock past the busy timeout
+        store._db.execute("PRAGMA busy_timeout=50")
+        blocker = sqlite3.connect(db_path, isolation_level=None)
+        blocker.execute("BEGIN IMMEDIATE")
+        try:
+            assert await store.mark_triggered("a", "2024-01-02T00:00:00", 101.0, 1.5) is None
+        finally:
+            blocker.execute("ROLLBACK")
+            blocker.close()
+
+        assert store.get("a")["status"] == "active" and "triggered_at" not in store.get("a")
+        assert "a" in store.index
+        assert (await store.mark_triggered("a", "2024-01-02T00:00:01", 102.0, 2.0))["status"] == "triggered"
+        await store.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import time
+
+import numpy as np
+import pytest
+
+from services.backfill import BackfillManager, find_gaps, parse_time
+from services.candle_store import CandleStore
+from services.candles import Candles
+from services.exchange_service import ExchangeService
+
+def minutes(first, count):
+    times = np.arange(first, first + count * 60, 60, dtype=np.int64)
+    close = (times // 60 % 1000).astype(np.float64)
+    return Candles(times, close - 0.5, close + 1, close - 1, close, np.ones(count))
+
+class FakeKlines:
+    """/api/v3/klines over one-minute candles from `listed` to now"""
+
+    def __init__(self, listed, failures=0):
+        self.listed = listed
+        self.failures = failures
+        self.requests = []
+
+    async def __call__(self, endpoint, params=None, method="GET", priority=None):
+        self.requests.append(params)
+        if self.failures:
+            self.failures -= 1
+            raise Exception("API request failed with status 503")
+        now = int(time.time()) // 60 * 60
+        first = max(-(-params["startTime"] // 60000) * 60, self.listed)
+        last = min(params["endTime"] // 60000 * 60, now, first + (params["limit"] - 1) * 60)
+        candles = minutes(first, max((last - first) // 60 + 1, 0))
+        return [[int(t) * 1000, o, h, l, c, v] for t, o, h, l, c, v in
+                zip(*(getattr(candles, name).tolist() for name in ("time", "open", "high", "low", "close", "volume")))]
+
+@pytest.fixture
+def service(tmp_path):
+    service = ExchangeService()
+    saved = service.candle_store
+    service.candle_store = CandleStore(str(tmp_path / "store"))
+    yield service
+    service.__dict__.pop("_make_request", None)
+    service.candle_store = saved
+
+def test_find_gaps():
+    extents = [(100, 200, 0), (300, 400, 0)]
+    assert find_gaps(extents, 0, 500) == [(0, 100), (200, 300), (400, 500)]
+    assert find_gaps(extents, 150, 350) == [(200, 300)]
+    assert find_gaps(extents, 120, 180) == []
+    assert find_gaps([], 0, 60) == [(0, 60)]
+
+def test_parse_time():
+    assert parse_time("1700000000") == 1700000000
+    assert parse_time("2024-01-01") == 1704067200
+    assert parse_time("2024-01-01T01:00:00+01:00") == 1704067200
+
+def test_backfill_fills_only_the_gaps_and_resumes(service, tmp_path):
+    now = int(time.time()) // 60 * 60
+    listed = now - 6000 * 60
+    fake = FakeKlines(listed, failures=1)
+    service._make_request = fake
+    # Something already stored in the middle
+    service.candle_store.append("BTCUSDT", "1m", minutes(now - 3000 * 60, 500))
+
+    async def scenario():
+        manager = BackfillManager(service, state_path=str(tmp_path / "backfill.json"))
+        # Starting well before the listing: the first request finds where history begins
+        job = await manager.submit(["btcusdt"], ["1m"], listed - 86400 * 365)
+        await manager.run_pending()
+        return manager, job
+
+    manager, job = asyncio.run(scenario())
+    assert job["status"] == "done" and manager.status(job["id"])["progress"] == 1.0
+    extents = service.candle_store.extents("BTCUSDT", "1m")
+    assert len(extents) == 1 and extents[0][0] == listed and extents[0][1] >= now - 2 * 60
+    stored = service.candle_store.range("BTCUSDT", "1m")
+    assert np.array_equal(stored.close, minutes(listed, len(stored)).close)
+    # A listing probe, one retried failure, then 2500 + 2500 candles in 3 + 3 pages (plus bridging overlaps)
+    assert len(fake.requests) <= 1 + 1 + 8
+
+    with open(tmp_path / "backfill.json") as f:
+        assert json.load(f)[0]["status"] == "done"
+
+    # A job resumed from the checkpoint only fetches what's missing by now
+    async def resume():
+        with open(tmp_path / "backfill.json") as f:
+            jobs = json.load(f)
+        jobs[0]["status"] = "running"
+        for task in jobs[0]["tasks"].values():
+            task["status"] = "pending"
+        with open(tmp_path / "backfill.json", "w") as f:
+            json.dump(jobs, f)
+        manager = BackfillManager(service, state_path=str(tmp_path / "backfill.json"))
+        manager.load()
+        assert manager.jobs[job["id"]]["status"] == "pending"
+        await manager.run_pending()
+        return manager
+
+    fake.requests.clear()
+    manager = asyncio.run(resume())
+    assert manager.jobs[job["id"]]["status"] == "done"
+    # The listing probe, and the candle that closed meanwhile if a minute has passed
+    assert len(fake.requests) <= 2
+    assert len(service.candle_store.extents("BTCUSDT", "1m")) == 1
+
+def test_cancelled_jobs_stop(service, tmp_path):
+    service._make_request = FakeKlines(0)
+
+    async def scenario():
+        manager = BackfillManager(service, state_path=str(tmp_path / "backfill.json"))
+        job = await manager.submit(["ETHUSDT"], ["1m"], int(time.time()) - 86400 * 30)
+        await manager.cancel(job["id"])
+        await manager.run_pending()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "cancelled"
+    assert service.candle_store.extents("ETHUSDT", "1m") == []
@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import numpy as np
+
+from services.candle_cache import CandleCache, CandleSeries
+from services.candles import Candles
+from services.exchange_service import ExchangeService
+
+def hours(start, count, price=100.0):
+    times = start + 3600 * np.arange(count, dtype=np.int64)
+    close = price + np.arange(count, dtype=np.float64)
+    return Candles(times, close - 1, close + 2, close - 2, close, np.full(count, 10.0))
+
+START = 1_700_000_000 // 3600 * 3600
+
+def test_forming_candle_update_is_in_place():
+    series = CandleSeries(hours(START, 100))
+    window = series.candles.tail(10)
+    arrays = series.candles.close
+
+    series.merge_tail(hours(START + 99 * 3600, 1, price=500.0))
+    assert len(series.candles) == 100 and series.candles.close is arrays
+    assert series.candles.close[-1] == 500.0 and series.candles.close[-2] == 198.0
+    # Windows handed out earlier share the forming candle, so they see the update too
+    assert window.close[-1] == 500.0
+
+def test_rollover_keeps_the_size_and_leaves_old_windows_alone():
+    series = CandleSeries(hours(START, 100))
+    window = series.candles.tail(10)
+
+    # The forming candle closes and a new one opens
+    series.merge_tail(hours(START + 99 * 3600, 2, price=500.0))
+    assert len(series.candles) == 100
+    assert series.candles.time[0] == START + 3600 and series.last_time == START + 100 * 3600
+    assert list(series.candles.close[-2:]) == [500.0, 501.0]
+    # A rollover builds new arrays: earlier windows keep what they were given
+    assert window.close[-1] == 199.0 and window.last_time == START + 99 * 3600
+
+    # A complete history has nothing older to drop, so it grows instead
+    complete = CandleSeries(hours(START, 100), complete=True)
+    complete.merge_tail(hours(START + 99 * 3600, 3))
+    assert len(complete.candles) == 102 and complete.candles.time[0] == START
+
+def test_tail_overlapping_several_candles():
+    series = CandleSeries(hours(START, 100))
+    # After a missed refresh the tail starts three candles back and adds two new ones
+    series.merge_tail(hours(START + 97 * 3600, 5, price=900.0))
+    assert len(series.candles) == 100 and series.candles.time[0] == START + 2 * 3600
+    assert list(series.candles.close[-5:]) == [900.0, 901.0, 902.0, 903.0, 904.0]
+    assert series.candles.close[-6] == 196.0
+    assert np.all(np.diff(series.candles.time) == 3600)
+
+def test_eviction_is_least_recently_used_within_the_byte_budget():
+    size = hours(START, 100).nbytes
+    cache = CandleCache(max_bytes=3 * size)
+    for symbol in ("A", "B", "C"):
+        cache.put((symbol, "1h"), CandleSeries(hours(START, 100)))
+    assert cache.info()["bytes"] == 3 * size
+
+    cache.get(("A", "1h"))  # A is now the most recently used
+    cache.put(("D", "1h"), CandleSeries(hours(START, 100)))
+    assert cache.keys() == [("C", "1h"), ("A", "1h"), ("D", "1h")]
+    assert cache.stats["evictions"] == 1
+
+    # Replacing an entry swaps its bytes rather than adding them
+    cache.put(("C", "1h"), CandleSeries(hours(START, 50)))
+    assert cache.info()["bytes"] == 2 * size + size // 2
+
+    # A series that grew in place is re-accounted, evicting from the old end
+    series = cache.get(("A", "1h"))
+    old_nbytes = series.nbytes
+    series.complete = True
+    series.merge_tail(hours(START + 99 * 3600, 101))
+    cache.resize(("A", "1h"), old_nbytes)
+    assert cache.keys() == [("C", "1h"), ("A", "1h")]
+    assert cache.info()["bytes"] == size // 2 + series.nbytes
+    assert cache.stats["evictions"] == 2
+
+    # The most recently used entry stays even on its own over budget
+    cache.put(("E", "1h"), CandleSeries(hours(START, 400)))
+    assert cache.keys() == [("E", "1h")]
+
+def test_cached_history_is_served_without_upstream_calls(monkeypatch):
+    service = ExchangeService()
+    requests = []
+
+    async def fake_request(endpoint, params=None, method="GET", priority=None):
+        requests.append(params)
+        last = min(params["endTime"] // 1000 // 3600 * 3600, int(time.time()) // 3600 * 3600)
+        first = max(-(-params["startTime"] // 1000 // 3600) * 3600, last - (params["limit"] - 1) * 3600)
+        candles = hours(first, max((last - first) // 3600 + 1, 0))
+        return [[int(t) * 1000, o, h, l, c, v] for t, o, h, l, c, v in
+                zip(*(getattr(candles, name).tolist() for name in ("time", "open", "high", "low", "close", "volume")))]
+
+    monkeypatch.setattr(service, "_make_request", fake_request)
+    monkeypatch.setattr(service, "candle_cache", CandleCache(64 * 1024 * 1024))
+    monkeypatch.setattr(service, "candle_store", None)
+    monkeypatch.setattr(service, "candle_rollup", False)
+    monkeypatch.setattr(service, "candle_tail_ttl", 60.0)
+
+    first = asyncio.run(service.get_candles("BTCUSDT", "1h", 1500))
+    assert len(first) == 1500 and len(requests) == 2
+    requests.clear()
+    again = asyncio.run(service.get_candles("BTCUSDT", "1h", 1500))
+    assert again == first and requests == []
+    assert service.candle_cache.stats["hits"] == 1 and service.candle_cache.stats["full_loads"] == 1
@@ -0,0 +1,38 @@
+import numpy as np
+
+from services.candle_simulator import simulate_candles
+from services.candles import COLUMNS
+from services.exchange_service import ExchangeService
+
+def assert_same_candles(a, b):
+    assert len(a) == len(b)
+    for name in COLUMNS:
+        np.testing.assert_array_equal(getattr(a, name), getattr(b, name))
+
+def test_simulate_candles_is_deterministic_for_a_generator_seed():
+    first, first_state = simulate_candles(np.random.default_rng(7), 500, 0, 60, 100.0, 100.0, 0.02)
+    second, second_state = simulate_candles(np.random.default_rng(7), 500, 0, 60, 100.0, 100.0, 0.02)
+    assert_same_candles(first, second)
+    assert first_state == second_state
+
+def test_simulate_candles_shape():
+    candles, state = simulate_candles(np.random.default_rng(1), 300, 600, 60, 50.0, 50.0, 0.03)
+    assert len(candles) == 300
+    np.testing.assert_array_equal(np.diff(candles.time), 60)
+    assert candles.open[0] == 50.0
+    np.testing.assert_array_equal(candles.open[1:], candles.close[:-1])
+    assert (candles.high >= np.maximum(candles.open, candles.close)).all()
+    assert (candles.low <= np.minimum(candles.open, candles.close)).all()
+    assert state["position"] == 300
+
+def test_same_seed_gives_identical_simulated_candles():
+    service = ExchangeService()
+    first = service._generate_simulated_candles("BTCUSDT", "1d", 1000, seed=42)
+    second = service._generate_simulated_candles("BTCUSDT", "1d", 1000, seed=42)
+    assert_same_candles(first, second)
+
+def test_different_seeds_give_different_simulated_candles():
+    service = ExchangeService()
+    first = service._generate_simulated_candles("BTCUSDT", "1d", 1000, seed=1)
+    second = service._generate_simulated_candles("BTCUSDT", "1d", 1000, seed=2)
+    assert not np.array_equal(first.close, second.close)
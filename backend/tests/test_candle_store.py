@@ -0,0 +1,107 @@
+import asyncio
+import os
+import time
+
+import numpy as np
+import pytest
+
+from services.candle_store import CandleStore
+from services.candles import Candles
+from services.exchange_service import ExchangeService
+
+def minutes(first, count):
+    times = np.arange(first, first + count * 60, 60, dtype=np.int64)
+    close = (times // 60 % 1000).astype(np.float64)
+    return Candles(times, close - 0.5, close + 1, close - 1, close, np.ones(count))
+
+def flush(store):
+    """Wait for the writes queued so far"""
+    store._executor.submit(lambda: None).result()
+
+def test_append_and_zero_copy_range_reads(tmp_path):
+    store = CandleStore(str(tmp_path))
+    assert store.append("BTCUSDT", "1m", minutes(60_000, 1000)) == 1000
+    # Rows overlapping the end continue the segment; only the new ones are written
+    assert store.append("BTCUSDT", "1m", minutes(60_000 + 990 * 60, 20)) == 10
+    assert store.extents("BTCUSDT", "1m") == [(60_000, 60_000 + 1009 * 60, 1010)]
+
+    window = store.range("BTCUSDT", "1m", 60_000 + 100 * 60, 60_000 + 199 * 60 + 30)
+    assert len(window) == 100 and window.time[0] == 60_000 + 100 * 60
+    assert isinstance(window.close, np.memmap)
+    assert np.array_equal(window.close, minutes(60_000 + 100 * 60, 100).close)
+    assert len(store.range("BTCUSDT", "1m")) == 1010
+    assert len(store.tail("BTCUSDT", "1m", 5)) == 5 and store.last_time("BTCUSDT", "1m") == 60_000 + 1009 * 60
+    assert len(store.range("ETHUSDT", "1m")) == 0
+
+    with pytest.raises(ValueError):
+        store.append("../BTCUSDT", "1m", minutes(0, 1))
+
+def test_gaps_become_segments_and_filling_them_joins_them(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.append("BTCUSDT", "1m", minutes(60_000, 100))
+    store.append("BTCUSDT", "1m", minutes(60_000 + 500 * 60, 100))  # doesn't overlap: a new segment
+    assert [extent[0] for extent in store.extents("BTCUSDT", "1m")] == [60_000, 60_000 + 500 * 60]
+    # The tail never spans a gap
+    assert store.tail("BTCUSDT", "1m", 1000).time[0] == 60_000 + 500 * 60
+
+    # Backfill from the end of the first segment into the second
+    store.append("BTCUSDT", "1m", minutes(60_000 + 99 * 60, 402))
+    assert store.extents("BTCUSDT", "1m") == [(60_000, 60_000 + 599 * 60, 600)]
+    assert np.array_equal(store.range("BTCUSDT", "1m").close, minutes(60_000, 600).close)
+
+def test_interrupted_writes_are_repaired(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.append("BTCUSDT", "1m", minutes(60_000, 10))
+    segment = os.path.join(str(tmp_path), "BTCUSDT", "1m", "60000")
+    # A crash after writing one column of the next rows
+    with open(os.path.join(segment, "open.bin"), "ab") as f:
+        f.write(b"\0" * 24)
+    assert len(store.range("BTCUSDT", "1m")) == 10
+    store.append("BTCUSDT", "1m", minutes(60_000 + 9 * 60, 3))
+    assert np.array_equal(store.range("BTCUSDT", "1m").open, minutes(60_000, 12).open)
+
+def test_write_closed_skips_the_forming_candle(tmp_path):
+    store = CandleStore(str(tmp_path))
+    now = 60_000 + 10 * 60 + 30
+    store.write_closed("BTCUSDT", "1m", minutes(60_000, 11), 60, now=now)
+    flush(store)
+    assert store.last_time("BTCUSDT", "1m") == 60_000 + 9 * 60
+    # Nothing new has closed: nothing is queued
+    store.write_closed("BTCUSDT", "1m", minutes(60_000, 11), 60, now=now + 10)
+    assert store.stats["writes"] == 1
+    store.write_closed("BTCUSDT", "1m", minutes(60_000 + 5 * 60, 7), 60, now=now + 60)
+    flush(store)
+    assert store.extents("BTCUSDT", "1m") == [(60_000, 60_000 + 10 * 60, 11)]
+
+def test_history_loads_resume_from_the_store(tmp_path):
+    service = ExchangeService()
+    requests = []
+
+    async def fake_request(endpoint, params=None, method="GET", priority=None):
+        requests.append(params)
+        now = int(time.time()) // 60 * 60
+        last = min(params["endTime"] // 1000 // 60 * 60, now)
+        first = max(-(-params["startTime"] // 1000 // 60) * 60, last - (params["limit"] - 1) * 60)
+        candles = minutes(first, max((last - first) // 60 + 1, 0))
+        return [[int(t) * 1000, o, h, l, c, v] for t, o, h, l, c, v in
+                zip(*(getattr(candles, name).tolist() for name in ("time", "open", "high", "low", "close", "volume")))]
+
+    saved = service.candle_store
+    service.candle_store = CandleStore(str(tmp_path))
+    service._make_request = fake_request
+    try:
+        first = asyncio.run(service._load_candle_history("BTCUSDT", "1m", 2500))
+        assert len(requests) == 3 and len(first.candles) == 2500
+        flush(service.candle_store)
+        assert service.candle_store.last_time("BTCUSDT", "1m") == first.last_time - 60
+
+        # After a restart only the candles since the last stored one are fetched
+        requests.clear()
+        again = asyncio.run(service._load_candle_history("BTCUSDT", "1m", 2500))
+        assert len(requests) == 1 and requests[0]["startTime"] == (first.last_time - 60) * 1000
+        assert np.array_equal(again.candles.time[-2000:], minutes(again.last_time - 1999 * 60, 2000).time)
+        assert service.candle_cache.stats["store_loads"] >= 1
+    finally:
+        del service._make_request
+        service.candle_store = saved
+        service.candle_cache._entries.pop(("BTCUSDT", "1m"), None)
@@ -0,0 +1,93 @@
+import logging
+import time
+
+import numpy as np
+import pytest
+
+from services.candle_cache import CandleCache, CandleSeries
+from services.candles import BINARY_MEDIA_TYPE, COLUMNS, Candles, encode_binary_message
+from services.logging_setup import stop_logging
+
+START = 1_700_000_000 // 3600 * 3600
+
+def hours(start, count, price=100.0):
+    times = start + 3600 * np.arange(count, dtype=np.int64)
+    close = price + np.arange(count, dtype=np.float64)
+    return Candles(times, close - 1, close + 2, close - 2, close, np.full(count, 10.0))
+
+def assert_same(got, expected):
+    assert len(got) == len(expected)
+    for name in COLUMNS:
+        assert np.array_equal(getattr(got, name), getattr(expected, name))
+
+def test_binary_round_trip():
+    candles = hours(START, 7)
+    message = encode_binary_message([candles[:4].to_binary_block(), candles[4:].to_binary_block()])
+    decoded = Candles.from_binary(message)
+    assert_same(decoded, candles)
+    assert decoded.time.dtype == np.int64 and decoded.close.dtype == np.float64
+    assert_same(Candles.from_binary(encode_binary_message([Candles.empty().to_binary_block()])), Candles.empty())
+    with pytest.raises(ValueError):
+        Candles.from_binary(b"JSON" + message[4:])
+
+def test_cached_history_block_follows_the_series():
+    series = CandleSeries(hours(START, 100))
+    assert_same(Candles.from_binary(series.encode_binary(50)), series.candles.tail(50))
+    history = series._encoded_history[50][1]
+
+    # The forming candle changes in place: the closed history block is reused
+    series.merge_tail(hours(START + 99 * 3600, 1, price=500.0))
+    assert_same(Candles.from_binary(series.encode_binary(50)), series.candles.tail(50))
+    assert series._encoded_history[50][1] is history
+
+    # A new candle opens: the history block is rebuilt for the shifted window
+    series.merge_tail(hours(START + 99 * 3600, 2, price=600.0))
+    decoded = Candles.from_binary(series.encode_binary(50))
+    assert_same(decoded, series.candles.tail(50))
+    assert decoded.close[-2] == 600.0
+    assert series._encoded_history[50][1] is not history
+    assert series._encoded_history[50][0] == (START + 51 * 3600, START + 99 * 3600, 49)
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """The API with the shared ExchangeService answering from a fake klines upstream"""
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setenv("ALERTS_DB_PATH", str(tmp_path / "alerts.db"))
+    root = logging.getLogger()
+    saved = list(root.handlers), root.level
+    import app as app_module
+    # Importing the app routes logging through its queue; put back what the tests use
+    stop_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in saved[0]:
+        root.addHandler(handler)
+    root.setLevel(saved[1])
+
+    async def fake_request(endpoint, params=None, method="GET", priority=None, hedge=False):
+        last = min(params["endTime"] // 1000 // 3600 * 3600, int(time.time()) // 3600 * 3600)
+        first = max(-(-params["startTime"] // 1000 // 3600) * 3600, last - (params["limit"] - 1) * 3600)
+        candles = hours(first, max((last - first) // 3600 + 1, 0))
+        return [[int(t) * 1000, o, h, l, c, v] for t, o, h, l, c, v in
+                zip(*(getattr(candles, name).tolist() for name in COLUMNS))]
+
+    service = app_module.exchange_service
+    monkeypatch.setattr(service, "_make_request", fake_request)
+    monkeypatch.setattr(service, "candle_cache", CandleCache(64 * 1024 * 1024))
+    monkeypatch.setattr(service, "candle_store", None)
+    monkeypatch.setattr(service, "candle_rollup", False)
+    return TestClient(app_module.app)
+
+def test_candles_endpoint_negotiates_binary(client):
+    params = {"symbol": "BTCUSDT", "timeframe": "1h", "limit": 300}
+    rows = client.get("/api/candles", params=params)
+    assert rows.headers["content-type"] == "application/json"
+    assert len(rows.json()) == 300
+
+    packed = client.get("/api/candles", params=params, headers={"Accept": BINARY_MEDIA_TYPE})
+    assert packed.headers["content-type"] == BINARY_MEDIA_TYPE and packed.headers["vary"] == "Accept"
+    assert_same(Candles.from_binary(packed.content), Candles.from_rows(rows.json()))
+
+    columns = client.get("/api/candles", params={**params, "format": "columns"})
+    assert columns.json()["time"] == [row["time"] for row in rows.json()]
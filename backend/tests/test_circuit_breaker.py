@@ -0,0 +1,206 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+
+from services import circuit_breaker
+from services.circuit_breaker import (CircuitBreaker, CircuitOpenError, UpstreamHostError, UpstreamPool,
+                                     CLOSED, OPEN, HALF_OPEN)
+from services.exchange_service import ExchangeService
+from services.upstream_scheduler import UpstreamBudgetExceeded, PRIORITY_BACKGROUND, PRIORITY_CHARTS
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(1000.0)
+    monkeypatch.setattr(circuit_breaker, "time", clock)
+    return clock
+
+def test_breaker_opens_probes_and_backs_off(clock):
+    breaker = CircuitBreaker(failure_threshold=3, recovery_time=10, max_recovery_time=30)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure("status 503", 503)
+    assert breaker.state == CLOSED
+    breaker.record_failure("status 503", 503)
+    assert breaker.state == OPEN and not breaker.allow()
+
+    # One probe once the recovery time is up, and only one
+    clock.now += 10
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    # A failed probe re-opens it for longer
+    breaker.record_failure("timeout")
+    clock.now += 10
+    assert not breaker.allow()
+    clock.now += 10
+    assert breaker.allow()
+    assert breaker.record_success() and breaker.state == CLOSED and breaker.recovery_time == 10
+
+def test_breaker_trips_at_once_on_geo_restriction(clock):
+    breaker = CircuitBreaker(failure_threshold=5, recovery_time=10, max_recovery_time=300)
+    assert breaker.record_failure("geo-restricted", 451, trip=True)
+    assert breaker.state == OPEN and breaker.recovery_time == 300
+
+def test_pool_fails_over_by_latency(clock):
+    pool = UpstreamPool(["https://a", "https://b", "https://c"], failure_threshold=1)
+    assert pool.ranked() == ["https://a", "https://b", "https://c"]
+    pool.record_latency("https://c", 0.05)
+    pool.record_latency("https://b", 0.2)
+    # Measured hosts first, fastest first
+    assert pool.pick("/api/v3/klines") == "https://c"
+    pool.record_failure("https://c", "/api/v3/klines", "status 502", 502)
+    assert pool.pick("/api/v3/klines") == "https://b"
+    # Breakers are per endpoint
+    assert pool.pick("/api/v3/ticker/price") == "https://c"
+
+    for host in ("https://a", "https://b"):
+        pool.record_failure(host, "/api/v3/klines", "geo-restricted", 451, trip=True)
+    assert not pool.available("/api/v3/klines") and pool.pick("/api/v3/klines") is None
+    assert not pool.geo_restricted()  # c failed with a 502, not a 451
+    clock.now += 10
+    assert pool.available("/api/v3/klines") and pool.pick("/api/v3/klines") == "https://c"
+
+def test_timeouts_follow_measured_latency():
+    pool = UpstreamPool(["https://a"], min_timeout=1.0)
+    assert pool.timeout_for("https://a", "/api/v3/klines", 10.0) == 10.0
+    for _ in range(5):
+        pool.record_success("https://a", "/api/v3/klines", 0.5)
+    assert pool.timeout_for("https://a", "/api/v3/klines", 10.0) == pytest.approx(2.0)
+    for _ in range(5):
+        pool.record_success("https://a", "/api/v3/ticker/price", 0.01)
+    assert pool.timeout_for("https://a", "/api/v3/ticker/price", 10.0) == 1.0
+
+class FakeExchange:
+    """A host answering ticker requests with a fixed status after a delay"""
+
+    def __init__(self, price, status=200, delay=0.0):
+        self.price = price
+        self.status = status
+        self.delay = delay
+        self.requests = 0
+
+    async def ticker(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        if self.status != 200:
+            return web.Response(status=self.status, text="unavailable")
+        return web.json_response({"symbol": request.query["symbol"], "price": str(self.price)})
+
+    async def ping(self, request):
+        return web.json_response({})
+
+    async def serve(self):
+        app = web.Application()
+        app.router.add_get("/api/v3/ticker/price", self.ticker)
+        app.router.add_get("/api/v3/ping", self.ping)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return runner, f"http://127.0.0.1:{port}"
+
+async def with_hosts(exchanges, scenario, **pool_options):
+    service = ExchangeService()
+    runners, hosts = zip(*[await exchange.serve() for exchange in exchanges])
+    saved = service.upstream, service.host_probe_interval
+    service.upstream = UpstreamPool(hosts, **pool_options)
+    service.host_probe_interval = 3600
+    try:
+        return await scenario(service, hosts)
+    finally:
+        await service.close()
+        service.upstream, service.host_probe_interval = saved
+        for runner in runners:
+            await runner.cleanup()
+
+def test_requests_fail_over_and_recover():
+    broken, healthy = FakeExchange(1.0, status=503), FakeExchange(2.0)
+
+    async def scenario(service, hosts):
+        params = {"symbol": "BTCUSDT"}
+        # Keep the broken host first, as if it had measured fastest
+        service.upstream.record_latency(hosts[0], 0.001)
+        service.upstream.record_latency(hosts[1], 0.01)
+        # Each request fails over to the healthy host
+        for _ in range(3):
+            assert (await service._make_request("/api/v3/ticker/price", params))["price"] == "2.0"
+        # After two failures the broken host's breaker is open and it isn't tried any more
+        assert broken.requests == 2 and healthy.requests == 3 and service.base_url == hosts[0]
+
+        # Once the recovery time is up, a probe finds it working again
+        broken.status = 200
+        await asyncio.sleep(0.2)
+        assert (await service._make_request("/api/v3/ticker/price", params))["price"] == "1.0"
+        assert service.upstream.breaker(hosts[0], "/api/v3/ticker/price").state == CLOSED
+
+        # With every host down the circuit error comes straight back
+        broken.status = healthy.status = 503
+        for _ in range(2):
+            with pytest.raises(UpstreamHostError):
+                await service._make_request("/api/v3/ticker/price", params)
+        with pytest.raises(CircuitOpenError):
+            await service._make_request("/api/v3/ticker/price", params)
+        assert not service.upstream_available("/api/v3/ticker/price")
+
+    asyncio.run(with_hosts([broken, healthy], scenario, failure_threshold=2, recovery_time=0.2))
+
+def test_hedged_price_requests_take_the_first_answer():
+    slow, fast = FakeExchange(1.0, delay=1.0), FakeExchange(2.0)
+
+    async def scenario(service, hosts):
+        saved = service.hedge_delay
+        service.hedge_delay = 0.05
+        try:
+            started = time.monotonic()
+            response = await service._make_request("/api/v3/ticker/price", {"symbol": "BTCUSDT"}, hedge=True)
+            assert response["price"] == "2.0" and time.monotonic() - started < 0.8
+            assert service._hedge_stats["hedge_won"] >= 1
+        finally:
+            service.hedge_delay = saved
+
+    asyncio.run(with_hosts([slow, fast], scenario))
+
+def test_waiting_for_budget_doesnt_hold_a_probe(clock, monkeypatch):
+    service = ExchangeService()
+    monkeypatch.setattr(service, "upstream", UpstreamPool(["https://a"], recovery_time=10))
+    service.upstream.record_failure("https://a", "/api/v3/klines", "status 503", 503, trip=True)
+    clock.now += 10
+    breaker = service.upstream.breaker("https://a", "/api/v3/klines")
+
+    async def refused(weight, priority):
+        raise UpstreamBudgetExceeded("no budget")
+
+    monkeypatch.setattr(service.scheduler, "acquire", refused)
+    with pytest.raises(UpstreamBudgetExceeded):
+        asyncio.run(service._make_request("/api/v3/klines", {"symbol": "BTCUSDT"}))
+    # The probe is still there for the next request that gets budget
+    assert breaker.state == OPEN and breaker.ready()
+
+def test_failover_spends_no_budget_without_a_host():
+    broken, other = FakeExchange(1.0, status=503), FakeExchange(2.0)
+
+    async def scenario(service, hosts):
+        service.upstream.record_latency(hosts[0], 0.001)
+        service.upstream.record_failure(hosts[1], "/api/v3/ticker/price", "status 502", 502, trip=True)
+        charged = []
+        try_acquire = service.scheduler.try_acquire
+        service.scheduler.try_acquire = lambda weight, priority: charged.append((weight, priority)) or try_acquire(weight, priority)
+        try:
+            with pytest.raises(UpstreamHostError):
+                await service._make_request("/api/v3/ticker/price", {"symbol": "BTCUSDT"})
+        finally:
+            del service.scheduler.try_acquire
+        # Only the first attempt was charged (latency pings run in the background)
+        assert broken.requests == 1 and other.requests == 0
+        assert [priority for _, priority in charged if priority != PRIORITY_BACKGROUND] == [PRIORITY_CHARTS]
+
+    asyncio.run(with_hosts([broken, other], scenario, recovery_time=60))
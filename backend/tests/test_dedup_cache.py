@@ -0,0 +1,20 @@
+import time
+
+from services.dedup_cache import DedupCache
+
+def test_keys_expire_after_the_window():
+    cache = DedupCache(0.05)
+    assert cache.check_and_add("a")
+    assert not cache.check_and_add("a")
+    assert "a" in cache and "b" not in cache
+    time.sleep(0.06)
+    assert "a" not in cache and len(cache) == 0
+    assert cache.check_and_add("a")
+
+def test_expiry_follows_the_latest_add():
+    cache = DedupCache(10)
+    cache.add("old", now=0.0)
+    cache.add("new", now=5.0)
+    cache.add("old", now=6.0)  # restarts the window and moves to the back
+    cache.add("later", now=15.5)
+    assert list(cache._seen) == ["old", "later"]
@@ -0,0 +1,106 @@
+import asyncio
+from typing import Optional
+
+import aiohttp
+
+from benchmarks.standin import StandIn
+from services.discord_queue import DiscordQueue
+
+class FakeDiscordService:
+    """What DiscordQueue uses of DiscordService: the webhook URL, dedup window and pooled session"""
+
+    def __init__(self, webhook_url: str):
+        self.webhook_url = webhook_url
+        self.dedup_window = 5.0
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+def embed(i, description=""):
+    return {"title": f"Alert {i}", "description": description or f"BTCUSDT crossed {60000 + i}"}
+
+async def with_webhook(scenario, replies=(), **queue_options):
+    standin = StandIn()
+    await standin.start()
+    standin.webhook_replies.extend(replies)
+    service = FakeDiscordService(f"{standin.url}/webhook")
+    queue = DiscordQueue(service, **{"batch_window": 0.05, **queue_options})
+    try:
+        return await scenario(queue, standin)
+    finally:
+        await queue.close()
+        await service.close()
+        await standin.close()
+
+async def delivered(queue, count, timeout=5.0):
+    """Wait until `count` notifications have been sent or have failed"""
+    for _ in range(int(timeout / 0.01)):
+        if queue.stats["sent_embeds"] + queue.stats["failed_embeds"] >= count:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Only {queue.info()} after {timeout}s")
+
+def test_a_burst_is_batched_ten_embeds_per_message():
+    async def scenario(queue, standin):
+        for i in range(500):
+            assert queue.enqueue(embed(i), content=f"alert {i}")
+        queue.start()
+        await delivered(queue, 500)
+        return [payload for _, payload in standin.webhook_posts]
+
+    payloads = asyncio.run(with_webhook(scenario))
+    assert len(payloads) <= 50
+    titles = [e["title"] for payload in payloads for e in payload["embeds"]]
+    assert titles == [f"Alert {i}" for i in range(500)]
+    assert all(len(payload["embeds"]) <= 10 for payload in payloads)
+
+def test_oversized_embeds_carry_over_to_the_next_message():
+    async def scenario(queue, standin):
+        for i in range(5):
+            queue.enqueue(embed(i, "x" * 2500))
+        queue.start()
+        await delivered(queue, 5)
+        return [payload for _, payload in standin.webhook_posts]
+
+    payloads = asyncio.run(with_webhook(scenario))
+    # 6000 characters per message: two 2500-character embeds fit, a third doesn't
+    assert [len(payload["embeds"]) for payload in payloads] == [2, 2, 1]
+    assert [e["title"] for payload in payloads for e in payload["embeds"]] == [f"Alert {i}" for i in range(5)]
+
+def test_rate_limits_delay_the_next_post():
+    async def scenario(queue, standin):
+        queue.enqueue(embed(1))
+        queue.start()
+        await delivered(queue, 1)
+        # An exhausted bucket holds back the next message too
+        queue.enqueue(embed(2))
+        await delivered(queue, 2)
+        return [at for at, _ in standin.webhook_posts], queue.stats
+
+    replies = [(429, {}, {"message": "You are being rate limited.", "retry_after": 0.3}),
+               (204, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "0.3"}, None)]
+    posts, stats = asyncio.run(with_webhook(scenario, replies))
+    assert len(posts) == 3
+    assert posts[1] - posts[0] >= 0.3 and posts[2] - posts[1] >= 0.25
+    assert stats["rate_limited"] == 1 and stats["sent_embeds"] == 2
+
+def test_client_errors_drop_the_batch_without_retrying():
+    async def scenario(queue, standin):
+        queue.enqueue(embed(1))
+        queue.start()
+        await delivered(queue, 1)
+        # The worker carries on with the next notification
+        queue.enqueue(embed(2))
+        await delivered(queue, 2)
+        return len(standin.webhook_posts), queue.stats
+
+    posts, stats = asyncio.run(with_webhook(scenario, [(400, {}, {"message": "Invalid Form Body"})]))
+    assert posts == 2
+    assert stats["failed_embeds"] == 1 and stats["retries"] == 0 and stats["sent_embeds"] == 1
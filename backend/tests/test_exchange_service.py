@@ -0,0 +1,166 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from services.exchange_service import ExchangeService
+
+class FakeTicker:
+    """Stands in for _make_request on the single-symbol ticker endpoint"""
+
+    def __init__(self, price=100.0, delay=0.01, error=None):
+        self.price = price
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self, endpoint, params=None, method="GET", priority=None, hedge=False):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {"symbol": params["symbol"], "price": str(self.price)}
+
+@pytest.fixture
+def service(monkeypatch):
+    """The shared service with an empty price cache, restored afterwards"""
+    service = ExchangeService()
+    monkeypatch.setattr(service, "_price_entries", {})
+    monkeypatch.setattr(service, "_price_inflight", {})
+    monkeypatch.setattr(service, "_price_stats", {key: 0 for key in service._price_stats})
+    monkeypatch.setattr(service, "_streamed_symbols", set())
+    monkeypatch.setattr(service, "base_prices", dict(service.base_prices))
+    monkeypatch.setattr(service, "last_price_cache", dict(service.last_price_cache))
+    monkeypatch.setattr(service, "last_update_time", dict(service.last_update_time))
+    monkeypatch.setattr(service, "fallback_mode", service.fallback_mode)
+    monkeypatch.setattr(service, "price_ttl", 0.5)
+    monkeypatch.setattr(service, "price_stale_ttl", 5.0)
+    return service
+
+def test_concurrent_misses_share_one_request(service, monkeypatch):
+    upstream = FakeTicker(price=123.0)
+    monkeypatch.setattr(service, "_make_request", upstream)
+
+    async def scenario():
+        return await asyncio.gather(*(service.get_current_price("BTCUSDT") for _ in range(20)))
+
+    assert asyncio.run(scenario()) == [123.0] * 20
+    stats = service.price_cache_stats()
+    assert upstream.calls == 1
+    assert stats["misses"] == 1 and stats["coalesced"] == 19 and stats["in_flight"] == 0
+
+def test_fresh_hit_makes_no_request(service, monkeypatch):
+    upstream = FakeTicker(price=123.0)
+    monkeypatch.setattr(service, "_make_request", upstream)
+
+    async def scenario():
+        await service.get_current_price("BTCUSDT")
+        return await service.get_current_price("BTCUSDT")
+
+    assert asyncio.run(scenario()) == 123.0
+    assert upstream.calls == 1 and service.price_cache_stats()["hits"] == 1
+
+def test_stale_price_is_served_while_one_refresh_runs(service, monkeypatch):
+    upstream = FakeTicker(price=200.0)
+    monkeypatch.setattr(service, "_make_request", upstream)
+    # Stale (past price_ttl) but within price_stale_ttl
+    service._store_price("BTCUSDT", 100.0, fetched_at=time.monotonic() - 1.0)
+
+    async def scenario():
+        served = [await service.get_current_price("BTCUSDT") for _ in range(3)]
+        assert len(service._price_inflight) == 1
+        await asyncio.gather(*service._price_inflight.values())
+        return served, await service.get_current_price("BTCUSDT")
+
+    served, refreshed = asyncio.run(scenario())
+    assert served == [100.0] * 3 and refreshed == 200.0
+    assert upstream.calls == 1
+    stats = service.price_cache_stats()
+    assert stats["stale_hits"] == 3 and stats["hits"] == 1
+
+def test_upstream_error_is_counted_and_not_left_in_flight(service, monkeypatch):
+    upstream = FakeTicker(error=RuntimeError("API request failed with status 503"))
+    monkeypatch.setattr(service, "_make_request", upstream)
+
+    price = asyncio.run(service.get_current_price("ETHUSDT"))
+    # Falls back to a simulated price
+    assert price > 0 and upstream.calls == 1
+    stats = service.price_cache_stats()
+    assert stats["errors"] == 1 and not service._price_inflight and "ETHUSDT" not in service._price_entries
+
+HOUR_MS = 3600 * 1000
+
+class FakeKlines:
+    """
+    Stands in for _make_request on /api/v3/klines for a 1h series listed at
+    `listed_ms`: open times in [startTime, endTime], oldest first, up to `limit`
+    """
+
+    def __init__(self, listed_ms=0):
+        self.listed_ms = listed_ms
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = []
+
+    async def __call__(self, endpoint, params=None, method="GET", priority=None, hedge=False):
+        self.requests.append(params)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        now_ms = int(time.time() * 1000) // HOUR_MS * HOUR_MS
+        first = max(-(-params["startTime"] // HOUR_MS) * HOUR_MS, -(-self.listed_ms // HOUR_MS) * HOUR_MS)
+        last = min(params["endTime"] // HOUR_MS * HOUR_MS, now_ms, first + (params["limit"] - 1) * HOUR_MS)
+        return [[t, "1.0", "2.0", "0.5", "1.5", "10.0", t + HOUR_MS - 1] for t in range(first, last + 1, HOUR_MS)]
+
+def current_hour():
+    return int(time.time()) // 3600 * 3600
+
+def test_concurrent_pages_are_contiguous(service, monkeypatch):
+    upstream = FakeKlines()
+    monkeypatch.setattr(service, "_make_request", upstream)
+
+    candles, complete = asyncio.run(service._fetch_klines_concurrent("BTCUSDT", "1h", 2500))
+    # Three full pages, no gaps or repeats between them, ending at the forming candle
+    assert len(upstream.requests) == 3 and len(candles) == 3000
+    assert np.all(np.diff(candles.time) == 3600)
+    assert candles.last_time == current_hour()
+    assert not complete
+
+def test_history_is_complete_when_the_listing_is_reached(service, monkeypatch):
+    upstream = FakeKlines(listed_ms=(current_hour() - 2200 * 3600) * 1000)
+    monkeypatch.setattr(service, "_make_request", upstream)
+
+    candles, complete = asyncio.run(service._fetch_klines_concurrent("BTCUSDT", "1h", 2500))
+    assert len(candles) == 2201 and candles.time[0] * 1000 == upstream.listed_ms
+    assert np.all(np.diff(candles.time) == 3600)
+    assert complete
+
+def test_pages_since_a_start_time_are_contiguous(service, monkeypatch):
+    monkeypatch.setattr(service, "_make_request", FakeKlines())
+    start = current_hour() - 3000 * 3600
+
+    candles = asyncio.run(service._fetch_klines_since("BTCUSDT", "1h", start, 2500))
+    assert len(candles) == 3000 and candles.time[0] == start
+    assert np.all(np.diff(candles.time) == 3600)
+
+def test_pages_in_flight_are_bounded(service, monkeypatch):
+    upstream = FakeKlines()
+    monkeypatch.setattr(service, "_make_request", upstream)
+    monkeypatch.setattr(service, "candle_fetch_concurrency", 2)
+
+    candles, _ = asyncio.run(service._fetch_klines_concurrent("BTCUSDT", "1h", 8000))
+    assert len(upstream.requests) == 8 and len(candles) == 8000
+    assert upstream.max_in_flight == 2
+
+def test_batch_prices_carry_the_time_they_were_obtained(service, monkeypatch):
+    monkeypatch.setattr(service, "_make_request", FakeTicker())
+    service._store_price("BTCUSDT", 100.0, fetched_at=time.monotonic() - 0.3)
+
+    prices = asyncio.run(service.get_current_prices_timed(["BTCUSDT"]))
+    price, obtained = prices["BTCUSDT"]
+    assert price == 100.0 and abs(time.time() - obtained - 0.3) < 0.05
+    assert asyncio.run(service.get_current_prices(["BTCUSDT"])) == {"BTCUSDT": 100.0}
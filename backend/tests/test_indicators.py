@@ -0,0 +1,65 @@
+import asyncio
+
+import numpy as np
+
+from services.candles import Candles
+from services.indicators import IndicatorEngine, atr, ema, sma
+
+def make_candles(count: int, seed: int = 0) -> Candles:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.01, count))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    high = np.maximum(open_, close) * 1.002
+    low = np.minimum(open_, close) * 0.998
+    return Candles(np.arange(count, dtype=np.int64) * 60, open_, high, low, close, rng.uniform(1, 10, count))
+
+class FakeExchange:
+    def __init__(self, candles: Candles):
+        self.candles = candles
+
+    async def get_candle_columns(self, symbol, interval, limit):
+        return self.candles.tail(limit)
+
+def test_sma_and_ema_match_loops():
+    close = make_candles(200).close
+    expected_sma = [close[i - 19:i + 1].mean() for i in range(19, 200)]
+    np.testing.assert_allclose(sma(close, 20)[19:], expected_sma)
+    assert np.isnan(sma(close, 20)[:19]).all()
+
+    alpha, value = 2 / 21, close[:20].mean()
+    expected_ema = [value]
+    for x in close[20:]:
+        value = value + alpha * (x - value)
+        expected_ema.append(value)
+    np.testing.assert_allclose(ema(close, 20)[19:], expected_ema)
+
+def test_memo_hits_for_an_unchanged_window():
+    engine = IndicatorEngine(FakeExchange(make_candles(500)))
+    first = asyncio.run(engine.get_indicators("BTCUSDT", "1m", "ema:9,rsi"))
+    second = asyncio.run(engine.get_indicators("BTCUSDT", "1m", "ema:9,rsi"))
+    assert first == second
+    assert engine.stats == {"hits": 2, "misses": 2, "evictions": 0}
+
+def test_forming_candle_change_replaces_the_slot():
+    candles = make_candles(500)
+    exchange = FakeExchange(candles)
+    engine = IndicatorEngine(exchange)
+    before = asyncio.run(engine.get_indicators("BTCUSDT", "1m", "atr:14"))
+
+    # Only the forming candle's high moves; the close is unchanged
+    candles.high[-1] *= 1.05
+    after = asyncio.run(engine.get_indicators("BTCUSDT", "1m", "atr:14"))
+
+    assert engine.stats["misses"] == 2
+    assert engine.info()["entries"] == 1
+    assert after["indicators"]["atr:14"][-1] != before["indicators"]["atr:14"][-1]
+    assert after["indicators"]["atr:14"][-1] == atr(candles.high, candles.low, candles.close, 14)[-1]
+
+def test_memo_is_bounded_by_bytes():
+    engine = IndicatorEngine(FakeExchange(make_candles(1000)), max_bytes=100_000)
+    for symbol in ("A", "B", "C", "D", "E"):
+        asyncio.run(engine.get_indicators(symbol, "1m", "sma:20"))  # ~32 KB each
+    info = engine.info()
+    assert info["bytes"] <= 100_000
+    assert info["entries"] == 3
+    assert info["evictions"] == 2
@@ -0,0 +1,69 @@
+import logging
+
+import pytest
+
+from services import logging_setup
+from services.logging_setup import RateLimitFilter, configure_logging, stop_logging
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+def record(msg, level=logging.WARNING, **extra):
+    entry = logging.LogRecord("exchange_service", level, __file__, 1, msg, None, None)
+    entry.__dict__.update(extra)
+    return entry
+
+def test_rate_limit_filter_collapses_repeats(monkeypatch):
+    clock = FakeClock(100.0)
+    monkeypatch.setattr(logging_setup, "time", clock)
+    rate_limit = RateLimitFilter(interval=30)
+
+    assert rate_limit.filter(record("Switching to price simulation"))
+    assert not rate_limit.filter(record("Switching to price simulation"))
+    assert not rate_limit.filter(record("Switching to price simulation"))
+    # Different message, level or key: its own budget
+    assert rate_limit.filter(record("Switching to price simulation", level=logging.ERROR))
+    assert rate_limit.filter(record("Error fetching price for BTCUSDT: timeout", rate_key="price-error:BTCUSDT"))
+    assert not rate_limit.filter(record("Error fetching price for BTCUSDT: 503", rate_key="price-error:BTCUSDT"))
+    assert rate_limit.filter(record("Error fetching price for ETHUSDT: 503", rate_key="price-error:ETHUSDT"))
+    assert rate_limit.suppressed == 3
+
+    # The next one through says what was dropped
+    clock.now += 30
+    passed = record("Switching to price simulation")
+    assert rate_limit.filter(passed)
+    assert passed.getMessage() == "Switching to price simulation (2 similar suppressed in the last 30s)"
+    # Records may ask for their own interval, or none at all
+    assert rate_limit.filter(record("Alert triggered", rate_interval=0))
+    assert rate_limit.filter(record("Alert triggered", rate_interval=0))
+
+@pytest.fixture
+def root_logger():
+    root = logging.getLogger()
+    saved = list(root.handlers), root.level
+    yield root
+    stop_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in saved[0]:
+        root.addHandler(handler)
+    root.setLevel(saved[1])
+
+def test_records_are_written_by_the_listener_thread(root_logger, capsys):
+    configure_logging(level="INFO", rate_limit_interval=30)
+    log = logging.getLogger("test_logging_setup")
+    for _ in range(100):
+        log.info("Fetching price for %s", "BTCUSDT")
+    log.debug("Not at this level")
+    stop_logging()
+
+    lines = [line for line in capsys.readouterr().err.splitlines() if "test_logging_setup" in line]
+    assert len(lines) == 1 and lines[0].endswith("INFO - Fetching price for BTCUSDT")
+    assert logging_setup.logging_info()["suppressed"] == 99
+    # Records after shutdown are written directly
+    log.warning("After shutdown")
+    assert "After shutdown" in capsys.readouterr().err
@@ -0,0 +1,51 @@
+import asyncio
+
+from services.metrics import Registry
+from services.price_hub import PriceHub
+
+def test_histograms_render_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("request_seconds", "Request latency", ("endpoint", "status"), buckets=(0.1, 1.0))
+    child = latency.labels("/api/v3/klines", "200")
+    for value in (0.05, 0.1, 0.5, 3.0):
+        child.observe(value)
+    text = registry.render()
+    assert "# TYPE request_seconds histogram" in text
+    assert 'request_seconds_bucket{endpoint="/api/v3/klines",status="200",le="0.1"} 2' in text
+    assert 'request_seconds_bucket{endpoint="/api/v3/klines",status="200",le="1"} 3' in text
+    assert 'request_seconds_bucket{endpoint="/api/v3/klines",status="200",le="+Inf"} 4' in text
+    assert 'request_seconds_sum{endpoint="/api/v3/klines",status="200"} 3.65' in text
+    assert 'request_seconds_count{endpoint="/api/v3/klines",status="200"} 4' in text
+    # The child is created once and reused
+    assert latency.labels("/api/v3/klines", "200") is child
+
+def test_collected_metrics_are_read_at_scrape_time():
+    registry = Registry()
+    stats = {"hits": 0}
+    registry.collected("cache_hits_total", "Cache hits", "counter", lambda: [((), stats["hits"])])
+    registry.collected("queue_depth", "Queued \"items\"", "gauge", lambda: [(('a"b',), 1.5)], ("name",))
+    stats["hits"] = 7
+    text = registry.render()
+    assert "cache_hits_total 7\n" in text
+    assert 'queue_depth{name="a\\"b"} 1.5' in text
+
+class FakeSocket:
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, message):
+        self.messages.append(message)
+
+def test_price_hub_records_send_latency_per_symbol():
+    from services.metrics import PRICE_SEND_SECONDS
+
+    async def scenario():
+        hub = PriceHub(exchange_service=None)
+        socket = FakeSocket()
+        hub.subscribers["METRICUSDT"] = {socket}
+        await hub.broadcast("METRICUSDT", {"symbol": "METRICUSDT", "price": 1.0})
+        assert PRICE_SEND_SECONDS.labels("METRICUSDT").count == 1
+        await hub.unsubscribe("METRICUSDT", socket)
+        assert ("METRICUSDT",) not in PRICE_SEND_SECONDS._children
+
+    asyncio.run(scenario())
@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+from services.price_hub import PriceHub
+
+class FakeExchange:
+    def __init__(self):
+        self.calls = 0
+
+    async def get_current_price(self, symbol):
+        # Returns without suspending, so a producer is never cancelled mid-fetch
+        self.calls += 1
+        return 100.0 + self.calls
+
+class FakeWebSocket:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    async def send_text(self, message):
+        if self.fail:
+            raise ConnectionError("client went away")
+        self.sent.append(json.loads(message))
+
+def test_one_producer_per_symbol():
+    async def scenario():
+        exchange = FakeExchange()
+        hub = PriceHub(exchange, interval=0.02)
+        broadcasts = 0
+        broadcast = hub.broadcast
+
+        async def counting_broadcast(symbol, data):
+            nonlocal broadcasts
+            broadcasts += 1
+            await broadcast(symbol, data)
+
+        hub.broadcast = counting_broadcast
+        sockets = [FakeWebSocket() for _ in range(3)]
+        for ws in sockets:
+            await hub.subscribe("BTCUSDT", ws)
+        task = hub._tasks["BTCUSDT"]
+        assert len(hub._tasks) == 1
+
+        await asyncio.sleep(0.15)
+        for ws in sockets[:2]:
+            await hub.unsubscribe("BTCUSDT", ws)
+        assert not task.done() and hub.subscriber_count("BTCUSDT") == 1
+
+        # The last one out stops the producer and forgets the symbol
+        await hub.unsubscribe("BTCUSDT", sockets[2])
+        await asyncio.gather(task, return_exceptions=True)
+        assert task.done()
+        assert "BTCUSDT" not in hub.subscribers and "BTCUSDT" not in hub._tasks
+        return exchange.calls, broadcasts, sockets
+
+    calls, broadcasts, sockets = asyncio.run(scenario())
+    # One upstream fetch per tick, shared by all three subscribers
+    assert calls >= 2 and calls == broadcasts
+    for ws in sockets:
+        assert len(ws.sent) in (broadcasts, broadcasts - 1)
+        assert ws.sent == sockets[0].sent[:len(ws.sent)]
+
+def test_broadcast_drops_failing_clients():
+    async def scenario():
+        hub = PriceHub(FakeExchange())
+        healthy, broken = FakeWebSocket(), FakeWebSocket(fail=True)
+        hub.subscribers["ETHUSDT"] = {healthy, broken}
+        await hub.broadcast("ETHUSDT", {"symbol": "ETHUSDT", "price": 3500.0})
+        return hub, healthy
+
+    hub, healthy = asyncio.run(scenario())
+    assert hub.subscribers["ETHUSDT"] == {healthy}
+    assert healthy.sent == [{"symbol": "ETHUSDT", "price": 3500.0}]
@@ -0,0 +1,96 @@
+import asyncio
+
+import numpy as np
+
+from services.candle_cache import CandleCache, CandleSeries
+from services.candles import Candles
+from services.exchange_service import INTERVAL_SECONDS
+from services.rollup import RollupEngine, aggregate, bucket_starts, parse_interval
+
+def minute_candles(count, start=1_700_000_040, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    open_ = np.r_[100.0, close[:-1]]
+    high = np.maximum(open_, close) + rng.uniform(0, 1, count)
+    low = np.minimum(open_, close) - rng.uniform(0, 1, count)
+    times = start + 60 * np.arange(count, dtype=np.int64)
+    return Candles(times, open_, high, low, close, rng.uniform(1, 10, count))
+
+def rows_by_loop(candles, interval_seconds):
+    bars = {}
+    for row in candles.to_rows():
+        start = int(bucket_starts(np.array([row["time"]]), interval_seconds)[0])
+        bar = bars.get(start)
+        if bar is None:
+            bars[start] = dict(row, time=start)
+        else:
+            bar.update(high=max(bar["high"], row["high"]), low=min(bar["low"], row["low"]),
+                       close=row["close"], volume=bar["volume"] + row["volume"])
+    return list(bars.values())
+
+def test_parse_interval():
+    assert parse_interval("45m") == 2700 and parse_interval("2h") == 7200 and parse_interval("1w") == 604800
+    assert parse_interval("1M") is None and parse_interval("0m") is None and parse_interval("abc") is None
+
+def test_aggregate_matches_a_loop():
+    candles = minute_candles(3000)
+    for interval in ("2m", "5m", "10m", "45m", "1h", "1d", "1w"):
+        expected = rows_by_loop(candles, parse_interval(interval))
+        got = aggregate(candles, parse_interval(interval)).to_rows()
+        assert len(got) == len(expected)
+        for a, b in zip(got, expected):
+            assert a["time"] == b["time"]
+            assert np.allclose([a[k] for k in ("open", "high", "low", "close", "volume")],
+                               [b[k] for k in ("open", "high", "low", "close", "volume")])
+    # Weekly bars open on Monday
+    assert all(np.datetime64(int(t), "s").astype("datetime64[D]").item().weekday() == 0
+               for t in aggregate(candles, 604800).time)
+
+class FakeExchange:
+    MAX_CANDLES = 50000
+
+    def __init__(self, base: Candles):
+        self.candle_cache = CandleCache(1 << 30)
+        self.series = CandleSeries(base)
+        self.candle_cache.put(("BTCUSDT", "1m"), self.series)
+        self.requests = []
+
+    async def _get_candle_window(self, symbol, interval, limit):
+        self.requests.append((interval, limit))
+        return self.series.candles.tail(limit), self.series
+
+def test_rolled_bars_update_incrementally():
+    base = minute_candles(5000)
+    exchange = FakeExchange(base[:4000])
+    engine = RollupEngine(exchange, INTERVAL_SECONDS)
+
+    async def window(interval, limit):
+        candles, _ = await engine.get_window("BTCUSDT", interval, limit)
+        return candles
+
+    first = asyncio.run(window("45m", 50))
+    assert len(first) == 50 and exchange.requests == [("1m", engine.max_base_candles)]
+    # The oldest bar is complete even though the window started mid-bar
+    assert first.time[0] > base.time[0] and first.time[0] % 2700 == 0
+
+    # New minutes arrive -> only the tail is re-aggregated
+    for end in (4001, 4002, 4030, 4100):
+        exchange.series.candles = base[:end]
+        rolled = asyncio.run(window("45m", 50))
+        full = aggregate(base[:end], 2700).tail(50)
+        for name in ("time", "open", "high", "low", "close", "volume"):
+            assert np.allclose(getattr(rolled, name), getattr(full, name))
+    assert engine.stats["incremental"] == 4 and engine.stats["full"] == 1
+
+def test_source_selection():
+    exchange = FakeExchange(minute_candles(100))
+    engine = RollupEngine(exchange, INTERVAL_SECONDS, max_base_candles=20000)
+    assert engine._source_for("BTCUSDT", "5m", 300, 1000) == ("1m", 20000)
+    assert engine._source_for("BTCUSDT", "4h", 14400, 1000) is None  # too deep for the base: fetch natively
+    assert engine._source_for("BTCUSDT", "45m", 2700, 1000) == ("15m", 1001 * 3)  # fewest pages
+    assert engine._source_for("BTCUSDT", "7m", 420, 50000) == ("1m", 50000)  # capped
+    # A finer series already cached deep enough is used before fetching natively
+    exchange.candle_cache.put(("BTCUSDT", "1h"), CandleSeries(minute_candles(10), complete=True))
+    assert engine._source_for("BTCUSDT", "4h", 14400, 1000) == ("1h", 1001 * 4)
+    assert asyncio.run(engine.get_window("BTCUSDT", "1m", 10)) is None
+    assert asyncio.run(engine.get_window("BTCUSDT", "1M", 10)) is None
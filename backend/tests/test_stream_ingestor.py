@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+import numpy as np
+from aiohttp import web
+
+from services.candle_cache import CandleSeries
+from services.candles import Candles
+from services.exchange_service import ExchangeService
+from services.stream_ingestor import StreamIngestor
+from tools.stream_replay_server import ReplayServer
+
+def cached_series(service, symbol="BTCUSDT", interval="1m", count=10):
+    """Put `count` flat one-minute candles ending at the current minute into the candle cache"""
+    now = int(time.time()) // 60 * 60
+    times = np.arange(now - (count - 1) * 60, now + 1, 60, dtype=np.int64)
+    flat = np.full(count, 100.0)
+    series = CandleSeries(Candles(times, flat.copy(), flat.copy(), flat.copy(), flat.copy(), flat.copy()))
+    service.candle_cache.put((symbol, interval), series)
+    return series
+
+def recording():
+    now_ms = int(time.time() * 1000)
+    minute_ms = now_ms // 60000 * 60000
+    kline = {"t": minute_ms, "T": minute_ms + 59999, "s": "BTCUSDT", "i": "1m",
+             "o": "100", "h": "120", "l": "90", "c": "110", "v": "5", "x": False}
+    return [
+        {"at": 0.0, "stream": "btcusdt@aggTrade", "data": {"e": "aggTrade", "E": now_ms, "s": "BTCUSDT", "p": "65000.5", "q": "1", "T": now_ms}},
+        {"at": 0.0, "stream": "ethusdt@aggTrade", "data": {"e": "aggTrade", "E": now_ms, "s": "ETHUSDT", "p": "3500", "q": "1", "T": now_ms}},
+        {"at": 0.05, "stream": "btcusdt@miniTicker", "data": {"e": "24hrMiniTicker", "E": now_ms, "s": "BTCUSDT", "c": "65001", "o": "1", "h": "1", "l": "1", "v": "1", "q": "1"}},
+        {"at": 0.1, "stream": "btcusdt@kline_1m", "data": {"e": "kline", "E": now_ms, "s": "BTCUSDT", "k": kline}},
+    ]
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+def test_replayed_stream_feeds_prices_and_candles_and_survives_reconnects():
+    async def scenario():
+        service = ExchangeService()
+        series = cached_series(service)
+        seen = []
+        listener = lambda symbol, price, timestamp: seen.append((symbol, price))
+        service.add_price_listener(listener)
+
+        server = ReplayServer(recording(), speed=1.0)
+        runner = web.AppRunner(server.app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        ingestor = StreamIngestor(service, symbol_sources=[lambda: ["BTCUSDT"]],
+                                  url=f"ws://127.0.0.1:{port}/stream", reconcile_interval=0.1)
+        try:
+            ingestor.start()
+            await wait_for(lambda: ingestor.stats["klines"] >= 1)
+            assert server.requests[0]["method"] == "SUBSCRIBE"
+            assert set(server.requests[0]["params"]) == {"btcusdt@aggTrade", "btcusdt@miniTicker", "btcusdt@kline_1m"}
+            # Only subscribed streams are delivered, and they reach the listeners and the caches
+            assert ("BTCUSDT", 65000.5) in seen and ("BTCUSDT", 65001.0) in seen
+            assert all(symbol == "BTCUSDT" for symbol, _ in seen)
+            assert service._price_ttl_for("BTCUSDT") == service.stream_price_ttl
+            assert series.candles.close[-1] == 110.0 and series.candles.high[-1] == 120.0
+
+            # An exchange-side disconnect falls back to polling TTLs, then resubscribes
+            await server.drop_connections()
+            await wait_for(lambda: ingestor.stats["disconnects"] == 1)
+            assert service._price_ttl_for("BTCUSDT") == service.price_ttl
+            await wait_for(lambda: ingestor.stats["connects"] == 2 and ingestor.info()["streams"] == 3)
+            # The client counts streams once sent; wait for the server to have read them too
+            await wait_for(lambda: len(server.requests) >= 2)
+            assert [request["method"] for request in server.requests] == ["SUBSCRIBE", "SUBSCRIBE"]
+        finally:
+            await ingestor.close()
+            await runner.cleanup()
+            service.remove_price_listener(listener)
+            service.candle_cache._entries.pop(("BTCUSDT", "1m"), None)
+            service.limit_streamed_symbols(set())
+
+    asyncio.run(scenario())
+
+def test_klines_only_merge_onto_a_contiguous_series():
+    service = ExchangeService()
+    series = cached_series(service, symbol="SOLUSDT")
+    last_ms = series.last_time * 1000
+    try:
+        assert not service.on_stream_kline("SOLUSDT", "1m", [last_ms - 60000, 1, 1, 1, 1, 1])  # already closed
+        assert not service.on_stream_kline("SOLUSDT", "1m", [last_ms + 120000, 1, 1, 1, 1, 1])  # gap
+        assert series.streamed_at == 0.0 and len(series.candles) == 10
+        assert service.on_stream_kline("SOLUSDT", "1m", [last_ms + 60000, 2, 3, 1, 2.5, 7])  # next candle
+        assert series.last_time * 1000 == last_ms + 60000 and series.candles.close[-1] == 2.5
+        assert not service.on_stream_kline("ADAUSDT", "1m", [last_ms, 1, 1, 1, 1, 1])  # nothing cached
+    finally:
+        service.candle_cache._entries.pop(("SOLUSDT", "1m"), None)
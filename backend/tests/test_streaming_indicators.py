@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import numpy as np
+
+from services.candles import Candles
+from services.indicators import bollinger, ema, macd, rsi, sma
+from services.streaming_indicators import (
+    IndicatorStreams, StreamingBollinger, StreamingEMA, StreamingMACD, StreamingRSI, StreamingSMA,
+)
+
+CLOSES = 100 * np.cumprod(1 + np.random.default_rng(1).normal(0, 0.01, 400))
+
+def stream_matches_batch(make, batch, seed_count):
+    indicator = make()
+    indicator.seed(CLOSES[:seed_count])
+    for i in range(seed_count, len(CLOSES)):
+        # Previews of the forming candle must not disturb the committed state
+        indicator.update(CLOSES[i] * 1.01, closed=False)
+        value = indicator.update(CLOSES[i], closed=True)
+        expected = batch(CLOSES[:i + 1])
+        if isinstance(value, dict):
+            for name, v in value.items():
+                assert (v is None) == np.isnan(expected[name][-1])
+                if v is not None:
+                    assert abs(v - expected[name][-1]) < 1e-9
+        else:
+            assert (value is None) == np.isnan(expected[-1])
+            if value is not None:
+                assert abs(value - expected[-1]) < 1e-9
+
+def test_streaming_indicators_match_batch():
+    for seed_count in (5, 100):
+        stream_matches_batch(lambda: StreamingEMA(21), lambda c: ema(c, 21), seed_count)
+        stream_matches_batch(lambda: StreamingSMA(20), lambda c: sma(c, 20), seed_count)
+        stream_matches_batch(lambda: StreamingRSI(14), lambda c: rsi(c, 14), seed_count)
+        stream_matches_batch(lambda: StreamingMACD(), lambda c: macd(c), seed_count)
+        stream_matches_batch(lambda: StreamingBollinger(20, 2.0), lambda c: bollinger(c, 20, 2.0), seed_count)
+
+class FakeExchange:
+    """Serves a fixed candle history; prices only arrive when fetched"""
+
+    def __init__(self):
+        now = int(time.time()) // 86400 * 86400
+        count = 100
+        times = now - np.arange(count - 1, -1, -1, dtype=np.int64) * 86400
+        self.candles = Candles(times, CLOSES[:count], CLOSES[:count], CLOSES[:count], CLOSES[:count], np.ones(count))
+        self.price = float(CLOSES[count - 1])
+        self.listeners = []
+
+    def add_price_listener(self, callback):
+        self.listeners.append(callback)
+
+    async def get_candle_columns(self, symbol, interval, limit):
+        return self.candles
+
+    async def get_current_price(self, symbol):
+        return self.price  # a cache hit: not published to listeners
+
+def test_live_values_follow_the_current_price_without_other_publishers():
+    exchange = FakeExchange()
+    streams = IndicatorStreams(exchange)
+    first = asyncio.run(streams.get_values("BTCUSDT", "1d", "sma:5"))
+
+    exchange.price *= 1.10
+    second = asyncio.run(streams.get_values("BTCUSDT", "1d", "sma:5"))
+
+    closes = list(CLOSES[95:99]) + [exchange.price]
+    assert abs(second["indicators"]["sma:5"] - sum(closes) / 5) < 1e-9
+    assert second["indicators"]["sma:5"] > first["indicators"]["sma:5"]
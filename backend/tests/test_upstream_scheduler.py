@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from services import upstream_scheduler
+from services.upstream_scheduler import (UpstreamScheduler, UpstreamBudgetExceeded, request_weight,
+                                         PRIORITY_LIVE, PRIORITY_CHARTS, PRIORITY_BACKFILL)
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(60 * 28_333_334 + 30.0)  # half way through a minute
+    monkeypatch.setattr(upstream_scheduler, "time", clock)
+    return clock
+
+def test_request_weights():
+    assert request_weight("/api/v3/klines", {"symbol": "BTCUSDT"}) == 2
+    assert request_weight("/api/v3/ticker/price", {"symbol": "BTCUSDT"}) == 2
+    assert request_weight("/api/v3/ticker/price") == 4
+    assert request_weight("/api/v3/exchangeInfo") == 20
+    assert request_weight("/api/v3/depth", {"limit": 5000}) == 250
+
+def test_lower_priorities_keep_out_of_the_headroom(clock):
+    async def scenario():
+        scheduler = UpstreamScheduler(weight_limit=100)
+        for _ in range(25):
+            await scheduler.acquire(2, PRIORITY_BACKFILL)
+        # Backfill has used its half; it would wait for the next minute
+        backfill = asyncio.ensure_future(scheduler.acquire(2, PRIORITY_BACKFILL))
+        await asyncio.sleep(0)
+        assert not backfill.done() and scheduler.info()["queued"]["backfill"] == 1
+        # Charts and live prices still go straight through
+        await scheduler.acquire(30, PRIORITY_CHARTS)
+        await scheduler.acquire(10, PRIORITY_LIVE)
+        # Charts may not wait 30s for the next minute, so they're turned away
+        with pytest.raises(UpstreamBudgetExceeded):
+            await scheduler.acquire(10, PRIORITY_CHARTS)
+        assert scheduler.info()["priorities"]["charts"]["rejected"] == 1
+
+        clock.now += 30
+        scheduler._release()
+        await backfill
+        assert scheduler.info()["weight_used"] == 2
+    asyncio.run(scenario())
+
+def test_waiters_are_released_by_priority(clock):
+    clock.now += 28  # two seconds before the minute resets
+
+    async def scenario():
+        scheduler = UpstreamScheduler(weight_limit=10)
+        await scheduler.acquire(10, PRIORITY_LIVE)
+        order = []
+
+        async def request(priority):
+            await scheduler.acquire(4, priority)
+            order.append(priority)
+
+        tasks = [asyncio.ensure_future(request(priority))
+                 for priority in (PRIORITY_BACKFILL, PRIORITY_CHARTS, PRIORITY_LIVE)]
+        await asyncio.sleep(0)
+        assert order == []
+        clock.now += 2
+        scheduler._release()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        # Live and charts fit in the new minute; backfill is capped at half of it
+        assert order == [PRIORITY_LIVE, PRIORITY_CHARTS]
+        clock.now += 60
+        scheduler._release()
+        await asyncio.gather(*tasks)
+        assert order == [PRIORITY_LIVE, PRIORITY_CHARTS, PRIORITY_BACKFILL]
+    asyncio.run(scenario())
+
+def test_response_headers_and_rate_limits(clock):
+    async def scenario():
+        scheduler = UpstreamScheduler(weight_limit=6000)
+        scheduler.record_response(200, {"X-MBX-USED-WEIGHT-1M": "5990"})
+        assert scheduler.info()["weight_used"] == 5990
+        with pytest.raises(UpstreamBudgetExceeded):
+            await scheduler.acquire(20, PRIORITY_LIVE)
+
+        clock.now += 30
+        scheduler.record_response(429, {"Retry-After": "120"})
+        assert scheduler.info()["blocked_for"] == 120
+        with pytest.raises(UpstreamBudgetExceeded):
+            await scheduler.acquire(1, PRIORITY_LIVE)
+    asyncio.run(scenario())
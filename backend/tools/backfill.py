@@ -0,0 +1,85 @@
+"""
+Download kline history into the local candle store from the command line.
+
+    python tools/backfill.py --symbols BTCUSDT,ETHUSDT --intervals 1m,1h --start 2023-01-01
+    python tools/backfill.py --resume     # finish jobs a crash or Ctrl-C interrupted
+    python tools/backfill.py --status
+
+Jobs are checkpointed to the same state file the API uses (BACKFILL_STATE_PATH,
+by default backfill.json in CANDLE_STORE_DIR), so don't run the CLI while
+the server is working through the same jobs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+# Make the backend importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.backfill import BackfillManager
+from services.exchange_service import ExchangeService
+
+async def report(manager: BackfillManager, every: float):
+    while True:
+        await asyncio.sleep(every)
+        for job in manager.status()["jobs"]:
+            if job["status"] == "running":
+                print(f"{job['id'][:8]} {job['progress'] * 100:.1f}% "
+                      f"({job['tasks_done']}/{len(job['tasks'])} symbol-intervals done)")
+
+async def run(args: argparse.Namespace) -> int:
+    exchange_service = ExchangeService()
+    if exchange_service.candle_store is None:
+        print("The candle store is disabled; set CANDLE_STORE_DIR")
+        return 1
+    manager = BackfillManager(exchange_service, concurrency=args.concurrency)
+    manager.load()
+    if args.status:
+        print(json.dumps(manager.status(), indent=2))
+        return 0
+    if not args.resume:
+        job = await manager.submit(args.symbols.split(","), args.intervals.split(","), args.start, args.end)
+        print(f"Backfill job {job['id']} queued ({manager.state_path})")
+
+    await exchange_service.start()
+    reporter = asyncio.create_task(report(manager, args.report_every))
+    try:
+        await manager.run_pending()
+    finally:
+        reporter.cancel()
+        await exchange_service.close()
+
+    failed = [job for job in manager.status()["jobs"] if job["status"] == "failed"]
+    for job in failed:
+        for name, task in job["tasks"].items():
+            if task["status"] == "failed":
+                print(f"{name}: {task['error']}")
+    return 1 if failed else 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--symbols", help="comma-separated symbols")
+    parser.add_argument("--intervals", default="1m", help="comma-separated intervals")
+    parser.add_argument("--start", help="unix seconds or ISO 8601 date")
+    parser.add_argument("--end", help="unix seconds or ISO 8601 date (default: now)")
+    parser.add_argument("--concurrency", type=int, help="kline pages in flight")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between progress lines")
+    parser.add_argument("--resume", action="store_true", help="only run checkpointed jobs")
+    parser.add_argument("--status", action="store_true", help="print checkpointed jobs and exit")
+    args = parser.parse_args(argv)
+    if not (args.resume or args.status) and not (args.symbols and args.start):
+        parser.error("--symbols and --start are required for a new job")
+    try:
+        return asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("Interrupted; run with --resume to continue")
+        return 130
+
+if __name__ == "__main__":
+    sys.exit(main())
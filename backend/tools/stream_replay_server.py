@@ -0,0 +1,185 @@
+"""
+Local stand-in for the Binance combined websocket stream, for running and
+testing PRICE_INGESTION=stream without network access.
+
+Record real frames once (needs network):
+
+    python tools/stream_replay_server.py record --streams btcusdt@aggTrade,btcusdt@kline_1m --seconds 60 frames.jsonl
+
+then replay them as often as needed, from the backend directory:
+
+    python tools/stream_replay_server.py serve frames.jsonl --port 9443
+    BINANCE_STREAM_URL=ws://127.0.0.1:9443/stream PRICE_INGESTION=stream uvicorn app:app
+
+A recording is JSON lines of {"at": seconds since the first frame,
+"stream": ..., "data": ...}. Each connection gets its own replay of the
+frames for the streams it has subscribed to (via ?streams= or SUBSCRIBE
+messages), paced by "at", looping until it disconnects. Event and kline
+times are shifted to the present by a whole number of the longest kline
+interval in the recording, so candle boundaries stay aligned.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Any, Optional, Set
+
+from aiohttp import web, ClientSession, WSMsgType
+
+# Make the backend importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.exchange_service import INTERVAL_SECONDS
+
+def load_frames(path: str) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def _alignment(frames: Iterable[Dict[str, Any]]) -> int:
+    """Seconds the replayed times must be shifted by a multiple of"""
+    intervals = [INTERVAL_SECONDS.get(frame["data"]["k"]["i"], 60)
+                 for frame in frames if frame["data"].get("e") == "kline"]
+    return max(intervals, default=60)
+
+def _shift(data: Dict[str, Any], offset_ms: int) -> Dict[str, Any]:
+    """Copy of an event with its millisecond timestamps moved by offset_ms"""
+    shifted = dict(data)
+    for field in ("E", "T"):
+        if field in shifted:
+            shifted[field] += offset_ms
+    if "k" in shifted:
+        kline = shifted["k"] = dict(shifted["k"])
+        for field in ("t", "T"):
+            kline[field] += offset_ms
+    return shifted
+
+class ReplayServer:
+    def __init__(self, frames: List[Dict[str, Any]], speed: float = 1.0, loop: bool = True):
+        if not frames:
+            raise ValueError("Nothing to replay")
+        self.frames = frames
+        self.speed = speed
+        self.loop = loop
+        self.alignment = _alignment(frames)
+        self.connections: Set[web.WebSocketResponse] = set()
+        self.requests: List[Dict[str, Any]] = []  # every SUBSCRIBE/UNSUBSCRIBE received, for tests
+
+        first_ms = min(frame["data"].get("E", 0) for frame in frames) or int(time.time() * 1000)
+        self._first_bucket = first_ms // 1000 // self.alignment
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/stream", self.handle)
+        app.router.add_get("/ws", self.handle)
+        return app
+
+    async def drop_connections(self):
+        """Close every client connection, as an exchange-side disconnect would"""
+        for ws in list(self.connections):
+            await ws.close()
+
+    async def handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        self.connections.add(ws)
+        subscribed = {name for name in request.query.get("streams", "").split("/") if name}
+        replay = asyncio.create_task(self._replay(ws, subscribed))
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                command = json.loads(message.data)
+                self.requests.append(command)
+                params = command.get("params") or []
+                if command.get("method") == "SUBSCRIBE":
+                    subscribed.update(params)
+                    await ws.send_json({"result": None, "id": command.get("id")})
+                elif command.get("method") == "UNSUBSCRIBE":
+                    subscribed.difference_update(params)
+                    await ws.send_json({"result": None, "id": command.get("id")})
+                elif command.get("method") == "LIST_SUBSCRIPTIONS":
+                    await ws.send_json({"result": sorted(subscribed), "id": command.get("id")})
+                else:
+                    await ws.send_json({"error": {"code": 2, "msg": "Invalid request"}, "id": command.get("id")})
+        finally:
+            replay.cancel()
+            self.connections.discard(ws)
+        return ws
+
+    async def _replay(self, ws: web.WebSocketResponse, subscribed: Set[str]):
+        # Frames sent before the client's first SUBSCRIBE would all be dropped
+        while not subscribed:
+            await asyncio.sleep(0.05)
+        while True:
+            now_bucket = int(time.time()) // self.alignment
+            offset_ms = (now_bucket - self._first_bucket) * self.alignment * 1000
+            started = time.monotonic()
+            for frame in self.frames:
+                delay = frame.get("at", 0) / self.speed - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if frame["stream"] in subscribed and not ws.closed:
+                    await ws.send_json({"stream": frame["stream"], "data": _shift(frame["data"], offset_ms)})
+            if not self.loop:
+                return
+            await asyncio.sleep(1 / self.speed)  # pause between passes
+
+async def serve(frames: List[Dict[str, Any]], host: str, port: int, speed: float, loop: bool):
+    server = ReplayServer(frames, speed=speed, loop=loop)
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"Replaying {len(frames)} frames on ws://{host}:{port}/stream")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+async def record(url: str, streams: List[str], seconds: float, path: str):
+    count = 0
+    async with ClientSession() as session:
+        async with session.ws_connect(f"{url}?streams={'/'.join(streams)}") as ws:
+            started = time.monotonic()
+            with open(path, "w") as out:
+                while time.monotonic() - started < seconds:
+                    try:
+                        message = await ws.receive(timeout=max(seconds - (time.monotonic() - started), 0.01))
+                    except asyncio.TimeoutError:
+                        break
+                    if message.type != WSMsgType.TEXT:
+                        break
+                    frame = json.loads(message.data)
+                    if "stream" not in frame:
+                        continue
+                    frame["at"] = round(time.monotonic() - started, 3)
+                    out.write(json.dumps(frame) + "\n")
+                    count += 1
+    print(f"Recorded {count} frames to {path}")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="replay a recording")
+    serve_parser.add_argument("frames")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=9443)
+    serve_parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier")
+    serve_parser.add_argument("--once", action="store_true", help="stop after one pass instead of looping")
+
+    record_parser = commands.add_parser("record", help="record frames from the exchange")
+    record_parser.add_argument("out")
+    record_parser.add_argument("--streams", required=True, help="comma-separated stream names")
+    record_parser.add_argument("--seconds", type=float, default=60)
+    record_parser.add_argument("--url", default=os.getenv("BINANCE_STREAM_URL", "wss://stream.binance.com:9443/stream"))
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        asyncio.run(serve(load_frames(args.frames), args.host, args.port, args.speed, not args.once))
+    else:
+        asyncio.run(record(args.url, args.streams.split(","), args.seconds, args.out))
+
+if __name__ == "__main__":
+    main()